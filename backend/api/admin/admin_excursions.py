@@ -6,13 +6,16 @@ from flask_restx import Resource
 
 from backend.core.services.event_services.event_photo_service import get_photos_for_event, \
     delete_photo_from_event, handle_add_photo
-from backend.core.services.event_services.event_api import handle_create_event
+from backend.core.services.event_services.event_api import handle_create_event, serialize_events
+from backend.core.services.event_services.event_fields import parse_event_fieldsets
+from backend.core.services.event_services.event_import import handle_import_events
 from backend.core.services.event_services.event_crud import get_event, get_all_events, delete_event, update_event
 from backend.core.services.event_services.event_session_service import get_sessions_for_event, \
     create_event_session, \
     update_event_session, delete_event_session
 from . import admin_ns
 from .decorators import admin_required
+from backend.core.config import str_to_bool
 from backend.core.models.event_models import Reservation
 from backend.core.schemas.event_schemas import event_model, session_model, session_patch_model
 from ...core.services.user_services.user_service import get_user_by_email
@@ -21,15 +24,27 @@ from ...core.services.user_services.user_service import get_user_by_email
 @admin_ns.route('/excursions')
 class AdminExcursionsResource(Resource):
     @admin_required
-    @admin_ns.doc(description="Получение списка всех экскурсий (только для администратора)")
+    @admin_ns.doc(
+        description="Получение списка всех экскурсий (только для администратора)",
+        params={
+            'fields': 'Поля экскурсии через запятую. Без него — все поля',
+            'include': 'Связанные данные через запятую (category, format_type, age_category, created_by, '
+                       'photos, sessions, tags). Без него — все'
+        }
+    )
     def get(self) -> tuple[dict, int]:
         """
         Получение всех экскурсий с полями для отображения в админ-панели.
 
         :return: JSON с массивом экскурсий и HTTP-статус 200
         """
-        excursions = get_all_events()
-        return {"excursions": [e.to_dict() for e in excursions]}, HTTPStatus.OK
+        try:
+            fields, include = parse_event_fieldsets(request.args)
+        except ValueError as e:
+            return {"message": str(e)}, HTTPStatus.BAD_REQUEST
+
+        excursions = get_all_events(fields, include)
+        return {"excursions": serialize_events(excursions, fields, include)}, HTTPStatus.OK
 
     @admin_required
     @admin_ns.doc(
@@ -51,6 +66,36 @@ class AdminExcursionsResource(Resource):
         return handle_create_event()
 
 
+@admin_ns.route('/excursions/import')
+class AdminExcursionsImportResource(Resource):
+    @admin_required
+    @admin_ns.doc(
+        description="Массовый импорт экскурсий с сессиями и тегами из файла JSON Lines или CSV "
+                    "(только для администратора)",
+        params={
+            'file': {'description': 'Файл .jsonl или .csv (UTF-8)', 'in': 'formData', 'type': 'file',
+                     'required': True},
+            'format': 'Формат файла: jsonl или csv. Без него — по расширению файла',
+            'dry_run': 'true — только проверить файл, ничего не записывая'
+        }
+    )
+    def post(self) -> tuple[dict, int]:
+        """
+        Импорт экскурсий из файла.
+
+        Все строки проверяются до записи; корректные строки вставляются пачками,
+        по отчёту видно, какие строки и почему не импортированы.
+
+        :return: JSON-отчёт (imported, failed, excursion_ids, errors с номерами строк) и HTTP-статус
+        """
+        return handle_import_events(
+            request.files.get('file'),
+            get_jwt_identity(),
+            file_format=request.args.get('format'),
+            dry_run=str_to_bool(request.args.get('dry_run', 'false'))
+        )
+
+
 @admin_ns.route('/excursions/<int:excursion_id>')
 class AdminExcursionResource(Resource):
     @admin_required
@@ -79,7 +124,7 @@ class AdminExcursionResource(Resource):
         excursion = get_event(excursion_id)
         if not excursion:
             return {"message": "Экскурсия не найдена"}, HTTPStatus.NOT_FOUND
-        return {"excursion": excursion.to_dict(include_related=True)}, HTTPStatus.OK
+        return {"excursion": serialize_events([excursion], include_related=True)[0]}, HTTPStatus.OK
 
     @admin_required
     def delete(self, excursion_id: int) -> tuple[dict, int] | Response:
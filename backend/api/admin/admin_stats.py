@@ -0,0 +1,31 @@
+from http import HTTPStatus
+from typing import Tuple
+
+from flask_restx import Resource
+
+from backend.core.utilits.cache import get_cache_stats
+from backend.core.utilits.job_scheduler import get_job_stats
+from . import admin_ns
+from .decorators import admin_required
+
+
+@admin_ns.route('/stats/cache')
+class AdminCacheStats(Resource):
+    @admin_required
+    @admin_ns.doc(description="Статистика in-process кэшей текущего процесса: размер, попадания, промахи")
+    def get(self) -> Tuple[dict, int]:
+        """
+        Получение статистики кэшей (только для администратора)
+        """
+        return {"caches": get_cache_stats()}, HTTPStatus.OK
+
+
+@admin_ns.route('/stats/jobs')
+class AdminJobStats(Resource):
+    @admin_required
+    @admin_ns.doc(description="Статистика периодических задач по кластеру: запуски, длительность, ошибки, пересечения")
+    def get(self) -> Tuple[dict, int]:
+        """
+        Получение статистики фоновых задач (только для администратора)
+        """
+        return {"jobs": get_job_stats()}, HTTPStatus.OK
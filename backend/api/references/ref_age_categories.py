@@ -7,6 +7,8 @@ from backend.api.admin.decorators import admin_required
 from backend.core import db
 from backend.core.models.event_models import AgeCategory
 from backend.api.references import ref_ns
+from backend.core.services.reference_service.reference_cache import list_references, refresh_references
+from backend.core.utilits.version_utils import bump_data_version, get_data_version, REFERENCES_SCOPE
 
 age_category_model = ref_ns.model('AgeCategory', {
     'name': fields.String(required=True, description='Название возрастной категории'),
@@ -23,8 +25,7 @@ class AgeCategoryList(Resource):
         Returns:
             list[dict]: Список возрастных категорий в виде словарей.
         """
-        age_categories = AgeCategory.query.all()
-        return [a.to_dict() for a in age_categories], 200
+        return list_references("age_categories", get_data_version(REFERENCES_SCOPE)), 200
 
     @admin_required
     @ref_ns.expect(age_category_model)
@@ -50,7 +51,9 @@ class AgeCategoryList(Resource):
 
         age_category = AgeCategory(age_category_name=name)
         db.session.add(age_category)
+        bump_data_version(REFERENCES_SCOPE)
         db.session.commit()
+        refresh_references()
         return age_category.to_dict(), 201
 
 
@@ -74,5 +77,7 @@ class AgeCategoryResource(Resource):
             return {'message': 'Возрастная категория не найдена'}, 404
 
         db.session.delete(age_category)
+        bump_data_version(REFERENCES_SCOPE)
         db.session.commit()
+        refresh_references()
         return {'message': 'Возрастная категория удалена'}, 200
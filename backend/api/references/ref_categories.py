@@ -7,6 +7,8 @@ from backend.api.admin.decorators import admin_required
 from backend.core import db
 from backend.core.models.event_models import Category
 from backend.api.references import ref_ns
+from backend.core.services.reference_service.reference_cache import list_references, refresh_references
+from backend.core.utilits.version_utils import bump_data_version, get_data_version, REFERENCES_SCOPE
 
 category_model = ref_ns.model('Category', {
     'name': fields.String(required=True, description='Название категории'),
@@ -23,8 +25,7 @@ class CategoryList(Resource):
         Returns:
             list[dict]: Список категорий в виде словарей.
         """
-        categories = Category.query.all()
-        return [c.to_dict() for c in categories], 200
+        return list_references("categories", get_data_version(REFERENCES_SCOPE)), 200
 
     @admin_required
     @ref_ns.expect(category_model)
@@ -51,7 +52,9 @@ class CategoryList(Resource):
 
         category = Category(category_name=name)
         db.session.add(category)
+        bump_data_version(REFERENCES_SCOPE)
         db.session.commit()
+        refresh_references()
         return category.to_dict(), 201
 
 
@@ -75,5 +78,7 @@ class CategoryResource(Resource):
             return {'message': 'Категория не найдена'}, 404
 
         db.session.delete(category)
+        bump_data_version(REFERENCES_SCOPE)
         db.session.commit()
+        refresh_references()
         return {'message': 'Категория удалена'}, 200
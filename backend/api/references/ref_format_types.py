@@ -7,6 +7,8 @@ from backend.api.admin.decorators import admin_required
 from backend.core import db
 from backend.core.models.event_models import FormatType
 from backend.api.references import ref_ns
+from backend.core.services.reference_service.reference_cache import list_references, refresh_references
+from backend.core.utilits.version_utils import bump_data_version, get_data_version, REFERENCES_SCOPE
 
 format_type_model = ref_ns.model('FormatType', {
     'name': fields.String(required=True, description='Название типа формата'),
@@ -23,8 +25,7 @@ class FormatTypeList(Resource):
         Returns:
             list[dict]: Список типов форматов в виде словарей.
         """
-        format_types = FormatType.query.all()
-        return [f.to_dict() for f in format_types], 200
+        return list_references("format_types", get_data_version(REFERENCES_SCOPE)), 200
 
     @admin_required
     @ref_ns.expect(format_type_model)
@@ -50,7 +51,9 @@ class FormatTypeList(Resource):
 
         format_type = FormatType(format_type_name=name)
         db.session.add(format_type)
+        bump_data_version(REFERENCES_SCOPE)
         db.session.commit()
+        refresh_references()
         return format_type.to_dict(), 201
 
 
@@ -74,5 +77,7 @@ class FormatTypeResource(Resource):
             return {'message': 'Тип формата не найден'}, 404
 
         db.session.delete(format_type)
+        bump_data_version(REFERENCES_SCOPE)
         db.session.commit()
+        refresh_references()
         return {'message': 'Тип формата удалён'}, 200
@@ -8,6 +8,8 @@ from backend.core import db
 from backend.core.models.auth_models import Role
 from backend.core.schemas.event_schemas import role_model
 from backend.api.references import ref_ns
+from backend.core.services.reference_service.reference_cache import list_references, refresh_references
+from backend.core.utilits.version_utils import bump_data_version, get_data_version, REFERENCES_SCOPE
 
 
 @ref_ns.route('/roles')
@@ -20,8 +22,7 @@ class RoleList(Resource):
         Returns:
             list[dict]: Список ролей в виде словарей.
         """
-        roles = Role.query.all()
-        return [r.to_dict() for r in roles], 200
+        return list_references("roles", get_data_version(REFERENCES_SCOPE)), 200
 
     @admin_required
     @ref_ns.expect(role_model)
@@ -47,7 +48,9 @@ class RoleList(Resource):
 
         role = Role(role_name=name)
         db.session.add(role)
+        bump_data_version(REFERENCES_SCOPE)
         db.session.commit()
+        refresh_references()
         return role.to_dict(), 201
 
 
@@ -71,5 +74,7 @@ class RoleResource(Resource):
             return {'message': 'Роль не найдена'}, 404
 
         db.session.delete(role)
+        bump_data_version(REFERENCES_SCOPE)
         db.session.commit()
+        refresh_references()
         return {'message': 'Роль удалена'}, 200
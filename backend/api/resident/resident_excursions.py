@@ -5,7 +5,7 @@ from flask_jwt_extended import get_jwt_identity
 from flask_restx import Resource
 
 from backend.core.schemas.event_schemas import data_param, photos_param, event_model
-from backend.core.services.event_services.event_api import handle_create_event
+from backend.core.services.event_services.event_api import handle_create_event, serialize_events
 from backend.core.services.event_services.event_crud import get_event, get_events_for_resident, delete_event, \
     update_event, \
     verify_resident_owns_event
@@ -46,7 +46,7 @@ class ExcursionsResource(Resource):
         excursions = get_events_for_resident(resident.user_id)
 
         return {
-            "excursions": [excursion.to_dict(include_related=True) for excursion in excursions]
+            "excursions": serialize_events(excursions, include_related=True)
         }, HTTPStatus.OK
 
 
@@ -96,7 +96,7 @@ class ExcursionResource(Resource):
         if not excursion:
             return {"message": "Экскурсия не найдена"}, 404
 
-        data: dict = excursion.to_dict(include_related=True)
+        data: dict = serialize_events([excursion], include_related=True)[0]
         return {"excursion": data}, HTTPStatus.OK
 
     @resident_required
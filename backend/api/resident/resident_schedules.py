@@ -0,0 +1,102 @@
+from http import HTTPStatus
+
+from flask import request
+from flask_jwt_extended import get_jwt_identity
+from flask_restx import Resource
+
+from backend.core.schemas.event_schemas import schedule_model, schedule_patch_model
+from backend.core.services.event_services.event_crud import verify_resident_owns_event
+from backend.core.services.event_services.session_schedule_service import get_schedules_for_event, \
+    create_schedule, update_schedule, delete_schedule
+from . import resident_ns
+from .decorators import resident_required
+from ...core.services.user_services.user_service import get_user_by_email
+
+
+@resident_ns.route('/excursions/<int:excursion_id>/schedules')
+class ExcursionSchedulesResource(Resource):
+    @resident_required
+    @resident_ns.doc(description="Получение расписаний повторяющихся сессий экскурсии")
+    def get(self, excursion_id: int) -> tuple[list[dict], int]:
+        """
+        Получение всех расписаний конкретной экскурсии текущего резидента.
+
+        :param excursion_id: ID экскурсии
+        :return: Список расписаний в виде словарей и HTTP-статус.
+                 В случае ошибки — словарь с сообщением и статус ошибки.
+        """
+        resident_id: int = get_user_by_email(get_jwt_identity()).user_id
+        excursion, error, status = verify_resident_owns_event(resident_id, excursion_id)
+        if error:
+            return error, status
+
+        schedules = get_schedules_for_event(excursion_id)
+        return [s.to_dict() for s in schedules], HTTPStatus.OK
+
+    @resident_required
+    @resident_ns.expect(schedule_model, validate=True)
+    @resident_ns.doc(description="Создание расписания: сессии создаются сразу на горизонт SCHEDULE_HORIZON_DAYS")
+    def post(self, excursion_id: int) -> tuple[dict, int]:
+        """
+        Создание расписания повторяющихся сессий для экскурсии текущего резидента.
+
+        :param excursion_id: ID экскурсии
+        :return: Словарь с данными созданного расписания и HTTP-статус.
+                 В случае ошибки — словарь с сообщением и статус ошибки.
+        """
+        resident_id: int = get_user_by_email(get_jwt_identity()).user_id
+        excursion, error, status = verify_resident_owns_event(resident_id, excursion_id)
+        if error:
+            return error, status
+
+        data: dict = request.get_json()
+        schedule, error, status = create_schedule(excursion_id, data)
+        if error:
+            return error, status
+
+        return schedule.to_dict(), status
+
+
+@resident_ns.route('/excursions/<int:excursion_id>/schedules/<int:schedule_id>')
+class ExcursionScheduleResource(Resource):
+    @resident_required
+    @resident_ns.expect(schedule_patch_model, validate=True)
+    @resident_ns.doc(description="Изменение расписания: пересоздаются только будущие сессии без бронирований")
+    def patch(self, excursion_id: int, schedule_id: int) -> tuple[dict, int]:
+        """
+        Изменение расписания экскурсии текущего резидента.
+
+        :param excursion_id: ID экскурсии
+        :param schedule_id: ID расписания
+        :return: Словарь с данными обновлённого расписания и HTTP-статус.
+                 В случае ошибки — словарь с сообщением и статус ошибки.
+        """
+        resident_id: int = get_user_by_email(get_jwt_identity()).user_id
+        excursion, error, status = verify_resident_owns_event(resident_id, excursion_id)
+        if error:
+            return error, status
+
+        data: dict = request.get_json()
+        schedule, error, status = update_schedule(excursion_id, schedule_id, data)
+        if error:
+            return error, status
+
+        return schedule.to_dict(), status
+
+    @resident_required
+    @resident_ns.doc(description="Удаление расписания вместе с будущими сессиями без бронирований")
+    def delete(self, excursion_id: int, schedule_id: int) -> tuple[dict, int]:
+        """
+        Удаление расписания экскурсии текущего резидента.
+
+        :param excursion_id: ID экскурсии
+        :param schedule_id: ID расписания
+        :return: Словарь с результатом удаления и HTTP-статус.
+                 В случае ошибки — словарь с сообщением и статус ошибки.
+        """
+        resident_id: int = get_user_by_email(get_jwt_identity()).user_id
+        excursion, error, status = verify_resident_owns_event(resident_id, excursion_id)
+        if error:
+            return error, status
+
+        return delete_schedule(excursion_id, schedule_id)
@@ -2,4 +2,5 @@ from flask_restx import Namespace
 
 user_ns = Namespace('user', description='Эндпоинты для обычного пользователя')
 
-from . import user_auth, user_excursions, user_news, user_reservations, user_profile  # noqa: F401, E402
+from . import user_auth, user_excursions, user_news, user_reservations, user_profile, \
+    user_search, user_waitlist  # noqa: F401, E402
@@ -3,66 +3,130 @@ from http import HTTPStatus
 from flask import request
 from flask_restx import Resource
 
-from backend.core.services.event_services.event_api import list_events
+from backend.core.services.event_services.event_api import get_catalog_page, get_catalog_version
+from backend.core.services.event_services.event_facets import get_facet_counts
+from backend.core.services.event_services.event_fields import parse_event_fieldsets, parse_sessions_limit
+from backend.core.services.event_services.event_pagination import MAX_PAGE_LIMIT
+from backend.core.utilits.etag_utils import etag
 from . import user_ns
 
 
+FILTER_PARAMS = {
+    'category': 'Фильтр по имени категории (можно несколько через запятую)',
+    'format_type': 'Фильтр по типу формата (можно несколько через запятую)',
+    'age_category': 'Фильтр по возрастной категории (можно несколько через запятую)',
+    'tags': 'Фильтр по тегам, через запятую',
+    'min_duration': 'Минимальная продолжительность, минуты',
+    'max_duration': 'Максимальная продолжительность, минуты',
+    'min_distance_to_center': 'Мин. расстояние до центра, км',
+    'max_distance_to_center': 'Макс. расстояние до центра, км',
+    'min_distance_to_stop': 'Мин. расстояние до остановки, мин',
+    'max_distance_to_stop': 'Макс. расстояние до остановки, мин',
+    'min_price': 'Минимальная стоимость ближайшей сессии',
+    'max_price': 'Максимальная стоимость ближайшей сессии',
+    'start_date': 'Дата начала периода (ISO 8601, например 2025-06-01)',
+    'end_date': 'Дата конца периода (ISO 8601, например 2025-06-30)',
+    'title': 'Поиск по названию',
+}
+
+
+def parse_catalog_filters(args) -> dict:
+    """
+    Извлекает фильтры каталога из параметров запроса.
+
+    :param args: Параметры запроса (request.args)
+    :return: Словарь фильтров в формате list_events
+    """
+    return {
+        'category': args.get('category'),
+        'format_type': args.get('format_type'),
+        'age_category': args.get('age_category'),
+        'tags': args.get('tags'),
+        'min_duration': args.get('min_duration'),
+        'max_duration': args.get('max_duration'),
+        'min_distance_to_center': args.get('min_distance_to_center'),
+        'max_distance_to_center': args.get('max_distance_to_center'),
+        'min_distance_to_stop': args.get('min_distance_to_stop'),
+        'max_distance_to_stop': args.get('max_distance_to_stop'),
+        'min_price': args.get('min_price'),
+        'max_price': args.get('max_price'),
+        'start_date': args.get('start_date'),
+        'end_date': args.get('end_date'),
+        'title': args.get('title'),
+    }
+
+
 @user_ns.route('/excursions')
 class UserExcursionsList(Resource):
     @user_ns.doc(
         description="Список всех активных экскурсий (без авторизации)",
         params={
-            'category': 'Фильтр по имени категории (можно несколько через запятую)',
-            'format_type': 'Фильтр по типу формата (можно несколько через запятую)',
-            'age_category': 'Фильтр по возрастной категории (можно несколько через запятую)',
-            'tags': 'Фильтр по тегам, через запятую',
-            'min_duration': 'Минимальная продолжительность, минуты',
-            'max_duration': 'Максимальная продолжительность, минуты',
-            'min_distance_to_center': 'Мин. расстояние до центра, км',
-            'max_distance_to_center': 'Макс. расстояние до центра, км',
-            'min_distance_to_stop': 'Мин. расстояние до остановки, мин',
-            'max_distance_to_stop': 'Макс. расстояние до остановки, мин',
-            'min_price': 'Минимальная стоимость ближайшей сессии',
-            'max_price': 'Максимальная стоимость ближайшей сессии',
-            'start_date': 'Дата начала периода (ISO 8601, например 2025-06-01)',
-            'end_date': 'Дата конца периода (ISO 8601, например 2025-06-30)',
-            'title': 'Поиск по названию',
+            **FILTER_PARAMS,
             'sort': (
                     'Сортировка: title, duration, price, time. '
                     'Можно с -, например: -price, -time'
-            )
+            ),
+            'limit': f'Размер страницы (1-{MAX_PAGE_LIMIT}). Без него возвращаются все экскурсии',
+            'cursor': 'Курсор следующей страницы (next_cursor из предыдущего ответа)',
+            'fields': 'Поля экскурсии через запятую, например: title,duration. Без него — все поля',
+            'include': (
+                    'Связанные данные через запятую: category, format_type, age_category, created_by, '
+                    'photos, sessions, tags. Без него — все, пустое значение — ни одной'
+            ),
+            'sessions_limit': 'Сколько ближайших сессий вернуть для каждой экскурсии. Без него — все предстоящие'
         }
     )
+    @etag(get_catalog_version)
     def get(self) -> tuple[dict, int]:
         """
         Получение списка активных экскурсий с возможностью фильтрации и сортировки.
 
         Все параметры опциональны. Если фильтры не указаны, возвращаются все активные экскурсии.
+        При указании limit ответ содержит одну страницу и next_cursor для запроса следующей.
+        Параметры fields и include ограничивают состав полей и связей в ответе;
+        не запрошенные связи не загружаются из БД.
+        Ответ содержит ETag; при совпадении If-None-Match возвращается 304 без тела.
 
-        :return: Словарь с ключом "excursions", содержащим список экскурсий, и HTTP-статус.
+        :return: Словарь с ключами "excursions" (список экскурсий) и "next_cursor", и HTTP-статус.
         """
         args: dict = request.args
-        filters: dict = {
-            'category': args.get('category'),
-            'format_type': args.get('format_type'),
-            'age_category': args.get('age_category'),
-            'tags': args.get('tags'),
-            'min_duration': args.get('min_duration'),
-            'max_duration': args.get('max_duration'),
-            'min_distance_to_center': args.get('min_distance_to_center'),
-            'max_distance_to_center': args.get('max_distance_to_center'),
-            'min_distance_to_stop': args.get('min_distance_to_stop'),
-            'max_distance_to_stop': args.get('max_distance_to_stop'),
-            'min_price': args.get('min_price'),
-            'max_price': args.get('max_price'),
-            'start_date': args.get('start_date'),
-            'end_date': args.get('end_date'),
-            'title': args.get('title'),
-        }
+        filters: dict = parse_catalog_filters(args)
         sort: str | None = args.get('sort')
 
-        excursions: list = list_events(filters, sort)
+        limit: int | None = args.get('limit', type=int)
+        if 'limit' in args and (limit is None or not 1 <= limit <= MAX_PAGE_LIMIT):
+            return {"message": f"limit должен быть числом от 1 до {MAX_PAGE_LIMIT}"}, HTTPStatus.BAD_REQUEST
+
+        try:
+            fields, include = parse_event_fieldsets(args)
+            excursions, next_cursor = get_catalog_page(
+                filters, sort, limit=limit, cursor=args.get('cursor'), fields=fields, include=include,
+                sessions_limit=parse_sessions_limit(args)
+            )
+        except ValueError as e:
+            return {"message": str(e)}, HTTPStatus.BAD_REQUEST
 
         return {
-            "excursions": [excursion.to_dict() for excursion in excursions]
+            "excursions": excursions,
+            "next_cursor": next_cursor
         }, HTTPStatus.OK
+
+
+@user_ns.route('/excursions/facets')
+class UserExcursionsFacets(Resource):
+    @user_ns.doc(
+        description="Количество экскурсий по категориям, форматам, возрастным категориям и тегам (без авторизации)",
+        params=FILTER_PARAMS
+    )
+    @etag(get_catalog_version)
+    def get(self) -> tuple[dict, int]:
+        """
+        Возвращает количества для фильтров каталога с учётом уже выбранных фильтров.
+
+        Принимает те же фильтры, что и список экскурсий. Для каждого фасета учитываются все фильтры,
+        кроме фильтра по самому фасету.
+
+        :return: Словарь {"category": [...], "format_type": [...], "age_category": [...], "tags": [...]},
+                 где каждый элемент — {"name": значение, "count": количество}, и HTTP-статус.
+        """
+        return get_facet_counts(parse_catalog_filters(request.args)), HTTPStatus.OK
@@ -1,4 +1,4 @@
-from datetime import timedelta, datetime
+from datetime import timedelta
 from http import HTTPStatus
 from urllib.parse import urlencode, quote_plus
 
@@ -10,11 +10,14 @@ from flask_restx import Resource
 from . import user_ns
 from backend.core.schemas.event_schemas import reservation_model, cancel_model
 from ...core.utilits.file_utils import create_ical_from_reservation
-from backend.core.services.event_services.event_crud import get_event
+from ...core.utilits.etag_utils import etag
+from backend.core.services.event_services.event_api import serialize_events, get_event_version, get_public_event
+from backend.core.services.event_services.event_fields import parse_event_fieldsets, parse_sessions_limit
 from backend.core.services.reservation_service.reservation_queries import get_reservations_by_user_email, \
     get_reservations_by_reservation_id
 from backend.core.services.reservation_service.reservation_cancel import cancel_user_reservation
-from backend.core.services.reservation_service.reservation_crud import create_reservation_with_payment
+from backend.core.services.reservation_service.reservation_crud import create_reservation_with_payment, \
+    start_reservation_payment, get_reservation_payment_status
 
 
 @user_ns.route('/reservations')
@@ -49,6 +52,8 @@ class ReservationCreate(Resource):
         Создает бронь на сеанс экскурсии с оплатой.
 
         Использует данные пользователя из JWT (email) и информацию о бронировании из тела запроса.
+        Для платного сеанса возвращает 202 с ID брони: ссылка на оплату создается в фоне
+        и доступна через GET /v2/reservations/<id>/payment.
 
         :return: Словарь с результатом операции и HTTP-статус.
         """
@@ -87,6 +92,32 @@ class ReservationCreate(Resource):
         return response, status
 
 
+@user_ns.route('/v2/reservations/<int:reservation_id>/payment')
+class ReservationPayment(Resource):
+    @jwt_required()
+    @user_ns.doc(description="Состояние оплаты брони: опрашивается, пока не появится payment_url")
+    def get(self, reservation_id: int) -> tuple[dict, int]:
+        """
+        Возвращает состояние создания платежа своей брони (pending, ready, failed, paid) и ссылку на оплату.
+
+        :param reservation_id: ID бронирования
+        :return: Словарь с состоянием оплаты и HTTP-статус.
+        """
+        return get_reservation_payment_status(get_jwt_identity(), reservation_id)
+
+    @jwt_required()
+    @user_ns.doc(description="Ссылка на оплату неоплаченной брони (в том числе полученной из листа ожидания)")
+    def post(self, reservation_id: int) -> tuple[dict, int]:
+        """
+        Запрашивает ссылку на оплату своей неоплаченной брони, пока места удерживаются.
+        Если ссылка ещё не готова, платеж ставится в очередь и возвращается 202.
+
+        :param reservation_id: ID бронирования
+        :return: Словарь с состоянием оплаты и HTTP-статус.
+        """
+        return start_reservation_payment(get_jwt_identity(), reservation_id)
+
+
 @user_ns.route('/reservations/<int:reservation_id>/export_ical')
 class ExportReservationICal(Resource):
     def get(self, reservation_id):
@@ -151,9 +182,18 @@ class GoogleCalendarLink(Resource):
 
 @user_ns.route('/excursions_detail/<int:excursion_id>')
 class DetailExcursion(Resource):
+    @user_ns.doc(params={
+        'fields': 'Поля экскурсии через запятую. Без него — все поля',
+        'include': 'Связанные данные через запятую (category, format_type, age_category, created_by, '
+                   'photos, sessions, tags). Без него — все',
+        'sessions_limit': 'Сколько ближайших сессий вернуть. Без него — все предстоящие'
+    })
+    @etag(lambda excursion_id: get_event_version(excursion_id))
     def get(self, excursion_id):
         """
         Возвращает полную информацию об экскурсии, включая предстоящие сеансы.
+        Параметры fields и include ограничивают состав ответа.
+        Ответ содержит ETag; при совпадении If-None-Match возвращается 304 без тела.
 
         Args:
             excursion_id (int): ID экскурсии.
@@ -162,12 +202,15 @@ class DetailExcursion(Resource):
             dict: Информация об экскурсии.
             tuple: Словарь с сообщением об ошибке и HTTP статус, если экскурсия не найдена.
         """
-        excursion = get_event(excursion_id)
+        try:
+            fields, include = parse_event_fieldsets(request.args)
+            sessions_limit = parse_sessions_limit(request.args)
+        except ValueError as e:
+            return {"message": str(e)}, HTTPStatus.BAD_REQUEST
+
+        excursion = get_public_event(excursion_id, fields, include, sessions_limit)
 
         if not excursion:
             return {"message": "Экскурсия не найдена"}, HTTPStatus.NOT_FOUND
 
-        now = datetime.now()
-        excursion.sessions = [s for s in excursion.sessions if s.start_datetime > now]
-
-        return excursion.to_dict(), HTTPStatus.OK
+        return serialize_events([excursion], fields, include)[0], HTTPStatus.OK
@@ -0,0 +1,44 @@
+from http import HTTPStatus
+
+from flask import request
+from flask_restx import Resource
+
+from backend.core.services.search_service.search_service import search, SEARCH_KINDS
+from . import user_ns
+
+MAX_SEARCH_LIMIT = 50
+
+
+@user_ns.route('/search')
+class Search(Resource):
+    @user_ns.doc(
+        description="Полнотекстовый поиск по экскурсиям и новостям (без авторизации)",
+        params={
+            'q': 'Поисковый запрос',
+            'type': 'Типы результатов через запятую: excursion, news. Без него — все',
+            'limit': f'Количество результатов (1-{MAX_SEARCH_LIMIT}), по умолчанию 20'
+        }
+    )
+    def get(self) -> tuple[dict, int]:
+        """
+        Ищет экскурсии (название, описание, теги) и новости (заголовок, текст).
+
+        Поиск учитывает русскую морфологию и ранжирует результаты по BM25.
+        Выполняется по индексу в памяти процесса, без обращения к таблицам экскурсий и новостей.
+
+        :return: Словарь с ключом "results" и HTTP-статус.
+        """
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return {"message": "Параметр q обязателен"}, HTTPStatus.BAD_REQUEST
+
+        kinds = [k.strip() for k in (request.args.get('type') or '').split(',') if k.strip()]
+        unknown = [k for k in kinds if k not in SEARCH_KINDS]
+        if unknown:
+            return {"message": f"Неизвестный тип: {', '.join(unknown)}"}, HTTPStatus.BAD_REQUEST
+
+        limit = request.args.get('limit', 20, type=int)
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            return {"message": f"limit должен быть числом от 1 до {MAX_SEARCH_LIMIT}"}, HTTPStatus.BAD_REQUEST
+
+        return {"results": search(query, kinds or None, limit)}, HTTPStatus.OK
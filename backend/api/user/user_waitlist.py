@@ -0,0 +1,55 @@
+from flask import request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_restx import Resource
+
+from . import user_ns
+from backend.core.schemas.event_schemas import reservation_model, waitlist_leave_model
+from backend.core.services.reservation_service.waitlist import join_waitlist, get_waitlist_for_user, leave_waitlist
+
+
+@user_ns.route('/v2/waitlist')
+class Waitlist(Resource):
+    @jwt_required()
+    @user_ns.doc(description="Получение своих заявок в листах ожидания")
+    def get(self) -> tuple[dict, int]:
+        """
+        Получение заявок текущего пользователя в листах ожидания с местом в очереди.
+
+        :return: Словарь с ключом "waitlist" и HTTP-статус.
+        """
+        return get_waitlist_for_user(get_jwt_identity())
+
+    @jwt_required()
+    @user_ns.expect(reservation_model, validate=True)
+    @user_ns.doc(description="Запись в лист ожидания заполненного сеанса")
+    def post(self) -> tuple[dict, int]:
+        """
+        Добавляет заявку в лист ожидания сеанса, в котором не хватает мест.
+
+        Когда места освобождаются, заявка автоматически превращается в бронь,
+        а пользователь получает письмо.
+
+        :return: Словарь с ID заявки и местом в очереди и HTTP-статус.
+        """
+        data: dict = request.get_json() or {}
+
+        return join_waitlist(
+            user_email=get_jwt_identity(),
+            session_id=data.get('session_id'),
+            full_name=data.get('full_name'),
+            phone_number=data.get('phone_number'),
+            email=data.get('email'),
+            participants_count=data.get('participants_count', 1)
+        )
+
+    @jwt_required()
+    @user_ns.expect(waitlist_leave_model, validate=True)
+    @user_ns.doc(description="Выход из листа ожидания")
+    def delete(self) -> tuple[dict, int]:
+        """
+        Удаляет ожидающую заявку текущего пользователя.
+
+        :return: Словарь с результатом и HTTP-статус.
+        """
+        data: dict = request.get_json() or {}
+        return leave_waitlist(get_jwt_identity(), data.get('entry_id'))
@@ -1,13 +1,15 @@
+import hmac
 from http import HTTPStatus
 
 from flask import request
 from flask_restx import Resource
 
 from . import webhook_ns
-from backend.core import db
-from backend.core.models.auth_models import User
-from backend.core.models.event_models import Reservation, Payment
-from backend.core.services.email_service.email_service import send_reservation_confirmation_email
+from backend.core.config import Config
+from backend.core.services.reservation_service.seat_holds import sweep_expired_holds
+from backend.core.services.reservation_service.webhook_inbox import record_webhook_event, submit_webhook_processing
+
+JOB_TOKEN_HEADER = "X-Job-Token"
 
 
 @webhook_ns.route('/yookassa')
@@ -27,53 +29,57 @@ class YooKassaWebhook(Resource):
             }
         }
 
-        Логика:
+        Вебхук только сохраняется во входящую очередь (один INSERT) и сразу подтверждается;
+        статусы применяет фоновый обработчик (см. webhook_inbox). Повторная доставка того же
+        события (event + object.id) не сохраняется и не обрабатывается заново.
+
+        Логика обработчика:
         - payment.succeeded: помечает бронь как оплаченной, обновляет статус платежа и отправляет email.
-        - payment.canceled: обновляет статус платежа на 'canceled'.
+        - payment.canceled: обновляет статус платежа на 'canceled' и сразу освобождает места
+          неоплаченной брони.
         - refund.succeeded: обновляет статус платежа на 'refunded'.
 
         Returns:
             dict: сообщение о статусе обработки
             int: HTTP статус код
         """
-        event_data = request.get_json()
+        event_data = request.get_json(silent=True)
 
         if not event_data or 'event' not in event_data:
             return {"message": "Некорректные данные"}, HTTPStatus.BAD_REQUEST
 
-        event = event_data['event']
-        object_data = event_data.get('object', {})
-        metadata = object_data.get('metadata', {})
-        payment_id = object_data.get('id')
-
-        if event == 'payment.succeeded':
-            reservation_id = metadata.get('reservation_id')
-            reservation = Reservation.query.get(reservation_id)
-            if reservation and not reservation.is_paid:
-                reservation.is_paid = True
-                db.session.commit()
-                try:
-                    user = User.query.get(reservation.user_id)
-                    send_reservation_confirmation_email(reservation, user)
-                except Exception as e:
-                    print(f"Ошибка при отправке письма: {e}")
-
-            payment = Payment.query.filter_by(payment_id=payment_id).first()
-            if payment:
-                payment.status = 'succeeded'
-                db.session.commit()
-
-        elif event == 'payment.canceled':
-            payment = Payment.query.filter_by(payment_id=payment_id).first()
-            if payment:
-                payment.status = 'canceled'
-                db.session.commit()
-
-        elif event == 'refund.succeeded':
-            payment_id = object_data.get('payment_id')
-            payment = Payment.query.filter_by(payment_id=payment_id).first()
-            if payment:
-                payment.status = 'refunded'
-                db.session.commit()
-
-        return {"message": "Webhook обработан"}, HTTPStatus.OK
+        recorded = record_webhook_event(event_data)
+        if recorded is None:
+            return {"message": "Некорректные данные"}, HTTPStatus.BAD_REQUEST
+        if recorded:
+            submit_webhook_processing()
+            return {"message": "Webhook принят"}, HTTPStatus.OK
+
+        return {"message": "Webhook уже получен"}, HTTPStatus.OK
+
+
+@webhook_ns.route('/jobs/sweep-holds')
+class SweepHoldsJob(Resource):
+    def post(self) -> tuple[dict, int]:
+        """
+        Запуск очистки истёкших удержаний мест внешним планировщиком (serverless-функция).
+
+        Выполняет ту же задачу, что и периодическая sweep_expired_holds приложения: освобождает
+        удержания, отменяет их платежи, продвигает листы ожидания и обновляет каталог.
+        Требует заголовок X-Job-Token, совпадающий с JOB_TRIGGER_TOKEN.
+
+        Returns:
+            dict: количество освобождённых броней, длительность и скорость очистки
+            int: HTTP статус код
+        """
+        token = request.headers.get(JOB_TOKEN_HEADER, "")
+        if not Config.JOB_TRIGGER_TOKEN or not hmac.compare_digest(token, Config.JOB_TRIGGER_TOKEN):
+            return {"message": "Доступ запрещён"}, HTTPStatus.FORBIDDEN
+
+        stats = sweep_expired_holds()
+        return {
+            "deleted_count": stats.reservations,
+            "payments": stats.payments,
+            "seconds": round(stats.seconds, 3),
+            "rows_per_second": round(stats.rows_per_second)
+        }, HTTPStatus.OK
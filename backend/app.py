@@ -1,9 +1,8 @@
+import atexit
 import io
 import os
 import sys
 
-
-from apscheduler.schedulers.background import BackgroundScheduler
 from flask import send_from_directory, render_template, send_file
 
 from backend.core import create_app, db
@@ -13,6 +12,16 @@ from backend.core.models.auth_models import Role
 from backend.core.models.event_models import Category, AgeCategory, FormatType
 from backend.core.scripts.clear_unpaid import cleanup_unpaid_reservations
 from backend.core.scripts.create_superuser import create_superuser
+from backend.core.scripts.query_report import print_query_report
+from backend.core.services.event_services.event_catalog import rebuild_event_catalog, refresh_stale_catalog
+from backend.core.services.event_services.session_schedule_service import materialize_due_schedules
+from backend.core.services.reference_service.reference_cache import refresh_references
+from backend.core.services.reservation_service.payment_queue import resume_stale_payment_requests
+from backend.core.services.reservation_service.seat_counter import reconcile_booked_seats
+from backend.core.services.reservation_service.webhook_inbox import process_webhook_inbox, purge_processed_webhooks
+from backend.core.services.search_service.search_service import build_search_index
+from backend.core.utilits.idempotency_utils import purge_expired_idempotency_keys
+from backend.core.utilits.job_scheduler import ClusterScheduler
 from backend.core.scripts.ensure_data import ensure_data_exists
 
 
@@ -45,21 +54,27 @@ def register_static_routes(app):
         return render_template('login.html', title="Вход в систему")
 
 
-def run_cleanup(app):
-    with app.app_context():
-        cleanup_unpaid_reservations()
+def start_scheduler(app):
+    scheduler = ClusterScheduler(app)
+    scheduler.add_interval_job(
+        "cleanup_unpaid_reservations", cleanup_unpaid_reservations, minutes=Config.HOLD_SWEEP_INTERVAL_MINUTES
+    )
+    scheduler.add_interval_job(
+        "refresh_stale_catalog", refresh_stale_catalog, minutes=Config.CATALOG_REFRESH_INTERVAL_MINUTES
+    )
+    scheduler.add_interval_job("resume_payment_requests", resume_stale_payment_requests, minutes=1)
+    scheduler.add_interval_job("process_webhook_inbox", process_webhook_inbox, minutes=1)
+    scheduler.add_interval_job("purge_webhook_inbox", purge_processed_webhooks, hours=1)
+    scheduler.add_interval_job("materialize_schedules", materialize_due_schedules, hours=1)
+    scheduler.add_interval_job("purge_idempotency_keys", purge_expired_idempotency_keys, hours=1)
+    scheduler.start()
+    atexit.register(scheduler.shutdown)
+    return scheduler
 
 
 def main():
     app = create_app()
 
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(func=lambda: run_cleanup(app), trigger="interval", minutes=5, )
-    scheduler.start()
-
-    import atexit
-    atexit.register(lambda: scheduler.shutdown())
-
     if len(sys.argv) > 1:
         cmd = sys.argv[1]
 
@@ -79,8 +94,40 @@ def main():
                 cleanup_unpaid_reservations()
             sys.exit(0)
 
+        elif cmd == "rebuild_event_catalog":
+            with app.app_context():
+                count = rebuild_event_catalog()
+            print(f"Каталог перестроен: {count} экскурсий.")
+            sys.exit(0)
+
+        elif cmd == "reconcile_booked_seats":
+            fix = "--dry-run" not in sys.argv[2:]
+            with app.app_context():
+                drift = reconcile_booked_seats(fix=fix)
+            for item in drift:
+                print(f"Сессия {item.session_id} (экскурсия {item.event_id}): "
+                      f"счётчик {item.stored}, по броням {item.actual}")
+            action = "Исправлено" if fix else "Найдено"
+            print(f"{action} расхождений счётчика мест: {len(drift)}.")
+            sys.exit(0)
+
+        elif cmd == "materialize_schedules":
+            with app.app_context():
+                count = materialize_due_schedules()
+            print(f"Создано сессий по расписаниям: {count}.")
+            sys.exit(0)
+
+        elif cmd == "query_report":
+            print_query_report(app)
+            sys.exit(0)
+
     register_static_routes(app)
 
+    with app.app_context():
+        refresh_references()
+        build_search_index()
+
+    start_scheduler(app)
     app.run(debug=True, use_reloader=True)
 
 
@@ -4,7 +4,7 @@ from flask import Flask
 from flask_cors import CORS
 
 from .config import Config
-from .database import db, migrate
+from .database import db, migrate, register_sqlite_functions
 from .extensions import jwt, api, mail
 
 
@@ -18,6 +18,8 @@ def create_app(testing=False):
     mail.init_app(app)
     db.init_app(app)
     migrate.init_app(app, db)
+    with app.app_context():
+        register_sqlite_functions(db.engine)
 
     register_apps(app)
     if testing:
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 from yookassa import Configuration
@@ -57,6 +58,37 @@ class Config:
 
     PRODUCTION = str_to_bool(os.getenv("PRODUCTION", "False"))
 
+    CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "256"))
+    CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "60"))
+    CATALOG_REFRESH_INTERVAL_MINUTES = int(os.getenv("CATALOG_REFRESH_INTERVAL_MINUTES", "1"))
+    REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "300"))
+
+    SCHEDULE_HORIZON_DAYS = int(os.getenv("SCHEDULE_HORIZON_DAYS", "60"))
+
+    RESERVATION_HOLD_MINUTES = int(os.getenv("RESERVATION_HOLD_MINUTES", "15"))
+    HOLD_SWEEP_INTERVAL_MINUTES = int(os.getenv("HOLD_SWEEP_INTERVAL_MINUTES", "1"))
+    HOLD_SWEEP_BATCH_SIZE = int(os.getenv("HOLD_SWEEP_BATCH_SIZE", "500"))
+    WAITLIST_HOLD_MINUTES = int(os.getenv("WAITLIST_HOLD_MINUTES", "30"))
+
+    PAYMENT_WORKERS = int(os.getenv("PAYMENT_WORKERS", "4"))
+    PAYMENT_REQUEST_TIMEOUT_SECONDS = int(os.getenv("PAYMENT_REQUEST_TIMEOUT_SECONDS", "120"))
+
+    WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "200"))
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "5"))
+    WEBHOOK_INBOX_RETENTION_DAYS = int(os.getenv("WEBHOOK_INBOX_RETENTION_DAYS", "30"))
+
+    JOB_LOCK_DIR = os.getenv("JOB_LOCK_DIR", tempfile.gettempdir())
+    # Токен внешнего запуска задач (serverless-функция); без него эндпоинт запуска отключён
+    JOB_TRIGGER_TOKEN = os.getenv("JOB_TRIGGER_TOKEN")
+
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1024"))
+    # Сколько секунд выполняемый запрос удерживает ключ; после этого повтор может занять ключ сам
+    IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+    IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+
     BUCKET_NAME = os.getenv("BUCKET_NAME")
     YC_ACCESS_KEY = os.getenv("YC_ACCESS_KEY")
     YC_SECRET_KEY = os.getenv("YC_SECRET_KEY")
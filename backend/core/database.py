@@ -1,5 +1,31 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 db = SQLAlchemy()
 migrate = Migrate()
+
+
+def _py_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def _register_py_lower(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("py_lower", 1, _py_lower, deterministic=True)
+
+
+def register_sqlite_functions(engine: Engine) -> None:
+    """
+    Регистрирует в соединениях SQLite-движка приложения функцию py_lower — Unicode-версию lower():
+    штатная приводит к нижнему регистру только ASCII, из-за чего поиск по кириллице через LIKE
+    был бы регистрозависимым. Другие движки процесса и встроенная lower() не затрагиваются.
+
+    :param engine: Движок приложения (db.engine)
+    :return: None
+    """
+    if engine.dialect.name == "sqlite" and not event.contains(engine, "connect", _register_py_lower):
+        event.listen(engine, "connect", _register_py_lower)
@@ -4,10 +4,11 @@ from flask_restx import Api
 from flask_mail import Mail
 
 from backend.core import Config
+from backend.core.utilits.idempotency_utils import idempotent
 
 mail = Mail()
 
-api = Api(security='BearerAuth', title="uknoAPI", description="API для сайта ukno")
+api = Api(security='BearerAuth', title="uknoAPI", description="API для сайта ukno", decorators=[idempotent])
 api.authorizations = {
     'Bearer': {
         'type': 'apiKey',
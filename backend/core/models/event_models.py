@@ -1,9 +1,21 @@
 from datetime import datetime
+from typing import Iterable, Optional
 
-from sqlalchemy import func
+from sqlalchemy import func, literal_column
 
 from backend.core import db
 
+SEARCH_CONFIG = literal_column("'russian'")
+
+
+def title_search_vector(column):
+    """
+    Выражение tsvector для полнотекстового поиска по названию (PostgreSQL, русская морфология).
+    Должно совпадать с выражением индекса ix_events_title_tsv, иначе планировщик его не использует.
+    """
+    return func.to_tsvector(SEARCH_CONFIG, column)
+
+
 event_tags = db.Table(
     'event_tags',
     db.Column('event_id', db.Integer, db.ForeignKey('events.event_id'), primary_key=True),
@@ -97,40 +109,62 @@ class Event(db.Model):
 
     photos = db.relationship("EventPhoto", back_populates="event", cascade="all, delete-orphan", lazy=True)
     sessions = db.relationship("EventSession", back_populates="event", cascade="all, delete-orphan", lazy=True)
-    tags = db.relationship("Tag", secondary='event_tags', back_populates="events", lazy='subquery')
+    schedules = db.relationship("SessionSchedule", back_populates="event", cascade="all, delete-orphan", lazy=True)
+    tags = db.relationship("Tag", secondary='event_tags', back_populates="events", lazy=True)
 
     creator = db.relationship("User", backref="events_created", foreign_keys=[created_by])
+    catalog = db.relationship("EventCatalog", uselist=False, cascade="all, delete-orphan", lazy=True)
+
+    __table_args__ = (
+        db.Index(
+            'ix_events_title_tsv',
+            title_search_vector(title),
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+    )
 
     def __str__(self):
         return f"Event(id={self.event_id}, title={self.title})"
 
-    def to_dict(self, include_related=False):
-        data = {
-            'excursion_id': self.event_id,
-            'title': self.title,
-            'description': self.description,
-            'duration': self.duration,
-            'category': self.category.to_dict() if self.category else None,
-            'format_type': self.format_type.to_dict() if self.format_type else None,
-            'age_category': self.age_category.to_dict() if self.age_category else None,
-            'created_by': self.creator.email if self.creator else None,
-            'is_active': self.is_active,
-            'place': self.place,
-            'conducted_by': self.conducted_by,
-            'working_hours': self.working_hours,
-            'contact_email': self.contact_email,
-            'iframe_url': self.iframe_url,
-            'telegram': self.telegram,
-            'vk': self.vk,
-            "distance_to_center": self.distance_to_center,
-            "time_to_nearest_stop": self.time_to_nearest_stop,
-            'photos': [photo.to_dict() for photo in self.photos],
-            'sessions': [
-                session.to_dict()
-                for session in sorted(self.sessions, key=lambda s: s.start_datetime)
+    SERIALIZABLE_FIELDS = (
+        'title', 'description', 'duration', 'is_active', 'place', 'conducted_by', 'working_hours',
+        'contact_email', 'iframe_url', 'telegram', 'vk', 'distance_to_center', 'time_to_nearest_stop'
+    )
+    SERIALIZABLE_INCLUDES = ('category', 'format_type', 'age_category', 'created_by', 'photos', 'sessions', 'tags')
+
+    def to_dict(
+            self,
+            include_related=False,
+            fields: Optional[Iterable[str]] = None,
+            include: Optional[Iterable[str]] = None
+    ):
+        """
+        Сериализует экскурсию.
+
+        :param include_related: Добавить бронирования всех сессий (для резидента/админа)
+        :param fields: Какие поля из SERIALIZABLE_FIELDS вернуть (None — все)
+        :param include: Какие связанные данные из SERIALIZABLE_INCLUDES вернуть (None — все).
+                        Не перечисленные связи не читаются и поэтому не подгружаются из БД.
+        :return: Словарь с данными экскурсии
+        """
+        fields = self.SERIALIZABLE_FIELDS if fields is None else fields
+        include = self.SERIALIZABLE_INCLUDES if include is None else include
+
+        related = {
+            'category': lambda: self.category.to_dict() if self.category else None,
+            'format_type': lambda: self.format_type.to_dict() if self.format_type else None,
+            'age_category': lambda: self.age_category.to_dict() if self.age_category else None,
+            'created_by': lambda: self.creator.email if self.creator else None,
+            'photos': lambda: [photo.to_dict() for photo in self.photos],
+            'sessions': lambda: [
+                session.to_dict() for session in sorted(self.sessions, key=lambda s: s.start_datetime)
             ],
-            'tags': [tag.to_dict() for tag in self.tags]
+            'tags': lambda: [tag.to_dict() for tag in self.tags],
         }
+
+        data = {'excursion_id': self.event_id}
+        data.update({name: getattr(self, name) for name in fields})
+        data.update({name: related[name]() for name in include})
         if include_related:
             data['reservations'] = [
                 reservation.to_dict()
@@ -176,8 +210,14 @@ class EventSession(db.Model):
     start_datetime = db.Column(db.DateTime, nullable=False, default=datetime.now)
     max_participants = db.Column(db.Integer, nullable=False)
     cost = db.Column(db.Numeric(10, 2), nullable=False, default=0.00)
+    # сумма participants_count неотменённых броней; меняется сервисами бронирования (см. seat_counter)
+    booked_seats = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    schedule_id = db.Column(
+        db.Integer, db.ForeignKey('session_schedules.schedule_id', ondelete='SET NULL'), nullable=True
+    )
 
     event = db.relationship("Event", back_populates="sessions")
+    schedule = db.relationship("SessionSchedule", back_populates="sessions")
     reservations = db.relationship(
         "Reservation",
         back_populates="session",
@@ -185,6 +225,12 @@ class EventSession(db.Model):
         lazy=True
     )
     payments = db.relationship("Payment", back_populates="session")
+    waitlist = db.relationship("WaitlistEntry", back_populates="session", cascade="all, delete-orphan", lazy=True)
+
+    __table_args__ = (
+        # одно вхождение расписания — одна сессия (повторная материализация идёт через ON CONFLICT DO NOTHING)
+        db.UniqueConstraint('schedule_id', 'start_datetime', name='uq_event_sessions_schedule_start'),
+    )
 
     __mapper_args__ = {
         "confirm_deleted_rows": False
@@ -195,29 +241,66 @@ class EventSession(db.Model):
                f"start_datetime={self.start_datetime}, max_participants={self.max_participants}, " \
                f"cost={self.cost})"
 
-    def booked_count(self):
-        return db.session.query(
-            func.coalesce(func.sum(Reservation.participants_count), 0)
-        ).filter_by(
-            session_id=self.session_id,
-            is_cancelled=False
-        ).scalar()
-
     def to_dict(self):
-        booked = self.booked_count()
         return {
             'session_id': self.session_id,
+            'schedule_id': self.schedule_id,
             'start_datetime': self.start_datetime.isoformat(),
             'max_participants': self.max_participants,
             'cost': str(self.cost),
-            'booked': booked,
-            'available': self.max_participants - booked
+            'booked': self.booked_seats,
+            'available': self.max_participants - self.booked_seats
+        }
+
+
+class SessionSchedule(db.Model):
+    """
+    Повторяющееся расписание сессий экскурсии: правило RRULE (RFC 5545), время начала и дата окончания.
+
+    Сессии по расписанию создаются заранее на скользящий горизонт (см. materialize_schedules);
+    materialized_until — момент, до которого сессии уже созданы.
+    """
+    __tablename__ = 'session_schedules'
+
+    schedule_id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.event_id'), nullable=False, index=True)
+    rrule = db.Column(db.String(255), nullable=False)
+    start_time = db.Column(db.Time, nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    until_date = db.Column(db.Date, nullable=True)
+    max_participants = db.Column(db.Integer, nullable=False)
+    cost = db.Column(db.Numeric(10, 2), nullable=False, default=0.00)
+    materialized_until = db.Column(db.DateTime, nullable=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    event = db.relationship("Event", back_populates="schedules")
+    sessions = db.relationship("EventSession", back_populates="schedule", passive_deletes=True)
+
+    def __str__(self):
+        return f"SessionSchedule(id={self.schedule_id}, event_id={self.event_id}, rrule={self.rrule})"
+
+    def to_dict(self):
+        return {
+            'schedule_id': self.schedule_id,
+            'event_id': self.event_id,
+            'rrule': self.rrule,
+            'start_time': self.start_time.strftime('%H:%M'),
+            'start_date': self.start_date.isoformat(),
+            'until_date': self.until_date.isoformat() if self.until_date else None,
+            'max_participants': self.max_participants,
+            'cost': str(self.cost),
+            'materialized_until': self.materialized_until.isoformat() if self.materialized_until else None,
         }
 
 
 class Reservation(db.Model):
     __tablename__ = 'reservations'
 
+    PAYMENT_QUEUED = 'queued'
+    PAYMENT_PROCESSING = 'processing'
+    PAYMENT_READY = 'ready'
+    PAYMENT_FAILED = 'failed'
+
     reservation_id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('event_sessions.session_id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
@@ -230,11 +313,27 @@ class Reservation(db.Model):
     participants_count = db.Column(db.Integer, nullable=False, default=1)
     is_cancelled = db.Column(db.Boolean, default=False)
     is_paid = db.Column(db.Boolean, default=False)
+    # до этого момента неоплаченная бронь удерживает места; у оплаченных и бесплатных — NULL
+    expires_at = db.Column(db.DateTime, nullable=True)
+    # создание платежа YooKassa в фоновом пуле (см. payment_queue); у бесплатных броней — NULL
+    payment_state = db.Column(db.String(20), nullable=True)
+    payment_requested_at = db.Column(db.DateTime, nullable=True)
+    payment_url = db.Column(db.String(1000), nullable=True)
 
     session = db.relationship("EventSession", back_populates="reservations")
     user = db.relationship("User", back_populates="reservations")
     payment = db.relationship("Payment", back_populates="reservation", uselist=False)
 
+    __table_args__ = (
+        # частичный индекс только по действующим удержаниям для очистки истёкших
+        # (expires_at IS NULL у броней, созданных до появления колонки, — по booked_at)
+        db.Index(
+            'ix_reservations_unpaid_holds', 'expires_at', 'booked_at',
+            postgresql_where=db.text('NOT is_paid AND NOT is_cancelled'),
+            sqlite_where=db.text('NOT is_paid AND NOT is_cancelled')
+        ),
+    )
+
     def __str__(self):
         return (f"Reservation(id={self.reservation_id}, session_id={self.session_id}, "
                 f"user_id={self.user_id}, full_name={self.full_name}, phone={self.phone_number}, "
@@ -255,6 +354,8 @@ class Reservation(db.Model):
             'participants_count': self.participants_count,
             'is_cancelled': self.is_cancelled,
             'is_paid': self.is_paid,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'payment_url': self.payment_url if not self.is_paid else None,
             'excursion_title': (
                 self.session.event.title
                 if self.session and self.session.event else None
@@ -284,6 +385,8 @@ class Reservation(db.Model):
             'participants_count': self.participants_count,
             'is_cancelled': self.is_cancelled,
             'is_paid': self.is_paid,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'payment_url': self.payment_url if not self.is_paid else None,
             'excursion_title': (
                 self.session.event.title
                 if self.session and self.session.event else None
@@ -324,13 +427,75 @@ class Payment(db.Model):
     session = db.relationship("EventSession", back_populates="payments")
 
 
+class WaitlistEntry(db.Model):
+    """
+    Заявка в лист ожидания заполненной сессии.
+
+    Заявки продвигаются строго по очереди (entry_id) при освобождении мест: продвинутая заявка
+    получает бронь-удержание (см. promote_waitlist), её ID хранится в reservation_id.
+    """
+    __tablename__ = 'session_waitlist'
+
+    WAITING = 'waiting'
+    PROMOTED = 'promoted'
+    EXPIRED = 'expired'
+    LEFT = 'left'
+
+    entry_id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(
+        db.Integer, db.ForeignKey('event_sessions.session_id', ondelete='CASCADE'), nullable=False
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False, index=True)
+    full_name = db.Column(db.String(255), nullable=False)
+    phone_number = db.Column(db.String(50), nullable=False)
+    email = db.Column(db.String(255), nullable=False)
+    participants_count = db.Column(db.Integer, nullable=False, default=1)
+    status = db.Column(db.String(20), nullable=False, default=WAITING)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    promoted_at = db.Column(db.DateTime, nullable=True)
+    reservation_id = db.Column(
+        db.Integer, db.ForeignKey('reservations.reservation_id', ondelete='SET NULL'), nullable=True
+    )
+
+    session = db.relationship("EventSession", back_populates="waitlist")
+    user = db.relationship(
+        "User", backref=db.backref("waitlist_entries", cascade="all, delete-orphan", lazy=True)
+    )
+
+    __table_args__ = (
+        # очередь сессии: ожидающие заявки в порядке entry_id
+        db.Index('ix_session_waitlist_queue', 'session_id', 'status', 'entry_id'),
+    )
+
+    def __str__(self):
+        return f"WaitlistEntry(id={self.entry_id}, session_id={self.session_id}, " \
+               f"user_id={self.user_id}, participants={self.participants_count}, status={self.status})"
+
+    def to_dict(self, position: Optional[int] = None):
+        return {
+            'entry_id': self.entry_id,
+            'session_id': self.session_id,
+            'excursion_title': self.session.event.title if self.session and self.session.event else None,
+            'session_start_datetime': self.session.start_datetime.isoformat() if self.session else None,
+            'full_name': self.full_name,
+            'phone_number': self.phone_number,
+            'email': self.email,
+            'participants_count': self.participants_count,
+            'status': self.status,
+            'position': position,
+            'created_at': self.created_at.isoformat(),
+            'promoted_at': self.promoted_at.isoformat() if self.promoted_at else None,
+            'reservation_id': self.reservation_id,
+        }
+
+
 class Tag(db.Model):
     __tablename__ = 'tags'
 
     tag_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
 
-    events = db.relationship("Event", secondary=event_tags, back_populates="tags", lazy='subquery')
+    events = db.relationship("Event", secondary=event_tags, back_populates="tags", lazy=True)
 
     def __str__(self):
         return f"Tag(id={self.tag_id}, name={self.name})"
@@ -340,3 +505,41 @@ class Tag(db.Model):
             'tag_id': self.tag_id,
             'name': self.name,
         }
+
+
+class EventCatalog(db.Model):
+    """
+    Денормализованная проекция каталога: одна строка на активную экскурсию с будущими сессиями.
+
+    Хранит агрегаты по будущим сессиям, имена справочников и теги, чтобы публичный каталог
+    фильтровался и сортировался по одной индексированной таблице. Поддерживается сервисом
+    event_catalog при каждом изменении экскурсий, сессий и бронирований.
+
+    version — счётчик изменений строки: бронирования меняют только версию своей экскурсии,
+    поэтому не блокируют общую версию EVENTS_SCOPE и не сбрасывают кэши других экскурсий.
+    """
+    __tablename__ = 'event_catalog'
+
+    event_id = db.Column(db.Integer, db.ForeignKey('events.event_id'), primary_key=True)
+    title = db.Column(db.String(255), nullable=False)
+
+    category_id = db.Column(db.Integer, nullable=False)
+    category_name = db.Column(db.String(255), nullable=False, index=True)
+    format_type_id = db.Column(db.Integer, nullable=False)
+    format_type_name = db.Column(db.String(255), nullable=False, index=True)
+    age_category_id = db.Column(db.Integer, nullable=False)
+    age_category_name = db.Column(db.String(255), nullable=False, index=True)
+
+    duration = db.Column(db.Integer, nullable=False, index=True)
+    distance_to_center = db.Column(db.Float, nullable=True)
+    time_to_nearest_stop = db.Column(db.Float, nullable=True)
+
+    min_cost = db.Column(db.Numeric(10, 2), nullable=False, index=True)
+    min_date = db.Column(db.DateTime, nullable=False, index=True)
+    tag_names = db.Column(db.JSON, nullable=False, default=list)
+
+    version = db.Column(db.BigInteger, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __str__(self):
+        return f"EventCatalog(event_id={self.event_id}, title={self.title}, min_date={self.min_date})"
@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from backend.core import db
+
+
+class DataVersion(db.Model):
+    """
+    Счётчик изменений для группы данных (scope).
+
+    Увеличивается в той же транзакции, что и изменение данных, поэтому все процессы
+    приложения видят одинаковую версию и могут по ней инвалидировать кэши и строить ETag.
+    """
+    __tablename__ = 'data_versions'
+
+    scope = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    def __str__(self):
+        return f"DataVersion(scope={self.scope}, version={self.version})"
+
+
+class JobRunStats(db.Model):
+    """
+    Сводная статистика запусков периодической задачи по всему кластеру.
+
+    Обновляется процессом-лидером планировщика после каждого запуска (см. ClusterScheduler).
+    overlaps — сколько раз очередной запуск пропущен, потому что предыдущий ещё не завершился.
+    """
+    __tablename__ = 'job_run_stats'
+
+    job_name = db.Column(db.String(100), primary_key=True)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)
+    overlaps = db.Column(db.Integer, nullable=False, default=0)
+    total_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    max_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    last_seconds = db.Column(db.Float, nullable=True)
+    last_started_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    last_runner = db.Column(db.String(255), nullable=True)
+
+    def __str__(self):
+        return f"JobRunStats(job_name={self.job_name}, runs={self.runs})"
+
+    def to_dict(self):
+        return {
+            'job_name': self.job_name,
+            'runs': self.runs,
+            'failures': self.failures,
+            'overlaps': self.overlaps,
+            'avg_seconds': round(self.total_seconds / self.runs, 4) if self.runs else None,
+            'max_seconds': round(self.max_seconds, 4),
+            'last_seconds': round(self.last_seconds, 4) if self.last_seconds is not None else None,
+            'last_started_at': self.last_started_at.isoformat() if self.last_started_at else None,
+            'last_error': self.last_error,
+            'last_runner': self.last_runner,
+        }
+
+
+class IdempotencyKey(db.Model):
+    """
+    Результат мутирующего запроса с заголовком Idempotency-Key (см. idempotency_utils).
+
+    Ключ действует в пределах владельца (JWT identity; анонимные запросы ключи не используют).
+    Пока запрос выполняется, status_code равен NULL, а locked_until — срок, до которого ключ
+    удерживает выполняющий его процесс; после выполнения хранится ответ, который отдаётся
+    повторам до expires_at.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    owner = db.Column(db.String(255), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    method = db.Column(db.String(10), nullable=False)
+    path = db.Column(db.String(500), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+
+    def __str__(self):
+        return f"IdempotencyKey(owner={self.owner}, key={self.key}, status_code={self.status_code})"
+
+
+class WebhookInbox(db.Model):
+    """
+    Входящий вебхук платёжного провайдера, сохранённый до обработки (см. webhook_inbox).
+
+    Одно событие об одном объекте хранится один раз (уникальность event + object_id), поэтому
+    повторные доставки провайдера не обрабатываются заново. События одного платежа (payment_id)
+    обрабатываются в порядке inbox_id.
+    """
+    __tablename__ = 'webhook_inbox'
+
+    inbox_id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(50), nullable=False)
+    object_id = db.Column(db.String(100), nullable=False)
+    payment_id = db.Column(db.String(100), nullable=True)
+    payload = db.Column(db.Text, nullable=False)
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('event', 'object_id', name='uq_webhook_inbox_event_object'),
+        # частичный индекс по необработанным событиям для выборки очереди
+        db.Index(
+            'ix_webhook_inbox_pending', 'inbox_id',
+            postgresql_where=db.text('processed_at IS NULL'),
+            sqlite_where=db.text('processed_at IS NULL')
+        ),
+    )
+
+    def __str__(self):
+        return f"WebhookInbox(id={self.inbox_id}, event={self.event}, object_id={self.object_id})"
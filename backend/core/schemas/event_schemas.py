@@ -29,6 +29,10 @@ cancel_model = api.model('CancelReservationRequest', {
     'reservation_id': fields.Integer(required=True, description='ID бронирования')
 })
 
+waitlist_leave_model = api.model('LeaveWaitlistRequest', {
+    'entry_id': fields.Integer(required=True, description='ID заявки в листе ожидания')
+})
+
 event_model = api.model('Event', {
     'excursion_id': fields.Integer(readonly=True, description='ID экскурсии'),
     'title': fields.String(required=True, description='Название экскурсии'),
@@ -66,6 +70,14 @@ event_create_model = api.model('EventCreate', {
         'max_participants': fields.Integer(description='Макс. участников'),
         'cost': fields.Float(description='Стоимость'),
     }))),
+    'schedules': fields.List(fields.Nested(api.model('ScheduleInput', {
+        'rrule': fields.String(required=True, description='Правило повторения RRULE', example='FREQ=WEEKLY;BYDAY=SA'),
+        'start_time': fields.String(required=True, description='Время начала сессий (HH:MM)', example='11:00'),
+        'start_date': fields.String(description='Дата начала расписания (ISO)'),
+        'until_date': fields.String(description='Последняя дата сессий (ISO)'),
+        'max_participants': fields.Integer(required=True, description='Макс. участников'),
+        'cost': fields.Float(description='Стоимость'),
+    }))),
     'tags': fields.List(fields.String(description='Теги')),
 })
 
@@ -82,6 +94,28 @@ session_patch_model = api.model('EventSessionPatch', {
     'max_participants': fields.Integer(description='Максимальное количество участников', example=20),
     'cost': fields.Float(description='Стоимость участия в рублях', example=500)
 })
+
+schedule_model = api.model('SessionSchedule', {
+    'schedule_id': fields.Integer(readonly=True, description='ID расписания'),
+    'rrule': fields.String(required=True, description='Правило повторения RRULE (RFC 5545)',
+                           example='FREQ=WEEKLY;BYDAY=SA,SU'),
+    'start_time': fields.String(required=True, description='Время начала сессий (HH:MM)', example='11:00'),
+    'start_date': fields.String(description='Дата начала расписания (ISO), по умолчанию сегодня',
+                                example='2025-06-01'),
+    'until_date': fields.String(description='Последняя дата сессий (ISO), пусто — бессрочно',
+                                example='2025-09-30'),
+    'max_participants': fields.Integer(required=True, description='Максимум участников', example=20),
+    'cost': fields.Float(description='Стоимость участия в рублях', example=500),
+})
+
+schedule_patch_model = api.model('SessionSchedulePatch', {
+    'rrule': fields.String(description='Правило повторения RRULE (RFC 5545)'),
+    'start_time': fields.String(description='Время начала сессий (HH:MM)'),
+    'start_date': fields.String(description='Дата начала расписания (ISO)'),
+    'until_date': fields.String(description='Последняя дата сессий (ISO)'),
+    'max_participants': fields.Integer(description='Максимум участников'),
+    'cost': fields.Float(description='Стоимость участия в рублях'),
+})
 photo_model = api.model('Photo', {
     'photo_id': fields.Integer(readonly=True, description='ID фото'),
     'filename': fields.String(description='Имя файла'),
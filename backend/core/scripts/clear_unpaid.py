@@ -1,21 +1,13 @@
-from datetime import datetime, timedelta
-
-from backend.core import db, create_app
-from backend.core.models.event_models import Reservation
+from backend.core import create_app
+from backend.core.services.reservation_service.seat_holds import sweep_expired_holds
 
 
 def cleanup_unpaid_reservations():
-    threshold = datetime.now() - timedelta(minutes=15)
-    unpaid_old = Reservation.query.filter(
-        ~Reservation.is_paid,
-        Reservation.booked_at < threshold,
-        ~Reservation.is_cancelled
-    ).all()
-
-    for reservation in unpaid_old:
-        db.session.delete(reservation)
-    db.session.commit()
-    print(f"Удалено {len(unpaid_old)} неоплаченных броней старше 15 минут.")
+    stats = sweep_expired_holds()
+    print(f"Освобождено {stats.reservations} неоплаченных броней с истёкшим удержанием мест, "
+          f"удалено {stats.payments} осиротевших платежей за {stats.seconds:.2f} с "
+          f"({stats.rows_per_second:.0f} строк/с).")
+    return stats
 
 
 if __name__ == "__main__":
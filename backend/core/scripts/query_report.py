@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+from typing import List, Optional, Tuple, Iterator
+
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event as sa_event, func
+
+from backend.core import db
+from backend.core.models.event_models import Event, EventSession
+
+# (имя, роль токена, URL) — эндпоинты, которые читают экскурсии разными стратегиями загрузки
+REPORT_ENDPOINTS: Tuple[Tuple[str, Optional[str], str], ...] = (
+    ("catalog", None, "/api/user/excursions"),
+    ("detail", None, "/api/user/excursions_detail/{event_id}"),
+    ("admin_list", "admin", "/api/admin/excursions"),
+    ("admin_detail", "admin", "/api/admin/excursions/{event_id}"),
+    ("resident_list", "resident", "/api/resident/excursions"),
+    ("resident_detail", "resident", "/api/resident/excursions/{event_id}"),
+    ("resident_sessions", "resident", "/api/resident/excursions/{event_id}/sessions"),
+    ("resident_photos", "resident", "/api/resident/excursions/{event_id}/photos"),
+)
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """
+    Собирает SQL-запросы, выполненные внутри блока.
+
+    :return: Список текстов запросов (заполняется по мере выполнения)
+    """
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    sa_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        sa_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def collect_query_report(app: Flask) -> List[Tuple[str, str, int, int]]:
+    """
+    Выполняет GET-запросы к эндпоинтам экскурсий и считает SQL-запросы каждого из них.
+
+    Для эндпоинтов одной экскурсии берётся экскурсия с наибольшим числом сессий;
+    резидентские эндпоинты вызываются от имени её создателя.
+
+    :param app: Flask-приложение
+    :return: Список кортежей (имя, URL, HTTP-статус, число запросов)
+    """
+    with app.app_context():
+        event = (
+            Event.query.outerjoin(Event.sessions)
+            .group_by(Event.event_id)
+            .order_by(func.count(EventSession.session_id).desc(), Event.event_id)
+            .first()
+        )
+        if event is None:
+            return []
+        event_id = event.event_id
+        owner_email = event.creator.email if event.creator else None
+        tokens = {
+            "admin": create_access_token(identity=owner_email, additional_claims={"role": "admin"}),
+            "resident": create_access_token(identity=owner_email, additional_claims={"role": "resident"}),
+        }
+        db.session.remove()
+
+        client = app.test_client()
+        report = []
+        for name, role, url_template in REPORT_ENDPOINTS:
+            url = url_template.format(event_id=event_id)
+            headers = {"Authorization": f"Bearer {tokens[role]}"} if role else {}
+            with count_queries() as statements:
+                response = client.get(url, headers=headers)
+            db.session.remove()
+            report.append((name, url, response.status_code, len(statements)))
+        return report
+
+
+def print_query_report(app: Flask) -> None:
+    """
+    Печатает таблицу «эндпоинт — число SQL-запросов».
+
+    :param app: Flask-приложение
+    :return: None
+    """
+    report = collect_query_report(app)
+    if not report:
+        print("В базе нет экскурсий, отчёт не построен.")
+        return
+
+    width = max(len(url) for _, url, _, _ in report)
+    print(f"{'endpoint':<20} {'url':<{width}} {'status':>6} {'queries':>7}")
+    for name, url, status, queries in report:
+        print(f"{name:<20} {url:<{width}} {status:>6} {queries:>7}")
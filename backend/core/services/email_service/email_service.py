@@ -280,6 +280,53 @@ def send_reservation_refund_email(reservation):
         print(f"Ошибка при отправке письма о возврате: {e}")
 
 
+def send_waitlist_promotion_email(recipient, full_name, event_title, session_start, participants_count,
+                                  reservation_id, hold_until=None):
+    session_time = session_start.strftime('%d.%m.%Y в %H:%M')
+
+    if hold_until is None:
+        subject = "Место из листа ожидания — вы записаны"
+        action_text = "Экскурсия бесплатная, поэтому бронирование уже подтверждено."
+    else:
+        subject = "Место из листа ожидания — оплатите бронирование"
+        action_text = (
+            f"Места удерживаются за вами до {hold_until.strftime('%d.%m.%Y %H:%M')}. "
+            f"Оплатите бронирование в личном кабинете, иначе места перейдут следующему в очереди."
+        )
+
+    body_text = (
+        f"Здравствуйте, {full_name}!\n\n"
+        f"В сессии события «{event_title}» на {session_time} освободились места, "
+        f"и ваша заявка из листа ожидания превращена в бронирование №{reservation_id}.\n"
+        f"Количество участников: {participants_count}\n\n"
+        f"{action_text}\n\n"
+        f"С уважением,\nКоманда поддержки"
+    )
+
+    body_html = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; font-size: 15px; color: #333;">
+            <p>Здравствуйте, <strong>{full_name}</strong>!</p>
+
+            <p>В сессии события <strong>«{event_title}»</strong> (на <strong>{session_time}</strong>)
+            освободились места, и ваша заявка из листа ожидания превращена в бронирование
+            <strong>№{reservation_id}</strong>.</p>
+
+            <p><strong>Количество участников:</strong> {participants_count}</p>
+
+            <p>{action_text}</p>
+
+            <p><em>С уважением,<br>Команда поддержки</em></p>
+        </body>
+    </html>
+    """
+
+    try:
+        send_email(subject=subject, recipient=recipient, body=body_text, attachments=None, body_html=body_html)
+    except Exception as e:
+        print(f"Ошибка при отправке письма о месте из листа ожидания: {e}")
+
+
 def send_reset_email(user):
     token = generate_reset_token(user.email)
     reset_url = f"{Config.FRONTEND_URL}reset-password?token={token}"
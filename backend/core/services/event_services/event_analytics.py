@@ -3,7 +3,7 @@ from typing import Dict, Any
 from sqlalchemy import func
 
 from backend.core import db
-from backend.core.models.event_models import Event, Reservation, EventSession
+from backend.core.models.event_models import Event, EventSession
 
 
 def get_resident_event_analytics(resident_id: int) -> Dict[str, Any]:
@@ -15,7 +15,14 @@ def get_resident_event_analytics(resident_id: int) -> Dict[str, Any]:
     :param resident_id: ID резидента
     :return: Словарь с общей статистикой и деталями по каждой экскурсии
     """
-    events = db.session.query(Event).filter_by(created_by=resident_id).all()
+    events = db.session.query(
+        Event.event_id,
+        Event.title,
+        func.count(EventSession.session_id).label("session_count"),
+        func.coalesce(func.sum(EventSession.booked_seats), 0).label("total_participants")
+    ).outerjoin(EventSession).filter(
+        Event.created_by == resident_id
+    ).group_by(Event.event_id, Event.title).order_by(Event.event_id).all()
 
     if not events:
         return {"message": "У вас пока нет экскурсий", "stats": []}
@@ -26,13 +33,8 @@ def get_resident_event_analytics(resident_id: int) -> Dict[str, Any]:
     max_participants = 0
 
     for event in events:
-        session_count = len(event.sessions)
-        excursion_total_participants = db.session.query(
-            func.coalesce(func.sum(Reservation.participants_count), 0)
-        ).join(EventSession).filter(
-            EventSession.event_id == event.event_id,
-            ~Reservation.is_cancelled
-        ).scalar()
+        session_count = event.session_count
+        excursion_total_participants = int(event.total_participants)
 
         if excursion_total_participants > max_participants:
             most_popular = event
@@ -5,19 +5,47 @@ from typing import Optional, List, Tuple, Dict, Any
 
 from flask import request
 from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import func
 
-from backend.core.models.event_models import Event
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.event_models import Event, EventSession, EventCatalog
 from backend.core.services.event_services.event_crud import create_event
+from backend.core.services.event_services.event_fields import Fieldset, includes_sessions, load_upcoming_sessions
+from backend.core.services.event_services.event_loading import event_query
 from backend.core.services.event_services.event_filters import apply_category_filters, apply_format_filters, \
-    apply_age_filters, apply_tag_filters, apply_numeric_filters, apply_date_filters, filter_by_title, filter_sessions, \
-    build_event_session_subquery
-from backend.core.services.event_services.event_sorting import apply_sorting
+    apply_age_filters, apply_tag_filters, apply_numeric_filters, apply_date_filters, apply_title_filters
+from backend.core.services.event_services.event_pagination import paginate_keyset
+from backend.core.services.event_services.event_sorting import apply_order, build_sort_columns
+from backend.core.services.reservation_service.seat_holds import release_expired_holds
+from backend.core.utilits.cache import TTLCache
+from backend.core.utilits.version_utils import get_data_version, EVENTS_SCOPE
 
+LIST_FILTER_KEYS = ("category", "format_type", "age_category", "tags")
 
-def list_events(filters: Dict[str, Any], sort_key: Optional[str] = None) -> List[Event]:
+catalog_cache = TTLCache("catalog", maxsize=Config.CATALOG_CACHE_SIZE, ttl=Config.CATALOG_CACHE_TTL)
+
+
+def list_events(
+        filters: Dict[str, Any],
+        sort_key: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Fieldset = None,
+        include: Fieldset = None,
+        sessions_limit: Optional[int] = None
+) -> Tuple[List[Event], Optional[str]]:
     """
     Получает список экскурсий с применением фильтров и сортировки.
 
+    Фильтры и сортировка выполняются по денормализованной таблице event_catalog
+    (одна строка на активную экскурсию с будущими сессиями), поэтому запрос не агрегирует
+    сессии и не соединяет справочники.
+
+    Если указан limit, возвращается одна страница: позиция задаётся курсором по значениям
+    колонок сортировки (с event_id в качестве последнего ключа), поэтому любая страница
+    стоит столько же, сколько первая.
+
     :param filters: Словарь фильтров. Возможные ключи:
         - category, format_type, age_category, tags
         - min_duration, max_duration
@@ -27,25 +55,184 @@ def list_events(filters: Dict[str, Any], sort_key: Optional[str] = None) -> List
         - start_date, end_date
         - title
     :param sort_key: Ключ сортировки. Можно с "-", например: "-price", "-time".
-    :return: Список объектов Event, удовлетворяющих фильтрам.
+    :param limit: Размер страницы. Если не указан, возвращаются все экскурсии.
+    :param cursor: Курсор следующей страницы из предыдущего ответа.
+    :param fields: Поля экскурсии, которые будут сериализованы (None — все).
+    :param include: Связи экскурсии, которые будут сериализованы (None — все); остальные не загружаются.
+    :param sessions_limit: Сколько ближайших сессий загрузить для каждой экскурсии (None — все будущие).
+    :return: Кортеж (список объектов Event, курсор следующей страницы или None).
+             У экскурсий загружены только будущие сессии; прошедшие из БД не читаются.
+    :raises ValueError: если курсор некорректен.
     """
     now = datetime.now()
-    subquery = build_event_session_subquery(now)
-    query = Event.query.join(subquery, Event.event_id == subquery.c.event_id)
+    query = event_query(
+        "catalog", fields=fields, include=include, upcoming_after=now, sessions_limit=sessions_limit
+    ).join(EventCatalog, Event.event_id == EventCatalog.event_id)
 
     query = apply_category_filters(query, filters)
     query = apply_format_filters(query, filters)
     query = apply_age_filters(query, filters)
     query = apply_tag_filters(query, filters)
-    query = apply_numeric_filters(query, filters, subquery)
-    query = apply_date_filters(query, filters, subquery)
-    query = apply_sorting(query, sort_key, subquery)
+    query = apply_numeric_filters(query, filters)
+    query = apply_date_filters(query, filters)
+    query = apply_title_filters(query, filters)
+
+    sort_columns = build_sort_columns(sort_key) + [(Event.event_id, False)]
+    next_cursor = None
+    if limit is None:
+        events = apply_order(query, sort_columns).all()
+    else:
+        events, next_cursor = paginate_keyset(query, sort_columns, sort_key, limit, cursor)
+
+    if sessions_limit is not None and includes_sessions(include):
+        load_upcoming_sessions(events, now, sessions_limit)
+
+    return events, next_cursor
+
+
+def normalize_filters(filters: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Приводит фильтры каталога к каноническому виду для ключа кэша.
+
+    Пустые значения отбрасываются, строки обрезаются, списки через запятую
+    (категории, форматы, возраст, теги) сортируются и очищаются от повторов.
+
+    :param filters: Словарь фильтров в формате list_events
+    :return: Отсортированный кортеж пар (ключ, значение)
+    """
+    items = []
+    for key, value in filters.items():
+        value = str(value).strip() if value is not None else ""
+        if key in LIST_FILTER_KEYS:
+            value = ",".join(sorted({v.strip() for v in value.split(",") if v.strip()}))
+        if value:
+            items.append((key, value))
+    return tuple(sorted(items))
+
+
+def get_catalog_version() -> Tuple[int, int]:
+    """
+    Возвращает версию данных каталога, только читая её (без записи в БД).
+
+    Версия — общая версия EVENTS_SCOPE (структурные изменения и состав каталога) и сумма версий
+    строк event_catalog: любая пересчитанная строка увеличивает сумму, не трогая общую версию.
+    Используется как ключ кэша каталога и как основа ETag списка экскурсий. Строки с начавшейся
+    ближайшей сессией пересчитывает фоновая задача refresh_stale_catalog, и версия меняется вместе с ними.
+
+    :return: Кортеж (версия EVENTS_SCOPE, сумма версий строк каталога)
+    """
+    rows_version = db.session.query(func.coalesce(func.sum(EventCatalog.version), 0)).scalar()
+    return get_data_version(EVENTS_SCOPE), int(rows_version)
+
+
+def get_event_version(event_id: int) -> Tuple[int, int, int, Optional[datetime]]:
+    """
+    Возвращает дешёвую версию карточки экскурсии для ETag.
+
+    Бронирования меняют только версию строки каталога этой экскурсии, поэтому ETag других
+    карточек они не затрагивают. Кроме счётчиков учитывается начало ближайшей будущей сессии:
+    когда она начинается, она пропадает из карточки, и версия меняется без записи в БД.
+
+    :param event_id: ID экскурсии
+    :return: Кортеж (версия EVENTS_SCOPE, версия строки каталога или 0, ID экскурсии,
+             начало ближайшей будущей сессии)
+    """
+    next_start = db.session.query(func.min(EventSession.start_datetime)).filter(
+        EventSession.event_id == event_id,
+        EventSession.start_datetime > datetime.now()
+    ).scalar()
+    row_version = db.session.query(EventCatalog.version).filter_by(event_id=event_id).scalar()
+    return get_data_version(EVENTS_SCOPE), row_version or 0, event_id, next_start
+
+
+def get_catalog_page(
+        filters: Dict[str, Any],
+        sort_key: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Fieldset = None,
+        include: Fieldset = None,
+        sessions_limit: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Возвращает сериализованную страницу каталога, используя кэш ответов list_events.
+
+    Ключ кэша — версия каталога (get_catalog_version), нормализованные фильтры, сортировка, параметры
+    страницы и набор полей. Версия меняется в той же транзакции, что и любое изменение экскурсий,
+    сессий или бронирований, поэтому после записи старые записи кэша больше не используются
+    ни одним процессом, а вытесняются по LRU/TTL.
+
+    :param filters: Словарь фильтров (см. list_events)
+    :param sort_key: Ключ сортировки
+    :param limit: Размер страницы
+    :param cursor: Курсор следующей страницы
+    :param fields: Поля экскурсии (None — все)
+    :param include: Связи экскурсии (None — все)
+    :param sessions_limit: Сколько ближайших сессий вернуть для каждой экскурсии (None — все будущие)
+    :return: Кортеж (список экскурсий в формате Event.to_dict(), курсор следующей страницы или None)
+    :raises ValueError: если курсор некорректен
+    """
+    key = (
+        get_catalog_version(), normalize_filters(filters), sort_key or "", limit, cursor or "",
+        fields, include, sessions_limit
+    )
+
+    page = catalog_cache.get(key)
+    if page is None:
+        events, next_cursor = list_events(filters, sort_key, limit, cursor, fields, include, sessions_limit)
+        page = (serialize_events(events, fields, include), next_cursor)
+        catalog_cache.set(key, page)
+    return page
 
-    events = query.all()
-    events = filter_by_title(events, filters)
-    events = filter_sessions(events, now)
 
-    return events
+def get_public_event(
+        event_id: int,
+        fields: Fieldset = None,
+        include: Fieldset = None,
+        sessions_limit: Optional[int] = None
+) -> Optional[Event]:
+    """
+    Загружает экскурсию для карточки, подгружая только запрошенные поля и связи
+    и только предстоящие сессии. Истёкшие удержания мест экскурсии перед этим освобождаются.
+
+    :param event_id: ID экскурсии
+    :param fields: Поля экскурсии (None — все)
+    :param include: Связи экскурсии (None — все)
+    :param sessions_limit: Сколько ближайших сессий загрузить (None — все будущие)
+    :return: Объект Event или None
+    """
+    now = datetime.now()
+    if release_expired_holds(event_id=event_id, now=now):
+        db.session.commit()
+    event = event_query(
+        "detail", fields=fields, include=include, upcoming_after=now, sessions_limit=sessions_limit
+    ).filter_by(event_id=event_id).first()
+
+    if event and sessions_limit is not None and includes_sessions(include):
+        load_upcoming_sessions([event], now, sessions_limit)
+    return event
+
+
+def serialize_events(
+        events: List[Event],
+        fields: Fieldset = None,
+        include: Fieldset = None,
+        include_related: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Сериализует список экскурсий. Занятость сессий берётся из счётчика EventSession.booked_seats,
+    поэтому дополнительных запросов на сессию не выполняется.
+
+    :param events: Список объектов Event с уже загруженными сессиями
+    :param fields: Поля экскурсии (None — все)
+    :param include: Связи экскурсии (None — все)
+    :param include_related: Добавить бронирования всех сессий (для резидента/админа)
+    :return: Список словарей экскурсий в формате Event.to_dict()
+    """
+    return [
+        event.to_dict(include_related=include_related, fields=fields, include=include)
+        for event in events
+    ]
 
 
 def handle_create_event(
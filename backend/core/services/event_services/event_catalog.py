@@ -0,0 +1,154 @@
+from datetime import datetime
+from typing import Iterable, Optional, List, Dict, Any
+
+from sqlalchemy import func, select
+
+from backend.core import db
+from backend.core.models.event_models import Event, EventSession, EventCatalog, Category, FormatType, \
+    AgeCategory, Tag, event_tags
+from backend.core.utilits.model_utils import dialect_insert
+from backend.core.utilits.version_utils import bump_data_version, EVENTS_SCOPE
+
+
+def _collect_catalog_rows(event_ids: List[int], now: datetime) -> List[Dict[str, Any]]:
+    """
+    Собирает строки проекции каталога для указанных экскурсий.
+
+    В проекцию попадают только активные экскурсии, у которых есть хотя бы одна будущая сессия.
+
+    :param event_ids: ID экскурсий
+    :param now: Текущий момент времени; сессии раньше него не учитываются
+    :return: Список словарей со значениями колонок EventCatalog
+    """
+    sessions = (
+        db.session.query(
+            EventSession.event_id,
+            func.min(EventSession.cost).label("min_cost"),
+            func.min(EventSession.start_datetime).label("min_date")
+        )
+        .filter(EventSession.event_id.in_(event_ids), EventSession.start_datetime > now)
+        .group_by(EventSession.event_id)
+        .subquery()
+    )
+
+    rows = (
+        db.session.query(
+            Event.event_id, Event.title, Event.duration, Event.distance_to_center, Event.time_to_nearest_stop,
+            Category.category_id, Category.category_name,
+            FormatType.format_type_id, FormatType.format_type_name,
+            AgeCategory.age_category_id, AgeCategory.age_category_name,
+            sessions.c.min_cost, sessions.c.min_date
+        )
+        .join(sessions, sessions.c.event_id == Event.event_id)
+        .join(Category, Category.category_id == Event.category_id)
+        .join(FormatType, FormatType.format_type_id == Event.format_type_id)
+        .join(AgeCategory, AgeCategory.age_category_id == Event.age_category_id)
+        .filter(Event.event_id.in_(event_ids), Event.is_active)
+        .all()
+    )
+    if not rows:
+        return []
+
+    tags: Dict[int, List[str]] = {}
+    tag_rows = (
+        db.session.query(event_tags.c.event_id, Tag.name)
+        .join(Tag, Tag.tag_id == event_tags.c.tag_id)
+        .filter(event_tags.c.event_id.in_([row.event_id for row in rows]))
+        .order_by(Tag.name)
+    )
+    for event_id, name in tag_rows:
+        tags.setdefault(event_id, []).append(name)
+
+    return [
+        {
+            **row._asdict(),
+            "tag_names": tags.get(row.event_id, []),
+            "version": 1,
+            "updated_at": now,
+        }
+        for row in rows
+    ]
+
+
+def sync_event_catalog(event_ids: Iterable[int], now: Optional[datetime] = None, structural: bool = False) -> None:
+    """
+    Пересчитывает строки каталога для указанных экскурсий в текущей транзакции.
+
+    Вызывается сервисами экскурсий, сессий и бронирований перед commit, поэтому проекция
+    меняется атомарно вместе с исходными данными. Экскурсии, которые больше не должны
+    показываться в каталоге (неактивны, удалены или без будущих сессий), из него удаляются.
+
+    У каждой пересчитанной строки увеличивается version. Общая версия EVENTS_SCOPE увеличивается
+    только при структурных изменениях (structural=True) и при изменении состава каталога, поэтому
+    бронирования блокируют лишь строку своей экскурсии, а не одну строку версии на весь кластер.
+
+    :param event_ids: ID изменённых экскурсий
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :param structural: Изменены сами экскурсии или их сессии (создание, правка, удаление, импорт)
+    :return: None
+    """
+    event_ids = sorted({event_id for event_id in event_ids if event_id is not None})
+    if not event_ids:
+        return
+
+    now = now or datetime.now()
+    db.session.flush()
+
+    table = EventCatalog.__table__
+    listed = set(db.session.scalars(select(table.c.event_id).where(table.c.event_id.in_(event_ids))))
+    rows = _collect_catalog_rows(event_ids, now)
+    if rows:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.event_id],
+            set_={
+                **{
+                    column.name: stmt.excluded[column.name]
+                    for column in table.columns
+                    if column.name not in ("event_id", "version")
+                },
+                "version": table.c.version + 1
+            }
+        )
+        db.session.execute(stmt, rows)
+
+    kept = [row["event_id"] for row in rows]
+    db.session.execute(table.delete().where(table.c.event_id.in_(event_ids), table.c.event_id.notin_(kept)))
+    # экскурсии вне каталога не имеют версии строки, поэтому их изменения меняют общую версию
+    if structural or len(kept) != len(event_ids) or not listed.issuperset(kept):
+        bump_data_version(EVENTS_SCOPE)
+
+
+def refresh_stale_catalog(now: Optional[datetime] = None) -> int:
+    """
+    Фоновая задача: обновляет строки каталога, у которых ближайшая сессия уже началась.
+
+    Агрегаты проекции зависят от текущего времени, поэтому раз в CATALOG_REFRESH_INTERVAL_MINUTES
+    пересчитываются экскурсии с min_date в прошлом (поиск по индексу). Чтение каталога строки
+    не обновляет: GET-запросы остаются без записи и не ждут блокировок бронирований.
+
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: Количество пересчитанных экскурсий
+    """
+    now = now or datetime.now()
+    stale_ids = [
+        event_id for event_id, in
+        db.session.query(EventCatalog.event_id).filter(EventCatalog.min_date <= now)
+    ]
+    if stale_ids:
+        sync_event_catalog(stale_ids, now)
+    db.session.commit()
+    return len(stale_ids)
+
+
+def rebuild_event_catalog() -> int:
+    """
+    Полностью перестраивает проекцию каталога по всем экскурсиям.
+
+    :return: Количество экскурсий в каталоге после перестроения
+    """
+    event_ids = [event_id for event_id, in db.session.query(Event.event_id)]
+    db.session.execute(EventCatalog.__table__.delete())
+    sync_event_catalog(event_ids, structural=True)
+    db.session.commit()
+    return db.session.query(func.count(EventCatalog.event_id)).scalar()
@@ -1,19 +1,27 @@
 from http import HTTPStatus
-from typing import Optional, List, Union, Tuple, Iterable
+from typing import Optional, List, Union, Tuple, Iterable, Dict
 from urllib.parse import quote
 
 from flask import Response, make_response
+from sqlalchemy import select
 from werkzeug.datastructures import FileStorage
 
 from backend.core import db
-from backend.core.models.event_models import Event, Category, FormatType, AgeCategory, Tag
+from backend.core.models.event_models import Event, Tag, event_tags
 from backend.core.services.email_service.email_service import send_event_deletion_email
 
+from backend.core.services.event_services.event_catalog import sync_event_catalog
+from backend.core.services.event_services.event_fields import Fieldset
+from backend.core.services.event_services.event_loading import event_query
 from backend.core.services.event_services.event_photo_service import process_photos, add_photos
 from backend.core.services.event_services.event_session_service import delete_event_session, \
     clear_sessions_and_schedules, add_sessions
+from backend.core.services.event_services.session_schedule_service import add_schedules
+from backend.core.services.reference_service.reference_cache import find_reference, resolve_reference_id
+from backend.core.services.search_service.search_service import mark_search_changed, index_event, unindex_event
 from backend.core.services.user_services.user_service import get_user_by_email
-from backend.core.utilits.model_utils import get_model_by_name
+from backend.core.utilits.model_utils import dialect_insert
+from backend.core.utilits.version_utils import bump_data_version, EVENTS_SCOPE
 from backend.core.utilits.file_utils import remove_file_if_exists, generate_reservations_csv
 
 
@@ -21,24 +29,29 @@ def get_event(event_id: int, resident_id: Optional[int] = None) -> Optional[Even
     """
     Возвращает объект экскурсии по её ID.
 
+    Экскурсия загружается стратегией management: со справочниками, фото, тегами,
+    сессиями и их бронированиями (для to_dict(include_related=True)).
+
     :param event_id: ID экскурсии (события)
     :param resident_id: ID резидента (опционально). Если указан, будет выполнена проверка,
                         что экскурсия принадлежит именно этому резиденту.
     :return: Объект Event, если найден, иначе None.
     """
-    query = Event.query.filter_by(event_id=event_id)
+    query = event_query("management").filter_by(event_id=event_id)
     if resident_id is not None:
         query = query.filter_by(created_by=resident_id)
     return query.first()
 
 
-def get_all_events() -> List[Event]:
+def get_all_events(fields: Fieldset = None, include: Fieldset = None) -> List[Event]:
     """
-    Возвращает список всех экскурсий (событий).
+    Возвращает список всех экскурсий (событий) для админ-панели.
 
+    :param fields: Поля экскурсии, которые будут сериализованы (None — все)
+    :param include: Связи экскурсии, которые будут сериализованы (None — все); остальные не загружаются
     :return: Список объектов Event.
     """
-    return Event.query.all()
+    return event_query("admin_list", fields=fields, include=include).order_by(Event.event_id).all()
 
 
 def get_events_for_resident(resident_id: int) -> List[Event]:
@@ -48,7 +61,7 @@ def get_events_for_resident(resident_id: int) -> List[Event]:
     :param resident_id: ID резидента (создателя экскурсий)
     :return: Список объектов Event, принадлежащих данному резиденту.
     """
-    return Event.query.filter_by(created_by=resident_id).all()
+    return event_query("management").filter_by(created_by=resident_id).order_by(Event.event_id).all()
 
 
 def delete_event(event_id: int, resident, return_csv: bool = False) -> Union[tuple[dict, int], Response]:
@@ -84,7 +97,10 @@ def delete_event(event_id: int, resident, return_csv: bool = False) -> Union[tup
             remove_file_if_exists(photo.photo_url)
             db.session.delete(photo)
         db.session.delete(event)
+        bump_data_version(EVENTS_SCOPE)
+        search_version = mark_search_changed()
         db.session.commit()
+        unindex_event(event_id, search_version)
     except Exception as e:
         db.session.rollback()
         return {"message": f"Ошибка при удалении экскурсии: {str(e)}"}, HTTPStatus.INTERNAL_SERVER_ERROR
@@ -120,11 +136,11 @@ def create_event(
              Если всё прошло успешно, HTTP-статус будет None.
     """
     try:
-        category = get_model_by_name(Category, "category_name", data.get("category"), "Категория не найдена")
-        format_type = get_model_by_name(FormatType, "format_type_name", data.get("format_type"),
-                                        "Формат мероприятия не найден")
-        age_category = get_model_by_name(AgeCategory, "age_category_name", data.get("age_category"),
-                                         "Возрастная категория не найдена")
+        category_id = resolve_reference_id("categories", data.get("category"), "Категория не найдена")
+        format_type_id = resolve_reference_id("format_types", data.get("format_type"),
+                                              "Формат мероприятия не найден")
+        age_category_id = resolve_reference_id("age_categories", data.get("age_category"),
+                                               "Возрастная категория не найдена")
 
         if not data.get("place"):
             return None, {"message": "Место проведения обязательно"}, HTTPStatus.BAD_REQUEST
@@ -135,9 +151,9 @@ def create_event(
             title=data.get("title"),
             description=data.get("description"),
             duration=data.get("duration"),
-            category_id=category.category_id,
-            format_type_id=format_type.format_type_id,
-            age_category_id=age_category.age_category_id,
+            category_id=category_id,
+            format_type_id=format_type_id,
+            age_category_id=age_category_id,
             place=data["place"],
             conducted_by=data.get("conducted_by"),
             is_active=data.get("is_active", True),
@@ -159,10 +175,14 @@ def create_event(
 
         clear_sessions_and_schedules(event)
         add_sessions(event, data.get("sessions", []))
+        add_schedules(event, data.get("schedules", []))
 
         add_tags(event, data.get("tags", []))
 
+        sync_event_catalog([event.event_id], structural=True)
+        search_version = mark_search_changed()
         db.session.commit()
+        index_event(event, search_version)
         return event, {"message": "Событие создано", "excursion_id": event.event_id}, None
 
     except ValueError as ve:
@@ -200,52 +220,100 @@ def update_event(event_id: int, data: dict) -> Tuple[Optional[Event], dict, int]
             setattr(event, field, data[field])
 
     if 'category' in data:
-        category = Category.query.filter_by(category_name=data['category']).first()
+        category = find_reference("categories", data['category'])
         if not category:
             return None, {"message": f"Категория '{data['category']}' не найдена"}, HTTPStatus.BAD_REQUEST
-        event.category = category
+        event.category_id = category.id
 
     if 'format_type' in data:
-        format_type = FormatType.query.filter_by(format_type_name=data['format_type']).first()
+        format_type = find_reference("format_types", data['format_type'])
         if not format_type:
             return None, {"message": f"Формат '{data['format_type']}' не найден"}, HTTPStatus.BAD_REQUEST
-        event.format_type = format_type
+        event.format_type_id = format_type.id
 
     if 'age_category' in data:
-        age_category = AgeCategory.query.filter_by(age_category_name=data['age_category']).first()
+        age_category = find_reference("age_categories", data['age_category'])
         if not age_category:
             return None, {
                 "message": f"Возрастная категория '{data['age_category']}' не найдена"}, HTTPStatus.BAD_REQUEST
-        event.age_category = age_category
+        event.age_category_id = age_category.id
 
     try:
+        sync_event_catalog([event.event_id], structural=True)
+        search_version = mark_search_changed()
         db.session.commit()
+        index_event(event, search_version)
         return event, None, HTTPStatus.OK
     except Exception as e:
         db.session.rollback()
         return None, {"message": f"Ошибка при обновлении экскурсии: {str(e)}"}, HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+def upsert_tags(names: Iterable[str]) -> Dict[str, int]:
+    """
+    Возвращает ID тегов по именам, создавая недостающие.
+
+    Существующие теги выбираются одним SELECT, недостающие вставляются одним
+    INSERT ... ON CONFLICT DO NOTHING, поэтому число запросов не зависит от количества тегов.
+
+    :param names: Имена тегов (без пробелов по краям, без повторов)
+    :return: Словарь {имя тега: tag_id}
+    """
+    names = list(names)
+    if not names:
+        return {}
+
+    tag_ids = dict(db.session.execute(select(Tag.name, Tag.tag_id).where(Tag.name.in_(names))).all())
+    missing = [name for name in names if name not in tag_ids]
+    if missing:
+        inserted = db.session.execute(
+            dialect_insert(Tag.__table__)
+            .values([{"name": name} for name in missing])
+            .on_conflict_do_nothing(index_elements=[Tag.__table__.c.name])
+            .returning(Tag.__table__.c.name, Tag.__table__.c.tag_id)
+        )
+        tag_ids.update(inserted.all())
+        if len(tag_ids) < len(names):
+            # теги, которые параллельно создал другой запрос
+            tag_ids.update(db.session.execute(
+                select(Tag.name, Tag.tag_id).where(Tag.name.in_(set(names) - set(tag_ids)))
+            ).all())
+    return tag_ids
+
+
+def normalize_tag_names(tag_names: Optional[Iterable[str]]) -> List[str]:
+    """
+    Убирает пробелы по краям, пустые имена и повторы, сохраняя порядок.
+
+    :param tag_names: Имена тегов из запроса
+    :return: Список имён
+    """
+    return list(dict.fromkeys(name.strip() for name in tag_names or [] if name.strip()))
+
+
 def add_tags(event: Event, tag_names: Iterable[str]) -> None:
     """
     Добавляет теги к экскурсии. Существующие теги повторно не добавляются.
     Новые теги создаются в базе данных.
 
-    :param event: Объект экскурсии (Event), к которому добавляются теги.
+    Число запросов не зависит от количества тегов: теги разрешаются через upsert_tags,
+    связи с экскурсией вставляются одним INSERT ... ON CONFLICT DO NOTHING в event_tags.
+
+    :param event: Объект экскурсии (Event) с уже назначенным event_id.
     :param tag_names: Итерация строк с именами тегов.
     :return: None
     """
-    for raw in tag_names or []:
-        name = raw.strip()
-        if not name:
-            continue
-        tag = Tag.query.filter_by(name=name).first()
-        if not tag:
-            tag = Tag(name=name)
-            db.session.add(tag)
-            db.session.flush()
-        if tag not in event.tags:
-            event.tags.append(tag)
+    names = normalize_tag_names(tag_names)
+    if not names:
+        return
+
+    tag_ids = upsert_tags(names)
+    db.session.execute(
+        dialect_insert(event_tags)
+        .values([{"event_id": event.event_id, "tag_id": tag_ids[name]} for name in names])
+        .on_conflict_do_nothing()
+    )
+    db.session.expire(event, ["tags"])
 
 
 def verify_resident_owns_event(
@@ -262,7 +330,7 @@ def verify_resident_owns_event(
              - error: словарь с сообщением об ошибке, если проверка не пройдена, иначе None
              - status: HTTP-статус ошибки, если проверка не пройдена, иначе None
     """
-    event = db.session.get(Event, event_id)
+    event = event_query("ownership_check").filter_by(event_id=event_id).first()
     if not event:
         return None, {"message": "Экскурсия не найдена"}, HTTPStatus.NOT_FOUND
     if event.created_by != resident_id:
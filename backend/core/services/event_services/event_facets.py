@@ -0,0 +1,103 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import func, literal, union_all, select, true
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.event_models import Event, EventCatalog
+from backend.core.services.event_services.event_api import get_catalog_version, normalize_filters
+from backend.core.services.event_services.event_filters import apply_category_filters, apply_format_filters, \
+    apply_age_filters, apply_tag_filters, apply_numeric_filters, apply_date_filters, apply_title_filters, \
+    tag_values
+from backend.core.utilits.cache import TTLCache
+
+FACETS = {
+    "category": EventCatalog.category_name,
+    "format_type": EventCatalog.format_type_name,
+    "age_category": EventCatalog.age_category_name,
+    "tags": EventCatalog.tag_names,
+}
+
+facets_cache = TTLCache("facets", maxsize=Config.CATALOG_CACHE_SIZE, ttl=Config.CATALOG_CACHE_TTL)
+
+
+def _filtered_catalog(filters: Dict[str, Any]):
+    """
+    Подзапрос экскурсий каталога, прошедших фильтры (те же apply_*_filters, что и в list_events).
+
+    :param filters: Словарь фильтров в формате list_events
+    :return: Подзапрос с колонками event_id, именами справочников и тегами
+    """
+    query = db.session.query(
+        Event.event_id,
+        EventCatalog.category_name,
+        EventCatalog.format_type_name,
+        EventCatalog.age_category_name,
+        EventCatalog.tag_names
+    ).join(EventCatalog, Event.event_id == EventCatalog.event_id)
+
+    query = apply_category_filters(query, filters)
+    query = apply_format_filters(query, filters)
+    query = apply_age_filters(query, filters)
+    query = apply_tag_filters(query, filters)
+    query = apply_numeric_filters(query, filters)
+    query = apply_date_filters(query, filters)
+    query = apply_title_filters(query, filters)
+    return query.subquery()
+
+
+def count_facets(filters: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Считает количество экскурсий для каждого значения фасетов каталога.
+
+    Для каждого фасета применяются все фильтры, кроме фильтра по самому фасету, чтобы
+    при выбранной категории были видны количества и по остальным категориям. Все фасеты
+    считаются одним запросом (UNION ALL из агрегатов по отфильтрованному каталогу).
+
+    :param filters: Словарь фильтров в формате list_events
+    :return: Словарь {фасет: [{"name": значение, "count": количество}, ...]},
+             значения отсортированы по убыванию количества
+    """
+    parts = []
+    for facet, column in FACETS.items():
+        filtered = _filtered_catalog({**filters, facet: None})
+        if facet == "tags":
+            values = tag_values(filtered.c.tag_names, lateral=True)
+            stmt = (
+                select(literal(facet).label("facet"), values.c.value.label("name"), func.count().label("count"))
+                .select_from(filtered)
+                .join(values, true())
+                .group_by(values.c.value)
+            )
+        else:
+            value = filtered.c[column.key]
+            stmt = (
+                select(literal(facet).label("facet"), value.label("name"), func.count().label("count"))
+                .group_by(value)
+            )
+        parts.append(stmt)
+
+    result = {facet: [] for facet in FACETS}
+    for facet, name, count in db.session.execute(union_all(*parts)):
+        result[facet].append({"name": name, "count": count})
+    for values in result.values():
+        values.sort(key=lambda item: (-item["count"], item["name"]))
+    return result
+
+
+def get_facet_counts(filters: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Возвращает количества по фасетам с кэшированием популярных состояний фильтров.
+
+    Ключ кэша — версия данных каталога и нормализованные фильтры, поэтому после любого
+    изменения экскурсий, сессий или бронирований значения пересчитываются.
+
+    :param filters: Словарь фильтров в формате list_events
+    :return: Результат count_facets
+    """
+    key = (get_catalog_version(), normalize_filters(filters))
+    facets = facets_cache.get(key)
+    if facets is None:
+        facets = count_facets(filters)
+        facets_cache.set(key, facets)
+    return facets
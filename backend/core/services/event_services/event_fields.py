@@ -0,0 +1,165 @@
+from datetime import datetime
+from typing import Optional, Tuple, List, Mapping, Dict
+
+from sqlalchemy import func
+from sqlalchemy.orm import load_only, joinedload, selectinload, noload, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from backend.core import db
+from backend.core.models.event_models import Event, EventSession
+
+Fieldset = Optional[Tuple[str, ...]]
+
+
+def parse_fieldset(raw: Optional[str], allowed: Tuple[str, ...], param: str) -> Fieldset:
+    """
+    Разбирает список имён через запятую (параметры fields= / include=).
+
+    :param raw: Значение параметра запроса или None, если параметр не передан
+    :param allowed: Допустимые имена
+    :param param: Имя параметра (для сообщения об ошибке)
+    :return: Кортеж имён в каноническом порядке или None, если параметр не передан
+    :raises ValueError: если встречаются неизвестные имена
+    """
+    if raw is None:
+        return None
+
+    names = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = sorted(names - set(allowed))
+    if unknown:
+        raise ValueError(
+            f"Неизвестные значения {param}: {', '.join(unknown)}. Допустимые: {', '.join(allowed)}"
+        )
+    return tuple(name for name in allowed if name in names)
+
+
+def parse_event_fieldsets(args: Mapping[str, str]) -> Tuple[Fieldset, Fieldset]:
+    """
+    Разбирает параметры fields= и include= для эндпоинтов экскурсий.
+
+    :param args: Параметры запроса (request.args)
+    :return: Кортеж (fields, include); None означает «все»
+    :raises ValueError: если передано неизвестное поле или связь
+    """
+    fields = parse_fieldset(args.get('fields'), Event.SERIALIZABLE_FIELDS, 'fields')
+    include = parse_fieldset(args.get('include'), Event.SERIALIZABLE_INCLUDES, 'include')
+    return fields, include
+
+
+def includes_sessions(include: Fieldset) -> bool:
+    """
+    Проверяет, нужны ли в ответе сессии экскурсии.
+
+    :param include: Набор связей из parse_event_fieldsets
+    :return: True, если сессии сериализуются
+    """
+    return include is None or 'sessions' in include
+
+
+def parse_sessions_limit(args: Mapping[str, str]) -> Optional[int]:
+    """
+    Разбирает параметр sessions_limit (сколько ближайших сессий вернуть для каждой экскурсии).
+
+    :param args: Параметры запроса (request.args)
+    :return: Положительное число или None, если параметр не передан
+    :raises ValueError: если значение не является положительным числом
+    """
+    raw = args.get('sessions_limit')
+    if raw is None:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise ValueError("sessions_limit должен быть положительным числом")
+    return value
+
+
+def event_load_options(
+        fields: Fieldset = None,
+        include: Fieldset = None,
+        upcoming_after: Optional[datetime] = None,
+        sessions_limit: Optional[int] = None
+) -> List[LoaderOption]:
+    """
+    Строит опции загрузки Event под запрошенный набор полей и связей.
+
+    Загружаются только нужные колонки, а связи, которые не попадут в ответ, не подгружаются вовсе.
+
+    Если указан upcoming_after, сессии загружаются с условием start_datetime > upcoming_after
+    прямо в SQL, и прошедшие сессии не читаются. С sessions_limit сессии этой опцией не грузятся —
+    их нужно загрузить через load_upcoming_sessions.
+
+    :param fields: Поля из Event.SERIALIZABLE_FIELDS (None — все)
+    :param include: Связи из Event.SERIALIZABLE_INCLUDES (None — все)
+    :param upcoming_after: Момент времени, после которого сессии считаются предстоящими
+    :param sessions_limit: Ограничение на число ближайших сессий каждой экскурсии
+    :return: Список опций для Query.options()
+    """
+    fields = Event.SERIALIZABLE_FIELDS if fields is None else fields
+    include = Event.SERIALIZABLE_INCLUDES if include is None else include
+
+    options = [load_only(
+        Event.event_id, Event.category_id, Event.format_type_id, Event.age_category_id, Event.created_by,
+        *(getattr(Event, name) for name in fields)
+    )]
+    joined = {
+        'category': Event.category,
+        'format_type': Event.format_type,
+        'age_category': Event.age_category,
+        'created_by': Event.creator,
+    }
+    options.extend(joinedload(relation) for name, relation in joined.items() if name in include)
+    if 'photos' in include:
+        options.append(selectinload(Event.photos))
+    if 'sessions' in include:
+        if sessions_limit is not None:
+            options.append(noload(Event.sessions))
+        elif upcoming_after is not None:
+            options.append(selectinload(Event.sessions.and_(EventSession.start_datetime > upcoming_after)))
+        else:
+            options.append(selectinload(Event.sessions))
+    if 'tags' in include:
+        options.append(selectinload(Event.tags))
+    return options
+
+
+def load_upcoming_sessions(events: List[Event], now: datetime, limit: int) -> None:
+    """
+    Загружает не больше limit ближайших будущих сессий каждой экскурсии одним запросом
+    (ROW_NUMBER() по event_id) и записывает их в event.sessions как загруженное состояние.
+
+    Коллекция не помечается изменённой, поэтому при flush сессии не удаляются.
+
+    :param events: Экскурсии, загруженные с опцией noload для сессий
+    :param now: Момент времени, после которого сессии считаются предстоящими
+    :param limit: Максимальное число сессий на экскурсию
+    :return: None
+    """
+    if not events:
+        return
+
+    row_number = func.row_number().over(
+        partition_by=EventSession.event_id,
+        order_by=(EventSession.start_datetime, EventSession.session_id)
+    ).label("row_number")
+    ranked = (
+        db.session.query(EventSession, row_number)
+        .filter(EventSession.event_id.in_([event.event_id for event in events]),
+                EventSession.start_datetime > now)
+        .subquery()
+    )
+    session_alias = aliased(EventSession, ranked)
+    sessions = (
+        db.session.query(session_alias)
+        .filter(ranked.c.row_number <= limit)
+        .order_by(session_alias.event_id, session_alias.start_datetime)
+    )
+
+    by_event: Dict[int, List[EventSession]] = {event.event_id: [] for event in events}
+    for session in sessions:
+        by_event[session.event_id].append(session)
+    for event in events:
+        set_committed_value(event, "sessions", by_event[event.event_id])
@@ -0,0 +1,394 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import load_only, selectinload
+from werkzeug.datastructures import FileStorage
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.auth_models import User
+from backend.core.models.event_models import Event, EventSession, event_tags
+from backend.core.services.event_services.event_catalog import sync_event_catalog
+from backend.core.services.event_services.event_crud import upsert_tags, normalize_tag_names
+from backend.core.services.reference_service.reference_cache import ReferenceTable, refresh_references
+from backend.core.services.search_service.search_service import mark_search_changed, index_events
+
+IMPORT_FORMATS = ("jsonl", "csv")
+
+# Разделители для CSV: несколько тегов/сессий в одной ячейке и поля сессии
+CSV_LIST_SEPARATOR = ";"
+CSV_SESSION_SEPARATOR = "|"
+
+# поле -> (обязательное, максимальная длина)
+STRING_FIELDS = {
+    "title": (True, 255),
+    "description": (True, None),
+    "place": (True, 255),
+    "conducted_by": (False, 255),
+    "working_hours": (False, 255),
+    "contact_email": (False, 255),
+    "iframe_url": (False, None),
+    "telegram": (False, 100),
+    "vk": (False, 100),
+}
+FLOAT_FIELDS = ("distance_to_center", "time_to_nearest_stop")
+REFERENCE_FIELDS = {
+    "category": ("categories", "category_id"),
+    "format_type": ("format_types", "format_type_id"),
+    "age_category": ("age_categories", "age_category_id"),
+}
+TAG_MAX_LENGTH = 50
+
+ImportRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_import_format(file: FileStorage, file_format: Optional[str] = None) -> str:
+    """
+    Определяет формат файла импорта по параметру запроса или расширению имени файла.
+
+    :param file: Загруженный файл
+    :param file_format: Явно указанный формат (jsonl или csv)
+    :return: Формат из IMPORT_FORMATS
+    :raises ValueError: если формат не поддерживается
+    """
+    if not file_format:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        file_format = "jsonl" if extension in ("jsonl", "ndjson") else extension
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат файла. Допустимые: {', '.join(IMPORT_FORMATS)}")
+    return file_format
+
+
+def _split_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+
+
+def _parse_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    data: Dict[str, Any] = {key: value for key, value in row.items() if key and value not in (None, "")}
+    if "tags" in data:
+        data["tags"] = _split_list(data["tags"])
+    if "sessions" in data:
+        sessions = []
+        for item in _split_list(data["sessions"]):
+            parts = [part.strip() for part in item.split(CSV_SESSION_SEPARATOR)]
+            session = dict(zip(("start_datetime", "max_participants", "cost"), parts))
+            sessions.append(session)
+        data["sessions"] = sessions
+    return data
+
+
+def read_import_rows(file: FileStorage, file_format: str) -> List[ImportRow]:
+    """
+    Читает строки файла импорта.
+
+    JSON Lines: одна экскурсия на строку в формате данных create_event.
+    CSV: колонки с именами полей экскурсии; tags — имена через «;»,
+    sessions — сессии через «;» в виде «start_datetime|max_participants|cost».
+
+    :param file: Загруженный файл (UTF-8)
+    :param file_format: jsonl или csv
+    :return: Список кортежей (номер строки в файле, данные или None, ошибка разбора или None)
+    :raises ValueError: если файл не в UTF-8 или превышает IMPORT_MAX_ROWS строк
+    """
+    try:
+        text = file.read().decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise ValueError("Файл должен быть в кодировке UTF-8") from e
+
+    rows: List[ImportRow] = []
+    if file_format == "jsonl":
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                rows.append((line_no, None, f"Некорректный JSON: {e.msg}"))
+                continue
+            if not isinstance(data, dict):
+                rows.append((line_no, None, "Строка должна содержать JSON-объект"))
+                continue
+            rows.append((line_no, data, None))
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        for row in reader:
+            rows.append((reader.line_num, _parse_csv_row(row), None))
+
+    if len(rows) > Config.IMPORT_MAX_ROWS:
+        raise ValueError(f"Слишком много строк: {len(rows)}, максимум {Config.IMPORT_MAX_ROWS}")
+    return rows
+
+
+def _parse_number(value: Any, cast, name: str, errors: List[str], minimum: float) -> Any:
+    if isinstance(value, bool):
+        errors.append(f"{name}: ожидается число")
+        return None
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        errors.append(f"{name}: ожидается число")
+        return None
+    if number < minimum:
+        errors.append(f"{name}: значение должно быть не меньше {minimum}")
+        return None
+    return number
+
+
+def _parse_bool(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "1", "yes", "да"):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ("false", "0", "no", "нет"):
+        return False
+    return None
+
+
+def _validate_sessions(sessions: Any, errors: List[str]) -> List[Dict[str, Any]]:
+    if sessions is None:
+        return []
+    if not isinstance(sessions, list):
+        errors.append("sessions: ожидается список")
+        return []
+
+    result = []
+    for i, session in enumerate(sessions, start=1):
+        if not isinstance(session, dict):
+            errors.append(f"sessions[{i}]: ожидается объект")
+            continue
+        try:
+            start = datetime.fromisoformat(str(session.get("start_datetime")))
+        except ValueError:
+            errors.append(f"sessions[{i}].start_datetime: ожидается дата в формате ISO")
+            continue
+        max_participants = _parse_number(session.get("max_participants"), int,
+                                         f"sessions[{i}].max_participants", errors, 1)
+        cost = _parse_number(session.get("cost", 0), float, f"sessions[{i}].cost", errors, 0)
+        if max_participants is not None and cost is not None:
+            result.append({"start_datetime": start, "max_participants": max_participants, "cost": cost})
+    return result
+
+
+def validate_import_row(
+        data: Dict[str, Any],
+        references: Dict[str, ReferenceTable]
+) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Проверяет и нормализует одну экскурсию из файла импорта без обращений к БД.
+
+    :param data: Данные экскурсии в формате create_event (+ необязательный created_by — email создателя)
+    :param references: Снимок справочников (см. refresh_references)
+    :return: Кортеж (нормализованные данные или None, список ошибок)
+    """
+    errors: List[str] = []
+    event: Dict[str, Any] = {}
+
+    for name, (required, max_length) in STRING_FIELDS.items():
+        value = data.get(name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if required:
+                errors.append(f"{name}: обязательное поле")
+            event[name] = None
+        elif not isinstance(value, str):
+            errors.append(f"{name}: ожидается строка")
+        elif max_length and len(value) > max_length:
+            errors.append(f"{name}: длина больше {max_length}")
+        else:
+            event[name] = value
+
+    if data.get("duration") is None:
+        errors.append("duration: обязательное поле")
+    else:
+        event["duration"] = _parse_number(data["duration"], int, "duration", errors, 1)
+
+    for name in FLOAT_FIELDS:
+        event[name] = _parse_number(data[name], float, name, errors, 0) if data.get(name) is not None else None
+
+    is_active = _parse_bool(data.get("is_active", True))
+    if is_active is None:
+        errors.append("is_active: ожидается true или false")
+    event["is_active"] = is_active
+
+    for name, (kind, column) in REFERENCE_FIELDS.items():
+        value = data.get(name)
+        reference = references[kind].by_name.get(value) if isinstance(value, str) else None
+        if value is None:
+            errors.append(f"{name}: обязательное поле")
+        elif reference is None:
+            errors.append(f"{name}: значение '{value}' не найдено в справочнике")
+        else:
+            event[column] = reference.id
+
+    sessions = _validate_sessions(data.get("sessions"), errors)
+
+    tags = data.get("tags") or []
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        errors.append("tags: ожидается список строк")
+        tags = []
+    tags = normalize_tag_names(tags)
+    errors.extend(f"tags: длина тега '{tag}' больше {TAG_MAX_LENGTH}" for tag in tags if len(tag) > TAG_MAX_LENGTH)
+
+    created_by = data.get("created_by")
+    if created_by is not None and not isinstance(created_by, str):
+        errors.append("created_by: ожидается строка")
+        created_by = None
+
+    if errors:
+        return None, errors
+    return {
+        "event": event,
+        "sessions": sessions,
+        "tags": tags,
+        "created_by": (created_by or "").strip() or None,
+    }, []
+
+
+def _insert_chunk(rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Вставляет пачку проверенных экскурсий пакетными INSERT (executemany): экскурсии,
+    сессии, теги и связи с тегами — по одному запросу на таблицу.
+
+    :param rows: Нормализованные данные из validate_import_row с заполненным event.created_by
+    :return: ID созданных экскурсий в порядке rows
+    """
+    event_ids = db.session.execute(
+        insert(Event.__table__).returning(Event.__table__.c.event_id, sort_by_parameter_order=True),
+        [row["event"] for row in rows]
+    ).scalars().all()
+
+    sessions = [
+        {**session, "event_id": event_id}
+        for row, event_id in zip(rows, event_ids)
+        for session in row["sessions"]
+    ]
+    if sessions:
+        db.session.execute(insert(EventSession.__table__), sessions)
+
+    tag_ids = upsert_tags(dict.fromkeys(tag for row in rows for tag in row["tags"]))
+    links = [
+        {"event_id": event_id, "tag_id": tag_ids[tag]}
+        for row, event_id in zip(rows, event_ids)
+        for tag in row["tags"]
+    ]
+    if links:
+        db.session.execute(insert(event_tags), links)
+    return event_ids
+
+
+def _index_imported(event_ids: List[int], search_version: int) -> None:
+    events = Event.query.options(
+        load_only(Event.event_id, Event.title, Event.description, Event.is_active),
+        selectinload(Event.tags)
+    ).filter(Event.event_id.in_(event_ids)).all()
+    index_events(events, search_version)
+
+
+def import_events(
+        rows: List[ImportRow],
+        creator_email: str,
+        chunk_size: Optional[int] = None,
+        dry_run: bool = False
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Импортирует экскурсии с сессиями и тегами.
+
+    Сначала проверяются все строки (справочники перечитываются один раз, создатели — одним запросом),
+    затем корректные строки вставляются пачками по chunk_size, каждая пачка — в своей транзакции.
+    Строки с ошибками не импортируются и перечисляются в отчёте; если пачка не записалась,
+    в отчёт попадают все её строки.
+
+    :param rows: Строки из read_import_rows
+    :param creator_email: Email создателя по умолчанию (если в строке не указан created_by)
+    :param chunk_size: Размер пачки (по умолчанию Config.IMPORT_CHUNK_SIZE)
+    :param dry_run: Только проверить файл, ничего не записывая
+    :return: Кортеж (отчёт об импорте, HTTP-статус)
+    """
+    started = time.monotonic()
+    chunk_size = chunk_size or Config.IMPORT_CHUNK_SIZE
+    references = refresh_references()
+    errors: List[Dict[str, Any]] = []
+    valid: List[Tuple[int, Dict[str, Any]]] = []
+
+    for line_no, data, parse_error in rows:
+        if parse_error:
+            errors.append({"row": line_no, "errors": [parse_error]})
+            continue
+        normalized, row_errors = validate_import_row(data, references)
+        if row_errors:
+            errors.append({"row": line_no, "errors": row_errors})
+        else:
+            valid.append((line_no, normalized))
+
+    emails = {row["created_by"] or creator_email for _, row in valid}
+    users = dict(db.session.query(User.email, User.user_id).filter(User.email.in_(emails)).all())
+    resolved: List[Tuple[int, Dict[str, Any]]] = []
+    for line_no, row in valid:
+        email = row["created_by"] or creator_email
+        if email not in users:
+            errors.append({"row": line_no, "errors": [f"created_by: пользователь {email} не найден"]})
+            continue
+        row["event"]["created_by"] = users[email]
+        resolved.append((line_no, row))
+
+    imported_ids: List[int] = []
+    if not dry_run:
+        for start in range(0, len(resolved), chunk_size):
+            chunk = resolved[start:start + chunk_size]
+            try:
+                event_ids = _insert_chunk([row for _, row in chunk])
+                sync_event_catalog(event_ids, structural=True)
+                search_version = mark_search_changed()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                errors.extend({"row": line_no, "errors": [f"Ошибка записи: {e}"]} for line_no, _ in chunk)
+                continue
+            imported_ids.extend(event_ids)
+            _index_imported(event_ids, search_version)
+
+    errors.sort(key=lambda error: error["row"])
+    elapsed = time.monotonic() - started
+    report = {
+        "dry_run": dry_run,
+        "total": len(rows),
+        "valid": len(resolved),
+        "imported": len(imported_ids),
+        "failed": len(errors),
+        "excursion_ids": imported_ids,
+        "errors": errors,
+        "elapsed_ms": round(elapsed * 1000, 1),
+    }
+    status = HTTPStatus.BAD_REQUEST if errors and not resolved else HTTPStatus.OK
+    return report, status
+
+
+def handle_import_events(
+        file: Optional[FileStorage],
+        creator_email: str,
+        file_format: Optional[str] = None,
+        dry_run: bool = False
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Обрабатывает загрузку файла импорта экскурсий.
+
+    :param file: Файл из request.files
+    :param creator_email: Email администратора, выполняющего импорт
+    :param file_format: Формат файла (jsonl или csv); по умолчанию — по расширению
+    :param dry_run: Только проверить файл
+    :return: Кортеж (отчёт или сообщение об ошибке, HTTP-статус)
+    """
+    if file is None:
+        return {"message": "Файл не передан (поле file)"}, HTTPStatus.BAD_REQUEST
+    try:
+        rows = read_import_rows(file, detect_import_format(file, file_format))
+    except ValueError as e:
+        return {"message": str(e)}, HTTPStatus.BAD_REQUEST
+    if not rows:
+        return {"message": "Файл не содержит строк"}, HTTPStatus.BAD_REQUEST
+    return import_events(rows, creator_email, dry_run=dry_run)
@@ -0,0 +1,64 @@
+from typing import Callable, Dict, List
+
+from sqlalchemy.orm import Query, load_only, joinedload, selectinload, lazyload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from backend.core.models.event_models import Event, EventSession, Reservation
+from backend.core.services.event_services.event_fields import event_load_options
+
+
+def ownership_check_options() -> List[LoaderOption]:
+    """
+    Опции для проверки владельца: читаются только ID и создатель экскурсии, связи не загружаются.
+
+    Остальные колонки подгрузятся одним запросом при первом обращении к ним.
+
+    :return: Список опций для Query.options()
+    """
+    return [load_only(Event.event_id, Event.created_by), lazyload("*")]
+
+
+def management_options() -> List[LoaderOption]:
+    """
+    Опции для карточек экскурсий в кабинетах резидента и администратора (to_dict(include_related=True)):
+    справочники и создатель — JOIN, фото, теги, сессии с бронированиями и платежами — по одному
+    запросу на связь независимо от числа экскурсий.
+
+    :return: Список опций для Query.options()
+    """
+    return [
+        joinedload(Event.category),
+        joinedload(Event.format_type),
+        joinedload(Event.age_category),
+        joinedload(Event.creator),
+        selectinload(Event.photos),
+        selectinload(Event.tags),
+        selectinload(Event.sessions).selectinload(EventSession.reservations).selectinload(Reservation.payment),
+    ]
+
+
+# Именованные стратегии загрузки Event под конкретные сценарии:
+#   catalog         — публичный список (fields/include, предстоящие сессии);
+#   detail          — публичная карточка экскурсии, те же параметры, что у catalog;
+#   admin_list      — список в админ-панели (fields/include, все сессии);
+#   management      — экскурсии с бронированиями для резидента и администратора;
+#   ownership_check — проверка владельца перед изменением.
+LOAD_STRATEGIES: Dict[str, Callable[..., List[LoaderOption]]] = {
+    "catalog": event_load_options,
+    "detail": event_load_options,
+    "admin_list": event_load_options,
+    "management": management_options,
+    "ownership_check": ownership_check_options,
+}
+
+
+def event_query(strategy: str, **params) -> Query:
+    """
+    Возвращает запрос Event с опциями загрузки именованной стратегии.
+
+    :param strategy: Имя стратегии из LOAD_STRATEGIES
+    :param params: Параметры стратегии (например, fields, include, upcoming_after, sessions_limit)
+    :return: SQLAlchemy Query для модели Event
+    :raises KeyError: если стратегия неизвестна
+    """
+    return Event.query.options(*LOAD_STRATEGIES[strategy](**params))
@@ -0,0 +1,134 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import ColumnElement, and_, or_, false
+from sqlalchemy.orm import Query
+
+from backend.core.services.event_services.event_sorting import apply_order
+
+MAX_PAGE_LIMIT = 100
+# типы значений, которые JSON курсора может передать в условие WHERE без преобразования
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        try:
+            if "dt" in value:
+                return datetime.fromisoformat(value["dt"])
+            if "dec" in value:
+                return Decimal(value["dec"])
+        except (InvalidOperation, TypeError) as e:
+            raise ValueError("Некорректное значение в курсоре") from e
+        raise ValueError("Неизвестный тип значения в курсоре")
+    if not isinstance(value, SCALAR_TYPES):
+        raise ValueError("Некорректное значение в курсоре")
+    return value
+
+
+def encode_cursor(sort_key: Optional[str], values: List[Any]) -> str:
+    """
+    Кодирует позицию последней строки страницы в непрозрачный курсор.
+
+    :param sort_key: Ключ сортировки, для которого построен курсор
+    :param values: Значения колонок сортировки последней строки (включая event_id)
+    :return: Строка курсора (base64url от JSON)
+    """
+    payload = {"s": sort_key or "", "v": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: Optional[str], expected_len: int) -> List[Any]:
+    """
+    Декодирует курсор и проверяет, что он построен для той же сортировки.
+
+    :param cursor: Строка курсора из предыдущего ответа
+    :param sort_key: Текущий ключ сортировки
+    :param expected_len: Ожидаемое количество значений в курсоре
+    :return: Список значений колонок сортировки
+    :raises ValueError: если курсор повреждён или не соответствует сортировке
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw.decode("utf-8"))
+        values = [_decode_value(v) for v in payload["v"]]
+        cursor_sort = payload["s"]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError("Некорректный курсор") from e
+
+    if cursor_sort != (sort_key or "") or len(values) != expected_len:
+        raise ValueError("Курсор не соответствует параметрам сортировки")
+    return values
+
+
+def build_keyset_condition(sort_columns: List[Tuple[ColumnElement, bool]], values: List[Any]) -> ColumnElement:
+    """
+    Строит условие «строго после позиции курсора» для составного ключа сортировки.
+
+    Учитывает направление каждой колонки и то, что NULL-значения сортируются последними.
+
+    :param sort_columns: Список кортежей (колонка, сортировка по убыванию); последняя колонка уникальна
+    :param values: Значения колонок последней строки предыдущей страницы
+    :return: SQL-выражение для фильтрации
+    """
+    branches = []
+    equal_prefix = []
+
+    for (column, is_desc), value in zip(sort_columns, values):
+        if value is None:
+            after = false()
+            equal = column.is_(None)
+        else:
+            after = or_(column < value if is_desc else column > value, column.is_(None))
+            equal = column == value
+        branches.append(and_(*equal_prefix, after))
+        equal_prefix.append(equal)
+
+    return or_(*branches)
+
+
+def paginate_keyset(
+        query: Query,
+        sort_columns: List[Tuple[ColumnElement, bool]],
+        sort_key: Optional[str],
+        limit: int,
+        cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Возвращает одну страницу запроса по ключу (keyset pagination).
+
+    Стоимость страницы не зависит от её номера: позиция задаётся условием WHERE по значениям
+    колонок сортировки, а не OFFSET.
+
+    :param query: Запрос, к которому ещё не применена сортировка
+    :param sort_columns: Колонки сортировки; последняя должна быть уникальной (например, первичный ключ)
+    :param sort_key: Исходный ключ сортировки, сохраняется в курсоре
+    :param limit: Размер страницы
+    :param cursor: Курсор предыдущей страницы
+    :return: Кортеж (объекты страницы, курсор следующей страницы или None)
+    :raises ValueError: если курсор некорректен
+    """
+    if cursor:
+        values = decode_cursor(cursor, sort_key, len(sort_columns))
+        query = query.filter(build_keyset_condition(sort_columns, values))
+
+    labels = [column.label(f"_sort_{i}") for i, (column, _) in enumerate(sort_columns)]
+    rows = apply_order(query.add_columns(*labels), sort_columns).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(sort_key, list(rows[-1][1:])) if has_more and rows else None
+    return [row[0] for row in rows], next_cursor
@@ -8,6 +8,7 @@ from werkzeug.datastructures import FileStorage
 from backend.core import db
 from backend.core.models.event_models import EventPhoto, Event
 from backend.core.utilits.file_utils import save_image, remove_file_if_exists
+from backend.core.utilits.version_utils import bump_data_version, EVENTS_SCOPE
 
 
 def process_photos(files: list[FileStorage]) -> list[dict[str, str | int]]:
@@ -83,6 +84,7 @@ def delete_photo_from_event(event_id: int, photo_id: int) -> Tuple[Dict[str, str
     try:
         remove_file_if_exists(photo.photo_url)
         db.session.delete(photo)
+        bump_data_version(EVENTS_SCOPE)
         db.session.commit()
         return {"message": "Фото удалено"}, HTTPStatus.NO_CONTENT
     except Exception as e:
@@ -139,6 +141,7 @@ def add_photo_to_event(
     )
     try:
         db.session.add(new_photo)
+        bump_data_version(EVENTS_SCOPE)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
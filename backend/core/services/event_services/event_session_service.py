@@ -5,14 +5,17 @@ from urllib.parse import quote
 
 from flask import make_response, Response
 from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import insert
 
 from backend.core import db
-from backend.core.models.event_models import EventSession, Event
+from backend.core.models.event_models import EventSession, Event, SessionSchedule
+from backend.core.services.event_services.event_catalog import sync_event_catalog
 from backend.core.services.email_service.email_service import send_session_deletion_email, \
     send_session_cancellation_email
 
 from backend.core.services.user_services.user_service import get_user_by_email
 from backend.core.utilits.file_utils import generate_reservations_csv
+from backend.core.services.reservation_service.waitlist import promote_waitlist
 from backend.core.services.reservation_service.yookassa_service import refund_yookassa_payment
 
 
@@ -24,11 +27,12 @@ def clear_sessions_and_schedules(event: Event) -> None:
     :return: None
     """
     EventSession.query.filter_by(event_id=event.event_id).delete()
+    SessionSchedule.query.filter_by(event_id=event.event_id).delete()
 
 
 def add_sessions(event: Event, sessions: List[Dict]) -> None:
     """
-    Добавляет новые сессии к экскурсии.
+    Добавляет новые сессии к экскурсии одним пакетным INSERT.
 
     :param event: объект Event, к которому добавляются сессии
     :param sessions: список словарей с данными сессий, каждый словарь должен содержать:
@@ -37,14 +41,18 @@ def add_sessions(event: Event, sessions: List[Dict]) -> None:
                      - cost (float)
     :return: None
     """
-    for s in sessions:
-        start_dt = datetime.fromisoformat(s["start_datetime"])
-        db.session.add(EventSession(
-            event_id=event.event_id,
-            start_datetime=start_dt,
-            max_participants=s["max_participants"],
-            cost=s["cost"]
-        ))
+    rows = [
+        {
+            "event_id": event.event_id,
+            "start_datetime": datetime.fromisoformat(s["start_datetime"]),
+            "max_participants": s["max_participants"],
+            "cost": s["cost"],
+        }
+        for s in sessions
+    ]
+    if rows:
+        db.session.execute(insert(EventSession.__table__), rows)
+        db.session.expire(event, ["sessions"])
 
 
 def get_sessions_for_event(event_id: int) -> List[EventSession]:
@@ -79,6 +87,7 @@ def create_event_session(event_id: int, data: dict) -> Tuple[Optional[EventSessi
     )
     try:
         db.session.add(new_session)
+        sync_event_catalog([event_id], structural=True)
         db.session.commit()
         return new_session, None, HTTPStatus.CREATED
     except Exception as e:
@@ -93,6 +102,7 @@ def update_event_session(
 ) -> Tuple[Optional[EventSession], Optional[dict], int]:
     """
     Обновляет данные конкретной сессии экскурсии.
+    При увеличении max_participants новые места сразу отдаются листу ожидания сессии.
 
     :param event_id: ID экскурсии
     :param session_id: ID сессии
@@ -109,12 +119,17 @@ def update_event_session(
             session.start_datetime = datetime.fromisoformat(data['start_datetime'])
         except ValueError:
             return None, {"message": "Неверный формат start_datetime"}, HTTPStatus.BAD_REQUEST
+    seats_added = 'max_participants' in data and data['max_participants'] > session.max_participants
     if 'max_participants' in data:
         session.max_participants = data['max_participants']
     if 'cost' in data:
         session.cost = data['cost']
 
     try:
+        if seats_added:
+            db.session.flush()
+            promote_waitlist([session_id])
+        sync_event_catalog([event_id], structural=True)
         db.session.commit()
         return session, None, HTTPStatus.OK
     except Exception as e:
@@ -178,6 +193,7 @@ def delete_event_session(
                 db.session.delete(res.payment)
 
         db.session.delete(session)
+        sync_event_catalog([event_id], structural=True)
         db.session.commit()
 
         if notify_resident and csv_data:
@@ -1,45 +1,70 @@
-from typing import Optional
+from typing import Optional, List, Tuple
 
-from sqlalchemy import Subquery, desc, asc
+from sqlalchemy import ColumnElement, desc, asc
 from sqlalchemy.orm import Query
 
-from backend.core.models.event_models import Event
+from backend.core.models.event_models import Event, EventCatalog
 
 
-def apply_sorting(query: Query, sort_key: Optional[str], subquery: Subquery) -> Query:
+def build_sort_columns(sort_key: Optional[str]) -> List[Tuple[ColumnElement, bool]]:
     """
-    Применяет сортировку к SQLAlchemy Query по указанным полям.
+    Разбирает ключ сортировки в список колонок с направлением.
 
-    :param query: SQLAlchemy Query объект для модели Event
     :param sort_key: Строка с полями для сортировки, разделёнными запятыми.
                      Можно использовать '-' для сортировки по убыванию (например, "-price").
-                     Поддерживаются поля Event и агрегированные значения из subquery: 'price', 'time'.
-    :param subquery: Подзапрос с агрегированными значениями (например, min_cost, min_date)
-    :return: Обновленный Query с примененной сортировкой
+                     Поддерживаются колонки Event и агрегированные значения каталога: 'price', 'time'.
+    :return: Список кортежей (колонка, сортировка по убыванию)
     """
     if not sort_key:
-        return query
+        return []
 
     sort_fields = [s.strip() for s in sort_key.split(",") if s.strip()]
-    order_criteria = []
+    columns = []
 
     for field in sort_fields:
         is_desc = field.startswith("-")
         field_name = field.lstrip("-")
 
         if field_name == "price":
-            order = desc(subquery.c.min_cost) if is_desc else asc(subquery.c.min_cost)
+            column = EventCatalog.min_cost
         elif field_name == "time":
-            order = desc(subquery.c.min_date) if is_desc else asc(subquery.c.min_date)
-        elif hasattr(Event, field_name):
+            column = EventCatalog.min_date
+        elif field_name in Event.__table__.columns:
             column = getattr(Event, field_name)
-            order = desc(column) if is_desc else asc(column)
         else:
             continue
 
-        order_criteria.append(order)
+        columns.append((column, is_desc))
 
+    return columns
+
+
+def apply_order(query: Query, sort_columns: List[Tuple[ColumnElement, bool]]) -> Query:
+    """
+    Применяет к запросу сортировку по списку колонок. NULL-значения всегда идут последними,
+    чтобы порядок совпадал в SQLite и PostgreSQL.
+
+    :param query: SQLAlchemy Query объект для модели Event
+    :param sort_columns: Список кортежей (колонка, сортировка по убыванию)
+    :return: Обновленный Query с примененной сортировкой
+    """
+    order_criteria = [
+        (desc(column) if is_desc else asc(column)).nulls_last()
+        for column, is_desc in sort_columns
+    ]
     if order_criteria:
         query = query.order_by(*order_criteria)
-
     return query
+
+
+def apply_sorting(query: Query, sort_key: Optional[str]) -> Query:
+    """
+    Применяет сортировку к SQLAlchemy Query по указанным полям.
+
+    :param query: SQLAlchemy Query объект для модели Event
+    :param sort_key: Строка с полями для сортировки, разделёнными запятыми.
+                     Можно использовать '-' для сортировки по убыванию (например, "-price").
+                     Поддерживаются поля Event и агрегированные значения каталога: 'price', 'time'.
+    :return: Обновленный Query с примененной сортировкой
+    """
+    return apply_order(query, build_sort_columns(sort_key))
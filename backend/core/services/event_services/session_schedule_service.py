@@ -0,0 +1,318 @@
+from datetime import datetime, date, time, timedelta
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple, Iterable
+
+from dateutil.rrule import rrule, rrulestr
+from sqlalchemy import or_, exists, select
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.event_models import Event, EventSession, SessionSchedule, Reservation, Payment
+from backend.core.services.event_services.event_catalog import sync_event_catalog
+from backend.core.utilits.model_utils import dialect_insert
+
+SCHEDULE_FIELDS = ('rrule', 'start_time', 'start_date', 'until_date', 'max_participants', 'cost')
+FORBIDDEN_FREQUENCIES = ("MINUTELY", "SECONDLY")
+
+
+def build_rrule(rule_text: str, start_date: date, start_time: time, until_date: Optional[date] = None) -> rrule:
+    """
+    Строит правило повторения из строки RRULE (RFC 5545), даты начала, времени начала и даты окончания.
+
+    :param rule_text: Правило, например "FREQ=WEEKLY;BYDAY=SA,SU" (префикс "RRULE:" допускается)
+    :param start_date: Дата, с которой действует расписание
+    :param start_time: Время начала сессий
+    :param until_date: Последняя дата, в которую может быть сессия (включительно)
+    :return: Объект dateutil.rrule.rrule
+    :raises ValueError: если правило некорректно или повторяется чаще раза в час
+    """
+    text = rule_text.strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[len("RRULE:"):]
+    if any(part in text.upper() for part in ("DTSTART", "UNTIL=")):
+        raise ValueError("Дата начала и окончания задаются полями start_date и until_date, а не в rrule")
+    if any(f"FREQ={freq}" in text.upper() for freq in FORBIDDEN_FREQUENCIES):
+        raise ValueError("Сессии по расписанию не могут повторяться чаще раза в час")
+
+    try:
+        rule = rrulestr(text, dtstart=datetime.combine(start_date, start_time))
+        if until_date:
+            rule = rule.replace(until=datetime.combine(until_date, start_time))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Некорректное правило rrule: {e}") from e
+
+    if not isinstance(rule, rrule):
+        raise ValueError("rrule должно задавать одно правило повторения")
+    return rule
+
+
+def schedule_rrule(schedule: SessionSchedule) -> rrule:
+    """
+    Возвращает правило повторения сохранённого расписания.
+
+    :param schedule: Объект SessionSchedule
+    :return: Объект dateutil.rrule.rrule
+    """
+    return build_rrule(schedule.rrule, schedule.start_date, schedule.start_time, schedule.until_date)
+
+
+def parse_schedule_data(data: Dict[str, Any], current: Optional[SessionSchedule] = None) -> Dict[str, Any]:
+    """
+    Проверяет данные расписания и приводит их к типам колонок.
+
+    :param data: JSON-данные: rrule, start_time ("HH:MM"), start_date и until_date (ISO),
+                 max_participants, cost. Для изменения (current задан) все поля необязательны.
+    :param current: Изменяемое расписание или None при создании
+    :return: Словарь значений колонок SessionSchedule
+    :raises ValueError: если данные некорректны
+    """
+    values: Dict[str, Any] = {
+        name: getattr(current, name) for name in SCHEDULE_FIELDS
+    } if current else {'start_date': date.today(), 'until_date': None, 'cost': 0}
+
+    try:
+        if 'rrule' in data:
+            values['rrule'] = str(data['rrule'])
+        if 'start_time' in data:
+            values['start_time'] = time.fromisoformat(str(data['start_time']))
+        if 'start_date' in data:
+            values['start_date'] = date.fromisoformat(str(data['start_date']))
+        if 'until_date' in data:
+            values['until_date'] = date.fromisoformat(str(data['until_date'])) if data['until_date'] else None
+        if 'max_participants' in data:
+            values['max_participants'] = int(data['max_participants'])
+        if 'cost' in data:
+            values['cost'] = float(data['cost'])
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Некорректные данные расписания: {e}") from e
+
+    missing = [name for name in ('rrule', 'start_time', 'max_participants') if values.get(name) is None]
+    if missing:
+        raise ValueError(f"Обязательные поля расписания: {', '.join(missing)}")
+    if values['max_participants'] < 1 or values['cost'] < 0:
+        raise ValueError("max_participants должно быть положительным, cost — неотрицательной")
+    if values['until_date'] and values['until_date'] < values['start_date']:
+        raise ValueError("until_date не может быть раньше start_date")
+
+    build_rrule(values['rrule'], values['start_date'], values['start_time'], values['until_date'])
+    return values
+
+
+def schedule_horizon(now: datetime) -> datetime:
+    """
+    Возвращает конец скользящего горизонта, на который заранее создаются сессии.
+
+    Горизонт выровнен по началу суток, поэтому в течение дня повторные запуски фоновой задачи
+    ничего не делают.
+
+    :param now: Текущий момент времени
+    :return: Полночь через SCHEDULE_HORIZON_DAYS (+1) дней
+    """
+    return datetime.combine(now.date() + timedelta(days=Config.SCHEDULE_HORIZON_DAYS + 1), time.min)
+
+
+def materialize(schedules: Iterable[SessionSchedule], now: datetime, horizon_end: datetime) -> int:
+    """
+    Создаёт сессии по расписаниям до horizon_end одним пакетным INSERT ... ON CONFLICT DO NOTHING.
+
+    Для каждого расписания берутся вхождения из полуинтервала (max(now, materialized_until), horizon_end]:
+    вхождение ровно на границе горизонта (расписание на 00:00) создаётся в этом запуске, а следующий
+    запуск его не повторяет. Поэтому удалённые вручную сессии не создаются повторно, а уже
+    существующие пропускаются по уникальному ключу (schedule_id, start_datetime). Работает в текущей транзакции.
+
+    :param schedules: Расписания
+    :param now: Текущий момент времени; прошедшие вхождения не создаются
+    :param horizon_end: Конец горизонта
+    :return: Количество вхождений, переданных во вставку
+    """
+    rows = []
+    for schedule in schedules:
+        after = max(now, schedule.materialized_until or now)
+        rows.extend(
+            {
+                "event_id": schedule.event_id,
+                "schedule_id": schedule.schedule_id,
+                "start_datetime": start,
+                "max_participants": schedule.max_participants,
+                "cost": schedule.cost,
+            }
+            for start in schedule_rrule(schedule).between(after, horizon_end, inc=True)
+            if start > after
+        )
+        schedule.materialized_until = horizon_end
+
+    if rows:
+        table = EventSession.__table__
+        db.session.execute(
+            dialect_insert(table).on_conflict_do_nothing(index_elements=[table.c.schedule_id, table.c.start_datetime]),
+            rows
+        )
+    return len(rows)
+
+
+def materialize_due_schedules(now: Optional[datetime] = None) -> int:
+    """
+    Фоновая задача: продлевает сессии всех расписаний до конца скользящего горизонта.
+
+    Выбираются только расписания, у которых materialized_until отстаёт от горизонта и
+    until_date ещё не прошла; сессии вставляются одним пакетом, каталог пересчитывается один раз.
+
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: Количество вхождений, переданных во вставку
+    """
+    now = now or datetime.now()
+    horizon_end = schedule_horizon(now)
+    schedules = SessionSchedule.query.filter(
+        or_(SessionSchedule.materialized_until.is_(None), SessionSchedule.materialized_until < horizon_end),
+        or_(SessionSchedule.until_date.is_(None), SessionSchedule.until_date >= now.date())
+    ).all()
+    if not schedules:
+        return 0
+
+    count = materialize(schedules, now, horizon_end)
+    sync_event_catalog({schedule.event_id for schedule in schedules}, now, structural=True)
+    db.session.commit()
+    return count
+
+
+def delete_future_unbooked_sessions(schedule_id: int, now: datetime) -> int:
+    """
+    Удаляет будущие сессии расписания, на которые нет ни бронирований, ни платежей.
+
+    Сессии с бронированиями (в том числе отменёнными) сохраняются вместе с историей.
+
+    :param schedule_id: ID расписания
+    :param now: Текущий момент времени
+    :return: Количество удалённых сессий
+    """
+    table = EventSession.__table__
+    result = db.session.execute(
+        table.delete().where(
+            table.c.schedule_id == schedule_id,
+            table.c.start_datetime > now,
+            ~exists(select(Reservation.reservation_id).where(Reservation.session_id == table.c.session_id)),
+            ~exists(select(Payment.payment_id).where(Payment.session_id == table.c.session_id)),
+        )
+    )
+    return result.rowcount
+
+
+def get_schedules_for_event(event_id: int) -> List[SessionSchedule]:
+    """
+    Возвращает расписания экскурсии.
+
+    :param event_id: ID экскурсии
+    :return: Список объектов SessionSchedule
+    """
+    return SessionSchedule.query.filter_by(event_id=event_id).order_by(SessionSchedule.schedule_id).all()
+
+
+def add_schedules(event: Event, schedules: List[Dict[str, Any]], now: Optional[datetime] = None) -> None:
+    """
+    Добавляет расписания к экскурсии и сразу создаёт их сессии на горизонт (в текущей транзакции).
+
+    :param event: Объект Event с уже назначенным event_id
+    :param schedules: Список данных расписаний (см. parse_schedule_data)
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: None
+    :raises ValueError: если данные расписания некорректны
+    """
+    if not schedules:
+        return
+    now = now or datetime.now()
+    created = [SessionSchedule(event_id=event.event_id, **parse_schedule_data(data)) for data in schedules]
+    db.session.add_all(created)
+    db.session.flush()
+    materialize(created, now, schedule_horizon(now))
+    db.session.expire(event, ["sessions"])
+
+
+def create_schedule(event_id: int, data: dict) -> Tuple[Optional[SessionSchedule], Optional[dict], int]:
+    """
+    Создаёт расписание экскурсии и её сессии на горизонт.
+
+    :param event_id: ID экскурсии
+    :param data: Данные расписания (см. parse_schedule_data)
+    :return: Кортеж (расписание | None, словарь с ошибкой | None, HTTPStatus)
+    """
+    now = datetime.now()
+    try:
+        schedule = SessionSchedule(event_id=event_id, **parse_schedule_data(data))
+    except ValueError as e:
+        return None, {"message": str(e)}, HTTPStatus.BAD_REQUEST
+
+    try:
+        db.session.add(schedule)
+        db.session.flush()
+        materialize([schedule], now, schedule_horizon(now))
+        sync_event_catalog([event_id], now, structural=True)
+        db.session.commit()
+        return schedule, None, HTTPStatus.CREATED
+    except Exception as e:
+        db.session.rollback()
+        return None, {"message": f"Ошибка при создании расписания: {str(e)}"}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def update_schedule(
+        event_id: int,
+        schedule_id: int,
+        data: dict
+) -> Tuple[Optional[SessionSchedule], Optional[dict], int]:
+    """
+    Изменяет расписание. Будущие сессии без бронирований пересоздаются по новому правилу,
+    прошедшие и забронированные сессии не меняются.
+
+    :param event_id: ID экскурсии
+    :param schedule_id: ID расписания
+    :param data: Изменяемые поля расписания (см. parse_schedule_data)
+    :return: Кортеж (расписание | None, словарь с ошибкой | None, HTTPStatus)
+    """
+    schedule = SessionSchedule.query.filter_by(event_id=event_id, schedule_id=schedule_id).first()
+    if not schedule:
+        return None, {"message": "Расписание не найдено"}, HTTPStatus.NOT_FOUND
+
+    now = datetime.now()
+    try:
+        values = parse_schedule_data(data, schedule)
+    except ValueError as e:
+        return None, {"message": str(e)}, HTTPStatus.BAD_REQUEST
+
+    try:
+        for name, value in values.items():
+            setattr(schedule, name, value)
+        delete_future_unbooked_sessions(schedule_id, now)
+        schedule.materialized_until = None
+        materialize([schedule], now, schedule_horizon(now))
+        sync_event_catalog([event_id], now, structural=True)
+        db.session.commit()
+        return schedule, None, HTTPStatus.OK
+    except Exception as e:
+        db.session.rollback()
+        return None, {"message": f"Ошибка при обновлении расписания: {str(e)}"}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def delete_schedule(event_id: int, schedule_id: int) -> Tuple[dict, int]:
+    """
+    Удаляет расписание вместе с его будущими сессиями без бронирований.
+    Остальные сессии остаются у экскурсии как обычные.
+
+    :param event_id: ID экскурсии
+    :param schedule_id: ID расписания
+    :return: Кортеж (словарь с результатом, HTTPStatus)
+    """
+    schedule = SessionSchedule.query.filter_by(event_id=event_id, schedule_id=schedule_id).first()
+    if not schedule:
+        return {"message": "Расписание не найдено"}, HTTPStatus.NOT_FOUND
+
+    now = datetime.now()
+    try:
+        deleted = delete_future_unbooked_sessions(schedule_id, now)
+        table = EventSession.__table__
+        db.session.execute(table.update().where(table.c.schedule_id == schedule_id).values(schedule_id=None))
+        db.session.delete(schedule)
+        sync_event_catalog([event_id], now, structural=True)
+        db.session.commit()
+        return {"message": "Расписание удалено", "deleted_sessions": deleted}, HTTPStatus.OK
+    except Exception as e:
+        db.session.rollback()
+        return {"message": f"Ошибка при удалении расписания: {str(e)}"}, HTTPStatus.INTERNAL_SERVER_ERROR
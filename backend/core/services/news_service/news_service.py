@@ -7,6 +7,7 @@ from werkzeug.datastructures import FileStorage
 
 from backend.core import db
 from backend.core.models.news_models import NewsImage, News
+from backend.core.services.search_service.search_service import mark_search_changed, index_news, unindex_news
 from backend.core.services.user_services.user_service import get_user_by_email
 from backend.core.utilits.file_utils import save_image, remove_file_if_exists
 
@@ -54,7 +55,9 @@ def create_news_with_images(user_email: str, data_str: str, image_files: List[Fi
             news_image = NewsImage(news_id=news.news_id, image_path=image_path)
             db.session.add(news_image)
 
+    search_version = mark_search_changed()
     db.session.commit()
+    index_news(news, search_version)
 
     return {
         "message": "Новость успешно создана",
@@ -116,7 +119,9 @@ def update_news(news_id: int, form_data: dict, files: Optional[dict] = None) ->
             news_image = NewsImage(news_id=news.news_id, image_path=image_path)
             db.session.add(news_image)
 
+    search_version = mark_search_changed()
     db.session.commit()
+    index_news(news, search_version)
     return news, None
 
 
@@ -139,6 +144,8 @@ def delete_news(news_id: int) -> Tuple[bool, Optional[str]]:
         db.session.delete(image)
 
     db.session.delete(news)
+    search_version = mark_search_changed()
     db.session.commit()
+    unindex_news(news_id, search_version)
 
     return True, None
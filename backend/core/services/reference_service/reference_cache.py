@@ -0,0 +1,146 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, union_all, literal
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.auth_models import Role
+from backend.core.models.event_models import FormatType, Category, AgeCategory
+from backend.core.utilits.cache import TTLCache
+from backend.core.utilits.version_utils import get_data_version, REFERENCES_SCOPE
+
+# вид справочника -> (колонка ID, колонка названия, ключи в to_dict())
+REFERENCES = {
+    "roles": (Role.role_id, Role.role_name, ("role_id", "role_name")),
+    "age_categories": (AgeCategory.age_category_id, AgeCategory.age_category_name,
+                       ("age_category_id", "age_category_name")),
+    "format_types": (FormatType.format_type_id, FormatType.format_type_name,
+                     ("format_type_id", "format_type_name")),
+    "categories": (Category.category_id, Category.category_name, ("category_id", "category_name")),
+}
+
+_SNAPSHOT_KEY = "snapshot"
+
+references_cache = TTLCache("references", maxsize=1, ttl=Config.REFERENCE_CACHE_TTL)
+
+
+class ReferenceItem(NamedTuple):
+    id: int
+    name: str
+
+
+class ReferenceTable(NamedTuple):
+    by_name: Dict[str, ReferenceItem]
+    by_id: Dict[int, ReferenceItem]
+
+
+def load_references() -> Tuple[int, Dict[str, ReferenceTable]]:
+    """
+    Загружает все справочники (роли, категории, форматы, возрастные категории) одним запросом.
+
+    Версия REFERENCES_SCOPE читается до справочников, поэтому снимок не может оказаться
+    помеченным более новой версией, чем данные в нём.
+
+    :return: Кортеж (версия справочников, словарь {вид справочника: ReferenceTable})
+    """
+    version = get_data_version(REFERENCES_SCOPE)
+    statement = union_all(*(
+        select(literal(kind).label("kind"), id_column.label("id"), name_column.label("name"))
+        for kind, (id_column, name_column, _) in REFERENCES.items()
+    ))
+    statement = statement.order_by(statement.selected_columns.kind, statement.selected_columns.id)
+
+    snapshot = {kind: ReferenceTable({}, {}) for kind in REFERENCES}
+    for kind, id_value, name in db.session.execute(statement):
+        item = ReferenceItem(id_value, name)
+        snapshot[kind].by_name[name] = item
+        snapshot[kind].by_id[id_value] = item
+    return version, snapshot
+
+
+def refresh_references() -> Dict[str, ReferenceTable]:
+    """
+    Перечитывает справочники из БД и заменяет снимок в кэше процесса.
+
+    Вызывается при старте приложения и после commit в эндпоинтах /api/references/*.
+    Другие процессы подхватят изменения по истечении REFERENCE_CACHE_TTL, при первом
+    обращении к неизвестному названию или когда вызывающий передаст более новую версию.
+
+    :return: Новый снимок справочников
+    """
+    version, snapshot = load_references()
+    references_cache.set(_SNAPSHOT_KEY, (version, snapshot))
+    return snapshot
+
+
+def get_references(min_version: Optional[int] = None) -> Dict[str, ReferenceTable]:
+    """
+    Возвращает снимок справочников из кэша процесса, загружая его при необходимости.
+
+    :param min_version: Минимальная версия REFERENCES_SCOPE, которую должен отражать снимок.
+                        Если известная вызывающему версия новее, снимок перечитывается.
+    :return: Словарь {вид справочника: ReferenceTable}
+    """
+    cached = references_cache.get(_SNAPSHOT_KEY)
+    if cached is None or (min_version is not None and cached[0] < min_version):
+        return refresh_references()
+    return cached[1]
+
+
+def find_reference(kind: str, name: Optional[str]) -> Optional[ReferenceItem]:
+    """
+    Ищет значение справочника по названию без запроса к БД.
+
+    Если название не найдено, снимок один раз перечитывается: значение могло быть
+    добавлено в другом процессе.
+
+    :param kind: Вид справочника из REFERENCES
+    :param name: Название
+    :return: ReferenceItem или None, если значения нет
+    """
+    if name is None:
+        return None
+    item = get_references()[kind].by_name.get(name)
+    if item is None:
+        item = refresh_references()[kind].by_name.get(name)
+    return item
+
+
+def get_reference(kind: str, item_id: int) -> Optional[ReferenceItem]:
+    """
+    Возвращает значение справочника по ID без запроса к БД.
+
+    :param kind: Вид справочника из REFERENCES
+    :param item_id: ID значения
+    :return: ReferenceItem или None
+    """
+    return get_references()[kind].by_id.get(item_id)
+
+
+def resolve_reference_id(kind: str, name: Optional[str], error_message: str) -> int:
+    """
+    Возвращает ID значения справочника по названию.
+
+    :param kind: Вид справочника из REFERENCES
+    :param name: Название
+    :param error_message: Сообщение ошибки, если значение не найдено
+    :return: ID значения
+    :raises ValueError: если значение не найдено
+    """
+    item = find_reference(kind, name)
+    if item is None:
+        raise ValueError(error_message)
+    return item.id
+
+
+def list_references(kind: str, min_version: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Возвращает все значения справочника в формате to_dict() соответствующей модели.
+
+    :param kind: Вид справочника из REFERENCES
+    :param min_version: Минимальная версия REFERENCES_SCOPE (см. get_references)
+    :return: Список словарей, упорядоченный по ID
+    """
+    id_key, name_key = REFERENCES[kind][2]
+    items = get_references(min_version)[kind].by_id.values()
+    return [{id_key: item.id, name_key: item.name} for item in sorted(items, key=lambda item: item.id)]
@@ -0,0 +1,84 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select, union_all, literal, cast, Float
+
+from backend.core import db
+from backend.core.models.event_models import Event, EventSession
+from backend.core.services.reference_service.reference_cache import REFERENCES, list_references
+from backend.core.utilits.cache import TTLCache
+from backend.core.utilits.version_utils import get_data_versions, EVENTS_SCOPE, REFERENCES_SCOPE
+
+STATS_SCOPES = (EVENTS_SCOPE, REFERENCES_SCOPE)
+
+stats_cache = TTLCache("excursion_stats", maxsize=4, ttl=3600)
+
+
+def _range_row(kind: str, min_value, max_value, source, *conditions):
+    return (
+        select(
+            literal(kind).label("kind"),
+            cast(min_value, Float).label("min_value"),
+            cast(max_value, Float).label("max_value")
+        )
+        .select_from(source)
+        .where(*conditions)
+    )
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def compute_excursion_stats(references_version: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Считает статистику для фильтров каталога.
+
+    Диапазоны стоимости, расстояния до центра и времени до остановки выбираются одним UNION ALL,
+    а справочники берутся из кэша справочников без обращения к БД.
+
+    :param references_version: Версия справочников, которую должен отражать ответ
+    :return: Словарь в формате ответа /api/references/excursion-stats
+    """
+    statement = union_all(
+        _range_row("cost", func.min(EventSession.cost), func.max(EventSession.cost), EventSession),
+        _range_row("distance_to_center", func.min(Event.distance_to_center), func.max(Event.distance_to_center),
+                   Event, Event.is_active.is_(True)),
+        _range_row("time_to_stop", func.min(Event.time_to_nearest_stop), func.max(Event.time_to_nearest_stop),
+                   Event, Event.is_active.is_(True)),
+    )
+
+    stats: Dict[str, Any] = {kind: list_references(kind, references_version) for kind in REFERENCES}
+    for kind, min_value, max_value in db.session.execute(statement):
+        if kind == "cost":
+            stats[kind] = {"min": min_value, "max": max_value}
+        else:
+            stats[kind] = {"min": _round(min_value), "max": _round(max_value)}
+    return stats
+
+
+def get_stats_version() -> Dict[str, int]:
+    """
+    Возвращает версии данных, от которых зависит статистика (экскурсии/сессии и справочники).
+
+    :return: Словарь {scope: version}
+    """
+    return get_data_versions(*STATS_SCOPES)
+
+
+def get_excursion_stats() -> Dict[str, Any]:
+    """
+    Возвращает статистику для фильтров каталога из кэша процесса.
+
+    Кэш привязан к версиям EVENTS_SCOPE и REFERENCES_SCOPE. Они увеличиваются при записи
+    экскурсий, сессий и справочников, но не при бронированиях (те меняют только версии строк
+    event_catalog), поэтому пересчёт происходит только после изменения исходных данных статистики.
+
+    :return: Словарь в формате ответа /api/references/excursion-stats
+    """
+    versions = get_stats_version()
+    key = tuple(sorted(versions.items()))
+    stats = stats_cache.get(key)
+    if stats is None:
+        stats = compute_excursion_stats(versions[REFERENCES_SCOPE])
+        stats_cache.set(key, stats)
+    return stats
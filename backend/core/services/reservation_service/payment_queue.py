@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, or_, select, update, event as sa_event
+from sqlalchemy.orm import Session
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.event_models import Reservation, Payment
+from backend.core.services.reservation_service.yookassa_service import create_yookassa_payment, \
+    get_yookassa_payment, cancel_yookassa_payment
+from backend.core.utilits.background_pool import BackgroundPool
+
+# Платёж YooKassa создаётся не в потоке запроса: бронь сохраняется с payment_state='queued',
+# а запрос к провайдеру выполняет фоновый пул PAYMENT_WORKERS потоков процесса. Клиент опрашивает
+# GET /api/user/v2/reservations/<id>/payment, пока не появится payment_url. Медленный провайдер
+# занимает только потоки пула, а не воркеры gunicorn.
+#
+# Очередь — сами строки броней: заявки, потерянные при падении процесса или зависшие дольше
+# PAYMENT_REQUEST_TIMEOUT_SECONDS, подбирает периодическая задача resume_stale_payment_requests.
+# Повторная отправка безопасна: ключ идемпотентности YooKassa постоянен для брони,
+# поэтому провайдер вернёт уже созданный платёж.
+#
+# Платёж удержания, освобождённого без оплаты, не удаляется: он получает статус 'expired',
+# а после фиксации транзакции пул отменяет его в YooKassa (queue_payment_cancellation).
+# Если пользователь всё же оплатит его, обработчик вебхуков вернёт деньги.
+
+# Статус платежа освобождённого без оплаты удержания
+PAYMENT_EXPIRED = "expired"
+
+# Ключ Session.info со списком платежей, которые нужно отменить после фиксации транзакции
+PENDING_CANCELLATIONS_KEY = "payment_cancellations"
+
+payment_pool = BackgroundPool("payment-worker", Config.PAYMENT_WORKERS)
+
+
+def queue_payment_request(reservation: Reservation, now: Optional[datetime] = None) -> None:
+    """
+    Помечает бронь как ожидающую создания платежа. Изменение фиксирует вызывающий код,
+    после чего заявку нужно передать в пул через submit_payment_request.
+
+    :param reservation: Неоплаченная бронь
+    :param now: Момент заявки (по умолчанию datetime.now())
+    :return: None
+    """
+    reservation.payment_state = Reservation.PAYMENT_QUEUED
+    reservation.payment_requested_at = now or datetime.now()
+    reservation.payment_url = None
+
+
+def submit_payment_request(reservation_id: int) -> None:
+    """
+    Передаёт зафиксированную заявку на создание платежа в фоновый пул и сразу возвращает управление.
+
+    :param reservation_id: ID брони
+    :return: None
+    """
+    payment_pool.submit(process_payment_request, reservation_id)
+
+
+def _claimable(now: datetime):
+    stale = now - timedelta(seconds=Config.PAYMENT_REQUEST_TIMEOUT_SECONDS)
+    return or_(
+        Reservation.payment_state == Reservation.PAYMENT_QUEUED,
+        and_(Reservation.payment_state == Reservation.PAYMENT_PROCESSING, Reservation.payment_requested_at <= stale)
+    )
+
+
+def process_payment_request(reservation_id: int, now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Создаёт платёж YooKassa для брони из очереди и сохраняет ссылку на оплату.
+
+    Заявка сначала захватывается условным UPDATE (queued -> processing, payment_requested_at —
+    момент захвата), поэтому пул и задача восстановления не обрабатывают её одновременно.
+    Если удержание освободили, пока шёл запрос к провайдеру, платёж сохраняется без брони
+    со статусом 'expired' и отменяется в YooKassa.
+
+    :param reservation_id: ID брони
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: Ссылка на оплату или None, если заявка не обработана
+    """
+    now = now or datetime.now()
+    claimed = db.session.execute(
+        update(Reservation)
+        .where(Reservation.reservation_id == reservation_id, _claimable(now))
+        .values(payment_state=Reservation.PAYMENT_PROCESSING, payment_requested_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return None
+
+    reservation = db.session.get(Reservation, reservation_id)
+    if reservation is None or reservation.is_paid or reservation.is_cancelled:
+        return None
+
+    session = reservation.session
+    user_email = reservation.user.email
+    amount = session.cost * reservation.participants_count
+    existing = reservation.payment
+    try:
+        if existing is not None:
+            payment_response = get_yookassa_payment(existing.payment_id)
+        else:
+            payment_response = create_yookassa_payment(
+                amount=amount,
+                email=user_email,
+                description=f"Оплата экскурсии «{session.event.title}» на {session.start_datetime}",
+                quantity=reservation.participants_count,
+                metadata={
+                    "reservation_id": reservation_id,
+                    "session_id": session.session_id,
+                    "email": user_email
+                },
+                idempotency_key=f"reservation-{reservation_id}-{reservation.booked_at:%Y%m%d%H%M%S%f}"
+            )
+    except Exception as e:
+        db.session.rollback()
+        _finish_payment_request(reservation_id, Reservation.PAYMENT_FAILED)
+        db.session.commit()
+        print(f"Не удалось создать платёж для брони {reservation_id}: {e}")
+        return None
+
+    payment_url = payment_response.confirmation.confirmation_url
+    ready = _finish_payment_request(reservation_id, Reservation.PAYMENT_READY, payment_url)
+    if existing is None:
+        db.session.merge(Payment(
+            payment_id=payment_response.id,
+            session_id=session.session_id,
+            reservation_id=reservation_id if ready else None,
+            participants_count=reservation.participants_count,
+            email=user_email,
+            amount=amount,
+            currency='RUB',
+            status=payment_response.status if ready else PAYMENT_EXPIRED,
+            method=payment_response.payment_method.type
+        ))
+        if not ready:
+            queue_payment_cancellation([payment_response.id])
+    db.session.commit()
+    return payment_url if ready else None
+
+
+def _finish_payment_request(reservation_id: int, state: str, payment_url: Optional[str] = None) -> bool:
+    result = db.session.execute(
+        update(Reservation)
+        .where(
+            Reservation.reservation_id == reservation_id,
+            Reservation.payment_state == Reservation.PAYMENT_PROCESSING,
+            ~Reservation.is_paid
+        )
+        .values(payment_state=state, payment_url=payment_url)
+        .execution_options(synchronize_session="fetch")
+    )
+    return result.rowcount == 1
+
+
+def resume_stale_payment_requests(now: Optional[datetime] = None) -> List[int]:
+    """
+    Фоновая задача: обрабатывает заявки на платёж, которые дольше PAYMENT_REQUEST_TIMEOUT_SECONDS
+    остаются в очереди или в обработке (процесс, принявший заявку, упал или перезапустился).
+
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: ID броней, для которых создана ссылка на оплату
+    """
+    now = now or datetime.now()
+    stale = now - timedelta(seconds=Config.PAYMENT_REQUEST_TIMEOUT_SECONDS)
+    reservation_ids = db.session.scalars(
+        select(Reservation.reservation_id)
+        .where(
+            Reservation.payment_state.in_((Reservation.PAYMENT_QUEUED, Reservation.PAYMENT_PROCESSING)),
+            Reservation.payment_requested_at <= stale
+        )
+        .order_by(Reservation.reservation_id)
+    ).all()
+    db.session.commit()
+
+    return [reservation_id for reservation_id in reservation_ids if process_payment_request(reservation_id, now)]
+
+
+def queue_payment_cancellation(payment_ids: Iterable[str]) -> None:
+    """
+    Запоминает платежи, которые нужно отменить в YooKassa после фиксации текущей транзакции.
+    При откате транзакции список отбрасывается.
+
+    :param payment_ids: ID платежей
+    :return: None
+    """
+    db.session.info.setdefault(PENDING_CANCELLATIONS_KEY, []).extend(payment_ids)
+
+
+def cancel_payments(payment_ids: List[str]) -> None:
+    """
+    Отменяет платежи в YooKassa. Ошибка отмены (например, платёж уже нельзя отменить)
+    только печатается: если платёж всё же пройдёт, деньги вернёт обработчик вебхуков.
+
+    :param payment_ids: ID платежей
+    :return: None
+    """
+    for payment_id in payment_ids:
+        try:
+            cancel_yookassa_payment(payment_id)
+        except Exception as e:
+            print(f"Не удалось отменить платёж {payment_id}: {e}")
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _submit_payment_cancellations(session: Session) -> None:
+    payment_ids = session.info.pop(PENDING_CANCELLATIONS_KEY, None)
+    if payment_ids:
+        payment_pool.submit(cancel_payments, payment_ids)
+
+
+@sa_event.listens_for(Session, "after_soft_rollback")
+def _drop_payment_cancellations(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_CANCELLATIONS_KEY, None)
@@ -1,9 +1,15 @@
 from http import HTTPStatus
 from typing import Tuple, Dict, Any
 
+from sqlalchemy import select, update
+
 from backend.core import db
-from backend.core.models.event_models import Reservation
+from backend.core.models.auth_models import User
+from backend.core.models.event_models import EventSession, Reservation, WaitlistEntry
+from backend.core.services.event_services.event_catalog import sync_event_catalog
 from backend.core.services.email_service.email_service import send_reservation_refund_email
+from backend.core.services.reservation_service.seat_counter import release_reservations
+from backend.core.services.reservation_service.waitlist import promote_waitlist
 from backend.core.services.reservation_service.yookassa_service import refund_yookassa_payment
 from backend.core.services.user_services.user_service import get_user_by_email
 
@@ -11,6 +17,7 @@ from backend.core.services.user_services.user_service import get_user_by_email
 def cancel_user_reservation(user_email: str, reservation_id: int) -> Tuple[Dict[str, Any], HTTPStatus]:
     """
     Отменяет бронирование пользователя и при необходимости выполняет возврат средств через YooKassa.
+    Освободившиеся места в той же транзакции отдаются листу ожидания сессии.
 
     :param user_email: Email пользователя, который хочет отменить бронь
     :param reservation_id: ID бронирования
@@ -30,19 +37,24 @@ def cancel_user_reservation(user_email: str, reservation_id: int) -> Tuple[Dict[
     if reservation.is_cancelled:
         return {"message": "Бронирование уже отменено"}, HTTPStatus.BAD_REQUEST
 
+    # строка брони остаётся заблокированной до commit: одновременная отмена дождётся его
+    # и не найдёт неотменённой брони, поэтому места и деньги возвращаются один раз
+    if not release_reservations([reservation_id]):
+        db.session.rollback()
+        return {"message": "Бронирование уже отменено"}, HTTPStatus.BAD_REQUEST
+
     refund_done = False
-    if reservation.is_paid:
-        if reservation.payment:
-            try:
-                refund_yookassa_payment(reservation.payment.payment_id, float(reservation.payment.amount))
-                refund_done = True
-            except Exception as e:
-                print(f"Ошибка возврата средств YooKassa: {e}")
-                return {"message": "Не удалось сделать возврат средств"}, HTTPStatus.INTERNAL_SERVER_ERROR
-        else:
-            refund_done = False
-
-    reservation.is_cancelled = True
+    if reservation.is_paid and reservation.payment:
+        try:
+            refund_yookassa_payment(reservation.payment.payment_id, float(reservation.payment.amount))
+            refund_done = True
+        except Exception as e:
+            db.session.rollback()
+            print(f"Ошибка возврата средств YooKassa: {e}")
+            return {"message": "Не удалось сделать возврат средств"}, HTTPStatus.INTERNAL_SERVER_ERROR
+
+    promote_waitlist([reservation.session_id])
+    sync_event_catalog([reservation.session.event_id])
     db.session.commit()
 
     try:
@@ -54,3 +66,32 @@ def cancel_user_reservation(user_email: str, reservation_id: int) -> Tuple[Dict[
         return {"message": "Бронирование отменено, средства возвращены"}, HTTPStatus.OK
     else:
         return {"message": "Бронирование отменено"}, HTTPStatus.OK
+
+
+def release_user_reservations(user: User) -> None:
+    """
+    Освобождает места всех броней пользователя перед удалением его аккаунта, в текущей транзакции.
+
+    Брони отменяются условным запросом (release_reservations), заявки пользователя снимаются
+    с листов ожидания, и освободившиеся места сразу отдаются листам ожидания сессий.
+    Сами строки броней затем удаляются каскадом вместе с пользователем.
+
+    :param user: Удаляемый пользователь
+    :return: None
+    """
+    db.session.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.user_id == user.user_id, WaitlistEntry.status == WaitlistEntry.WAITING)
+        .values(status=WaitlistEntry.LEFT)
+        .execution_options(synchronize_session=False)
+    )
+    released = release_reservations(
+        db.session.scalars(select(Reservation.reservation_id).where(Reservation.user_id == user.user_id))
+    )
+    session_ids = {item.session_id for item in released if item.seats}
+    if not session_ids:
+        return
+    promote_waitlist(session_ids)
+    sync_event_catalog(db.session.scalars(
+        select(EventSession.event_id).where(EventSession.session_id.in_(session_ids)).distinct()
+    ))
@@ -1,13 +1,19 @@
+from datetime import datetime
 from http import HTTPStatus
 from typing import Tuple, Dict, Any
 
-from sqlalchemy import func
-
 from backend.core import db
-from backend.core.models.event_models import EventSession, Reservation, Payment
+from backend.core.models.event_models import EventSession, Reservation
+from backend.core.services.event_services.event_catalog import sync_event_catalog
 from backend.core.services.email_service.email_service import send_reservation_confirmation_email, \
     send_reservation_cancellation_email
-from backend.core.services.reservation_service.yookassa_service import create_yookassa_payment, refund_yookassa_payment
+from backend.core.services.reservation_service.seat_counter import reserve_seats, release_reservations
+from backend.core.services.reservation_service.seat_holds import hold_expires_at, release_expired_holds, \
+    release_holds
+from backend.core.services.reservation_service.waitlist import promote_waitlist
+from backend.core.services.reservation_service.payment_queue import queue_payment_request, \
+    submit_payment_request
+from backend.core.services.reservation_service.yookassa_service import refund_yookassa_payment
 from backend.core.services.user_services.user_service import get_user_by_email
 
 
@@ -23,6 +29,11 @@ def create_reservation_with_payment(
     Создает бронирование для указанного сеанса с обработкой оплаты через YooKassa.
 
     Если стоимость сеанса равна 0, бронирование считается оплаченным автоматически.
+    Места занимаются атомарно (см. reserve_seats): одновременные запросы не могут продать
+    больше мест, чем есть в сеансе. Неоплаченная бронь удерживает места до expires_at;
+    истёкшие удержания сеанса освобождаются перед проверкой мест. Платеж YooKassa создается
+    в фоновом пуле, поэтому для платного сеанса сразу возвращается 202 с ID брони,
+    а ссылку на оплату клиент получает опросом (get_reservation_payment_status).
 
     :param user_email: email пользователя, создающего бронь
     :param session_id: ID сеанса экскурсии
@@ -43,11 +54,9 @@ def create_reservation_with_payment(
     if not session:
         return {"message": "Сеанс не найден"}, HTTPStatus.NOT_FOUND
 
-    existing_participants = db.session.query(
-        func.coalesce(func.sum(Reservation.participants_count), 0)
-    ).filter_by(session_id=session_id, is_cancelled=False, is_paid=True).scalar()
-
-    if existing_participants + participants_count > session.max_participants:
+    release_expired_holds(session_ids=[session_id])
+    if not reserve_seats(session_id, participants_count):
+        db.session.commit()
         return {"message": "Недостаточно свободных мест"}, HTTPStatus.BAD_REQUEST
 
     amount = session.cost * participants_count
@@ -64,6 +73,7 @@ def create_reservation_with_payment(
             is_cancelled=False
         )
         db.session.add(reservation)
+        sync_event_catalog([session.event_id])
         db.session.commit()
 
         try:
@@ -84,47 +94,113 @@ def create_reservation_with_payment(
         email=email,
         participants_count=participants_count,
         is_paid=False,
-        is_cancelled=False
+        is_cancelled=False,
+        expires_at=hold_expires_at()
     )
+    queue_payment_request(reservation)
     db.session.add(reservation)
+    sync_event_catalog([session.event_id])
     db.session.commit()
+    submit_payment_request(reservation.reservation_id)
 
-    payment_response = create_yookassa_payment(
-        amount=amount,
-        email=user_email,
-        description=f"Оплата экскурсии «{session.event.title}» на {session.start_datetime}",
-        quantity=participants_count,
-        metadata={
-            "reservation_id": reservation.reservation_id,
-            "session_id": session_id,
-            "email": user_email
-        }
-    )
+    return {
+        "message": "Бронирование создано, ссылка на оплату готовится",
+        "reservation_id": reservation.reservation_id,
+        "payment_status": "pending"
+    }, HTTPStatus.ACCEPTED
 
-    payment = Payment(
-        payment_id=payment_response.id,
-        session_id=session_id,
-        reservation_id=reservation.reservation_id,
-        participants_count=participants_count,
-        email=user_email,
-        amount=amount,
-        currency='RUB',
-        status=payment_response.status,
-        method=payment_response.payment_method.type
-    )
-    db.session.add(payment)
-    db.session.commit()
 
+def payment_request_status(reservation: Reservation) -> Dict[str, Any]:
+    """
+    Описывает состояние оплаты брони для клиента, который ждёт ссылку на оплату.
+
+    :param reservation: бронь
+    :return: словарь с payment_status (pending, ready, failed, paid) и payment_url
+    """
+    if reservation.is_paid:
+        status = "paid"
+    elif reservation.payment_state == Reservation.PAYMENT_READY:
+        status = "ready"
+    elif reservation.payment_state == Reservation.PAYMENT_FAILED:
+        status = "failed"
+    else:
+        status = "pending"
     return {
-        "message": "Перейдите по ссылке для оплаты",
-        "payment_id": payment.payment_id,
-        "payment_url": payment_response.confirmation.confirmation_url
-    }, HTTPStatus.CREATED
+        "reservation_id": reservation.reservation_id,
+        "payment_status": status,
+        "payment_url": reservation.payment_url if status == "ready" else None,
+        "expires_at": reservation.expires_at.isoformat() if reservation.expires_at else None
+    }
+
+
+def get_reservation_payment_status(user_email: str, reservation_id: int) -> Tuple[Dict[str, Any], HTTPStatus]:
+    """
+    Возвращает состояние создания платежа брони пользователя (для опроса после бронирования).
+
+    :param user_email: email пользователя
+    :param reservation_id: ID брони
+    :return: кортеж (ответ в виде словаря, HTTP статус)
+    """
+    user = get_user_by_email(user_email)
+    if not user:
+        return {"message": "Пользователь не найден"}, HTTPStatus.UNAUTHORIZED
+
+    reservation = db.session.get(Reservation, reservation_id)
+    if not reservation or reservation.user_id != user.user_id:
+        return {"message": "Бронирование не найдено или не принадлежит вам"}, HTTPStatus.NOT_FOUND
+
+    return payment_request_status(reservation), HTTPStatus.OK
+
+
+def start_reservation_payment(user_email: str, reservation_id: int) -> Tuple[Dict[str, Any], HTTPStatus]:
+    """
+    Запрашивает ссылку на оплату неоплаченной брони пользователя (например, полученной из листа
+    ожидания или после неудачной попытки создать платеж).
+
+    Платеж создается в фоновом пуле (см. payment_queue): если ссылка уже готова или готовится,
+    возвращается текущее состояние, иначе бронь ставится в очередь. Истёкшее удержание
+    освобождается, и места переходят следующим в листе ожидания.
+
+    :param user_email: email пользователя
+    :param reservation_id: ID брони
+    :return: кортеж (ответ в виде словаря, HTTP статус)
+    """
+    user = get_user_by_email(user_email)
+    if not user:
+        return {"message": "Пользователь не найден"}, HTTPStatus.UNAUTHORIZED
+
+    reservation = db.session.get(Reservation, reservation_id)
+    if not reservation or reservation.user_id != user.user_id:
+        return {"message": "Бронирование не найдено или не принадлежит вам"}, HTTPStatus.NOT_FOUND
+
+    if reservation.is_cancelled:
+        return {"message": "Бронирование отменено"}, HTTPStatus.BAD_REQUEST
+
+    if reservation.is_paid:
+        return {"message": "Бронирование уже оплачено"}, HTTPStatus.BAD_REQUEST
+
+    if reservation.expires_at is not None and reservation.expires_at <= datetime.now():
+        release_holds([reservation_id])
+        db.session.commit()
+        return {"message": "Срок удержания мест истёк"}, HTTPStatus.GONE
+
+    if reservation.payment_state == Reservation.PAYMENT_READY:
+        return payment_request_status(reservation), HTTPStatus.OK
+
+    if reservation.payment_state not in (Reservation.PAYMENT_QUEUED, Reservation.PAYMENT_PROCESSING):
+        queue_payment_request(reservation)
+        db.session.commit()
+        submit_payment_request(reservation_id)
+
+    return payment_request_status(reservation), HTTPStatus.ACCEPTED
 
 
 def delete_reservation_with_refund(reservation_id: int) -> Tuple[bool, str, int]:
     """
     Удаляет бронирование и при необходимости выполняет возврат средств через YooKassa.
+    Бронь удаляется условным DELETE ... RETURNING до возврата (release_reservations), поэтому
+    одновременные удаления освобождают места и возвращают деньги один раз. Освободившиеся места
+    в той же транзакции отдаются листу ожидания сессии.
 
     :param reservation_id: ID бронирования для удаления
     :return: Кортеж (успех: bool, сообщение: str, HTTP-статус: int)
@@ -134,30 +210,46 @@ def delete_reservation_with_refund(reservation_id: int) -> Tuple[bool, str, int]
         return False, 'Бронь не найдена', 404
 
     user = reservation.user
+    payment = reservation.payment if reservation.is_paid else None
+    event_id = reservation.session.event_id
+    session_id = reservation.session_id
+
+    try:
+        released = release_reservations([reservation_id], remove=True)
+    except Exception as e:
+        db.session.rollback()
+        return False, f"Ошибка при удалении брони: {str(e)}", 500
+    if not released:
+        db.session.rollback()
+        return False, 'Бронь не найдена', 404
 
-    if reservation.is_paid and reservation.payment:
+    # уже отменённая бронь была возвращена при отмене
+    if payment and released[0].seats:
         try:
             refund = refund_yookassa_payment(
-                payment_id=reservation.payment.payment_id,
-                amount=reservation.payment.amount,
+                payment_id=payment.payment_id,
+                amount=payment.amount,
                 currency="RUB"
             )
             if refund.status != "succeeded":
+                db.session.rollback()
                 return False, f"Не удалось вернуть средства, статус возврата: {refund.status}", 400
 
         except Exception as e:
+            db.session.rollback()
             return False, f"Ошибка при попытке возврата средств: {str(e)}", 500
 
     try:
-        send_reservation_cancellation_email(user, reservation)
-    except Exception as e:
-        print(f"Ошибка при отправке email: {e}")
-
-    try:
-        db.session.delete(reservation)
+        promote_waitlist([session_id])
+        sync_event_catalog([event_id])
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         return False, f"Ошибка при удалении брони: {str(e)}", 500
 
+    try:
+        send_reservation_cancellation_email(user, reservation)
+    except Exception as e:
+        print(f"Ошибка при отправке email: {e}")
+
     return True, "Бронирование успешно удалено", 200
@@ -0,0 +1,183 @@
+from typing import Dict, List, NamedTuple, Optional, Iterable
+
+from sqlalchemy import case, delete, func, select, update
+
+from backend.core import db
+from backend.core.models.event_models import EventSession, Reservation, Payment
+from backend.core.services.event_services.event_catalog import sync_event_catalog
+
+# Счётчик EventSession.booked_seats — сумма participants_count неотменённых броней сессии.
+# Сервисы бронирования меняют его в той же транзакции, что и сами брони. Занятие мест
+# (reserve_seats) идёт до вставки брони, а освобождение — после условного изменения её строки
+# (release_reservations): счётчик уменьшается только на брони, которые изменил именно этот запрос.
+# reconcile_booked_seats читает только зафиксированные данные, поэтому незавершённое
+# освобождение не видит ни в строке брони, ни в счётчике.
+
+
+class ReleasedSeats(NamedTuple):
+    reservation_id: int
+    session_id: int
+    seats: int
+
+
+class SeatDrift(NamedTuple):
+    session_id: int
+    event_id: int
+    stored: int
+    actual: int
+
+
+def adjust_booked_seats(session_id: int, delta: int) -> None:
+    """
+    Атомарно изменяет счётчик занятых мест сессии (UPDATE ... SET booked_seats = booked_seats + delta).
+
+    :param session_id: ID сессии
+    :param delta: На сколько мест изменить счётчик (отрицательное значение освобождает места)
+    :return: None
+    """
+    if delta:
+        db.session.execute(
+            update(EventSession)
+            .where(EventSession.session_id == session_id)
+            .values(booked_seats=EventSession.booked_seats + delta)
+        )
+
+
+def reserve_seats(session_id: int, count: int) -> bool:
+    """
+    Атомарно занимает места в сессии, если их хватает.
+
+    Проверка и увеличение счётчика выполняются одним условным UPDATE:
+    UPDATE event_sessions SET booked_seats = booked_seats + :count
+    WHERE session_id = :id AND booked_seats + :count <= max_participants.
+    Конкурирующие транзакции ждут блокировку строки сессии и перепроверяют условие на её
+    новой версии, поэтому продать больше max_participants мест нельзя. Счётчик учитывает
+    и неоплаченные брони, то есть удерживаемые места.
+
+    :param session_id: ID сессии
+    :param count: Количество мест
+    :return: True, если места заняты; False, если свободных мест не хватает
+    """
+    result = db.session.execute(
+        update(EventSession)
+        .where(
+            EventSession.session_id == session_id,
+            EventSession.booked_seats + count <= EventSession.max_participants
+        )
+        .values(booked_seats=EventSession.booked_seats + count)
+        .execution_options(synchronize_session="fetch")
+    )
+    return result.rowcount == 1
+
+
+def release_reservations(reservation_ids: Iterable[int], remove: bool = False) -> List[ReleasedSeats]:
+    """
+    Отменяет (или удаляет) брони и освобождает их места в текущей транзакции.
+
+    Сначала выполняется условный запрос к броням: UPDATE ... SET is_cancelled = true
+    WHERE NOT is_cancelled RETURNING (или DELETE ... RETURNING при remove=True), и только затем
+    счётчики сессий уменьшаются на места, которые вернул этот запрос (один UPDATE на сессию).
+    Из двух одновременных отмен одной брони места освобождает только одна, поэтому счётчик
+    не уходит ниже реального числа занятых мест. Платежи удаляемых броней отвязываются.
+
+    :param reservation_ids: ID броней
+    :param remove: Удалить брони, а не пометить отменёнными
+    :return: Изменённые этим вызовом брони; seats — сколько мест освобождено (0 для уже отменённых)
+    """
+    ids = sorted(set(reservation_ids))
+    if not ids:
+        return []
+
+    if remove:
+        db.session.execute(
+            update(Payment)
+            .where(Payment.reservation_id.in_(ids))
+            .values(reservation_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        statement = delete(Reservation).where(Reservation.reservation_id.in_(ids)).returning(
+            Reservation.reservation_id, Reservation.session_id,
+            case((~Reservation.is_cancelled, Reservation.participants_count), else_=0)
+        )
+    else:
+        statement = (
+            update(Reservation)
+            .where(Reservation.reservation_id.in_(ids), ~Reservation.is_cancelled)
+            .values(is_cancelled=True)
+            .returning(Reservation.reservation_id, Reservation.session_id, Reservation.participants_count)
+        )
+    released = [
+        ReleasedSeats(*row)
+        for row in db.session.execute(statement.execution_options(synchronize_session=False))
+    ]
+
+    for item in released:
+        reservation = db.session.identity_map.get(db.session.identity_key(Reservation, item.reservation_id))
+        if reservation is None:
+            continue
+        if remove:
+            db.session.expunge(reservation)
+        else:
+            db.session.expire(reservation, ["is_cancelled"])
+
+    deltas: Dict[int, int] = {}
+    for item in released:
+        deltas[item.session_id] = deltas.get(item.session_id, 0) - item.seats
+    for session_id, delta in sorted(deltas.items()):
+        adjust_booked_seats(session_id, delta)
+    return released
+
+
+def find_seat_drift(session_ids: Optional[Iterable[int]] = None, lock: bool = False) -> List[SeatDrift]:
+    """
+    Находит сессии, у которых счётчик booked_seats расходится с суммой неотменённых броней.
+
+    :param session_ids: Проверяемые сессии (None — все)
+    :param lock: Заблокировать найденные строки сессий (SELECT ... FOR UPDATE) до конца транзакции
+    :return: Список расхождений
+    """
+    actual = (
+        select(Reservation.session_id, func.sum(Reservation.participants_count).label("booked"))
+        .where(~Reservation.is_cancelled)
+        .group_by(Reservation.session_id)
+        .subquery()
+    )
+    booked = func.coalesce(actual.c.booked, 0)
+    query = (
+        select(EventSession.session_id, EventSession.event_id, EventSession.booked_seats, booked)
+        .outerjoin(actual, actual.c.session_id == EventSession.session_id)
+        .where(EventSession.booked_seats != booked)
+        .order_by(EventSession.session_id)
+    )
+    if session_ids is not None:
+        query = query.where(EventSession.session_id.in_(list(session_ids)))
+    if lock:
+        query = query.with_for_update(of=EventSession)
+    return [SeatDrift(*row) for row in db.session.execute(query)]
+
+
+def reconcile_booked_seats(fix: bool = True) -> List[SeatDrift]:
+    """
+    Сверяет счётчики занятых мест с бронированиями и при fix=True исправляет расхождения.
+
+    Строки расходящихся сессий блокируются, затем сумма броней пересчитывается уже под блокировкой,
+    поэтому одновременные бронирования этих сессий не теряются.
+
+    :param fix: Исправить найденные расхождения (иначе только отчёт)
+    :return: Список найденных расхождений (для исправленных — со значением после пересчёта)
+    """
+    drift = find_seat_drift()
+    if not drift or not fix:
+        db.session.rollback()
+        return drift
+
+    drift = find_seat_drift([item.session_id for item in drift], lock=True)
+    for item in drift:
+        db.session.execute(
+            update(EventSession)
+            .where(EventSession.session_id == item.session_id)
+            .values(booked_seats=item.actual)
+        )
+    sync_event_catalog({item.event_id for item in drift})
+    db.session.commit()
+    return drift
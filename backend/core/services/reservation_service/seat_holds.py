@@ -0,0 +1,238 @@
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import and_, or_, select, update, delete
+from sqlalchemy.sql.elements import ColumnElement
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.event_models import EventSession, Reservation, Payment
+from backend.core.services.event_services.event_catalog import sync_event_catalog
+from backend.core.services.reservation_service.payment_queue import PAYMENT_EXPIRED, queue_payment_cancellation
+from backend.core.services.reservation_service.seat_counter import adjust_booked_seats
+from backend.core.services.reservation_service.waitlist import expire_promotions, promote_waitlist
+
+# Неоплаченная бронь — это удержание мест до Reservation.expires_at. Истёкшие удержания
+# освобождаются тремя путями: лениво при чтении мест сессии (release_expired_holds),
+# пакетной фоновой очисткой (sweep_expired_holds) и сразу по вебхуку payment.canceled (release_holds).
+
+
+# Статусы платежей YooKassa, по которым деньги уже не могут быть списаны
+DISPOSABLE_PAYMENT_STATUSES = ("canceled",)
+
+
+class ReleasedHold(NamedTuple):
+    reservation_id: int
+    session_id: int
+    participants_count: int
+
+
+class SweepStats(NamedTuple):
+    reservations: int
+    payments: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        rows = self.reservations + self.payments
+        return rows / self.seconds if self.seconds > 0 else float(rows)
+
+
+def hold_expires_at(now: Optional[datetime] = None) -> datetime:
+    """
+    Возвращает момент, до которого новая неоплаченная бронь удерживает места.
+
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: now + RESERVATION_HOLD_MINUTES
+    """
+    return (now or datetime.now()) + timedelta(minutes=Config.RESERVATION_HOLD_MINUTES)
+
+
+def active_hold_condition() -> ColumnElement:
+    """
+    Условие «бронь — действующее удержание»: не оплачена и не отменена.
+
+    :return: SQL-условие для Reservation
+    """
+    return and_(~Reservation.is_paid, ~Reservation.is_cancelled)
+
+
+def expired_hold_condition(now: datetime) -> ColumnElement:
+    """
+    Условие «удержание истекло». Для броней без expires_at (созданных до его появления)
+    срок отсчитывается от booked_at.
+
+    :param now: Текущий момент времени
+    :return: SQL-условие для Reservation
+    """
+    return and_(
+        active_hold_condition(),
+        or_(
+            Reservation.expires_at <= now,
+            and_(Reservation.expires_at.is_(None), Reservation.booked_at <= now - timedelta(
+                minutes=Config.RESERVATION_HOLD_MINUTES
+            ))
+        )
+    )
+
+
+def release_holds(reservation_ids: Iterable[int]) -> List[ReleasedHold]:
+    """
+    Удаляет указанные брони, если они всё ещё неоплаченные удержания, и возвращает их места.
+
+    Удаление идёт через DELETE ... RETURNING, и счётчики мест уменьшаются только на реально
+    удалённые строки, поэтому одновременные освобождения одной брони (очистка, чтение, вебхук)
+    и её оплата не портят счётчик. Платежи броней отвязываются и не удаляются: ожидающие оплаты
+    получают статус 'expired' и после фиксации транзакции отменяются в YooKassa, а оплату,
+    пришедшую позже, обработчик вебхуков возвращает. Освобождённые места сразу отдаются листам
+    ожидания сессий (promote_waitlist). Работает в текущей транзакции.
+
+    :param reservation_ids: ID броней
+    :return: Список освобождённых удержаний
+    """
+    ids = sorted(set(reservation_ids))
+    if not ids:
+        return []
+
+    holds = select(Reservation.reservation_id).where(Reservation.reservation_id.in_(ids), active_hold_condition())
+    expired_payments = db.session.scalars(
+        update(Payment)
+        .where(Payment.reservation_id.in_(holds), Payment.status == "pending")
+        .values(status=PAYMENT_EXPIRED)
+        .returning(Payment.payment_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    queue_payment_cancellation(expired_payments)
+    db.session.execute(
+        update(Payment)
+        .where(Payment.reservation_id.in_(holds))
+        .values(reservation_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    rows = db.session.execute(
+        delete(Reservation)
+        .where(Reservation.reservation_id.in_(ids), active_hold_condition())
+        .returning(Reservation.reservation_id, Reservation.session_id, Reservation.participants_count)
+        .execution_options(synchronize_session=False)
+    ).all()
+    released = [ReleasedHold(*row) for row in rows]
+    if not released:
+        return []
+    for hold in released:
+        reservation = db.session.identity_map.get(db.session.identity_key(Reservation, hold.reservation_id))
+        if reservation is not None:
+            db.session.expunge(reservation)
+
+    seats = {}
+    for hold in released:
+        seats[hold.session_id] = seats.get(hold.session_id, 0) + hold.participants_count
+    for session_id, count in sorted(seats.items()):
+        adjust_booked_seats(session_id, -count)
+    expire_promotions(hold.reservation_id for hold in released)
+    promote_waitlist(seats)
+
+    event_ids = db.session.scalars(
+        select(EventSession.event_id).where(EventSession.session_id.in_(seats)).distinct()
+    )
+    sync_event_catalog(event_ids)
+    return released
+
+
+def release_expired_holds(
+        session_ids: Optional[Iterable[int]] = None,
+        event_id: Optional[int] = None,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None
+) -> List[ReleasedHold]:
+    """
+    Освобождает истёкшие удержания (всех сессий, указанных сессий или одной экскурсии)
+    в текущей транзакции. Используется для ленивого освобождения перед чтением свободных мест
+    и как один пакет фоновой очистки.
+
+    Брони выбираются по частичному индексу ix_reservations_unpaid_holds и блокируются
+    с SKIP LOCKED: строки, которые сейчас освобождает или оплачивает другая транзакция, пропускаются.
+
+    :param session_ids: Ограничить сессиями
+    :param event_id: Ограничить сессиями экскурсии
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :param limit: Максимум освобождаемых броней за вызов
+    :return: Список освобождённых удержаний
+    """
+    now = now or datetime.now()
+    query = (
+        select(Reservation.reservation_id)
+        .where(expired_hold_condition(now))
+        .order_by(Reservation.reservation_id)
+        .with_for_update(skip_locked=True, of=Reservation)
+    )
+    if session_ids is not None:
+        query = query.where(Reservation.session_id.in_(list(session_ids)))
+    if event_id is not None:
+        query = query.join(EventSession, EventSession.session_id == Reservation.session_id).where(
+            EventSession.event_id == event_id
+        )
+    if limit is not None:
+        query = query.limit(limit)
+    return release_holds(db.session.scalars(query).all())
+
+
+def delete_orphaned_payments(now: datetime, limit: int) -> int:
+    """
+    Удаляет до limit отменённых в YooKassa платежей без брони, созданных раньше срока удержания.
+    Платежи, по которым деньги ещё могут прийти ('pending', 'expired'), сохраняются.
+
+    :param now: Текущий момент времени
+    :param limit: Максимум удаляемых платежей
+    :return: Количество удалённых платежей
+    """
+    threshold = now - timedelta(minutes=Config.RESERVATION_HOLD_MINUTES)
+    orphaned = (
+        select(Payment.payment_id)
+        .where(
+            Payment.reservation_id.is_(None),
+            Payment.status.in_(DISPOSABLE_PAYMENT_STATUSES),
+            Payment.created_at <= threshold
+        )
+        .limit(limit)
+    )
+    rows = db.session.execute(
+        delete(Payment)
+        .where(Payment.payment_id.in_(orphaned))
+        .returning(Payment.payment_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    return len(rows)
+
+
+def sweep_expired_holds(now: Optional[datetime] = None, batch_size: Optional[int] = None) -> SweepStats:
+    """
+    Фоновая задача: освобождает все истёкшие удержания и удаляет осиротевшие неоплаченные платежи
+    пакетами по batch_size строк, фиксируя каждый пакет отдельной транзакцией.
+
+    Память и длительность блокировок ограничены размером пакета независимо от накопившегося объёма.
+
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :param batch_size: Размер пакета (по умолчанию HOLD_SWEEP_BATCH_SIZE)
+    :return: Статистика очистки (количество строк, время, строк в секунду)
+    """
+    now = now or datetime.now()
+    batch_size = batch_size or Config.HOLD_SWEEP_BATCH_SIZE
+    started = time.perf_counter()
+    reservations = payments = 0
+
+    while True:
+        released = release_expired_holds(now=now, limit=batch_size)
+        db.session.commit()
+        reservations += len(released)
+        if len(released) < batch_size:
+            break
+
+    while True:
+        deleted = delete_orphaned_payments(now, batch_size)
+        db.session.commit()
+        payments += deleted
+        if deleted < batch_size:
+            break
+
+    return SweepStats(reservations, payments, time.perf_counter() - started)
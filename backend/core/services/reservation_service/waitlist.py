@@ -0,0 +1,258 @@
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event as sa_event, func, select, update
+from sqlalchemy.orm import Session
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.event_models import EventSession, Reservation, WaitlistEntry
+from backend.core.services.email_service.email_service import send_waitlist_promotion_email
+from backend.core.services.event_services.event_catalog import sync_event_catalog
+from backend.core.services.reservation_service.seat_counter import reserve_seats
+from backend.core.services.user_services.user_service import get_user_by_email
+
+# Лист ожидания продвигается по событиям, а не опросом: каждый сервис, который освобождает
+# места сессии (отмена и удаление брони, освобождение удержаний, увеличение max_participants),
+# в той же транзакции вызывает promote_waitlist. Письма продвинутым пользователям уходят
+# только после фиксации транзакции (см. _send_promotion_emails).
+
+# Ключ Session.info со списком писем, ожидающих фиксации транзакции
+PENDING_EMAILS_KEY = "waitlist_promotion_emails"
+
+
+def join_waitlist(
+        user_email: str,
+        session_id: int,
+        full_name: str,
+        phone_number: str,
+        email: str,
+        participants_count: int
+) -> Tuple[Dict[str, Any], HTTPStatus]:
+    """
+    Добавляет заявку в лист ожидания сессии, в которой сейчас не хватает мест.
+
+    Строка сессии блокируется на время проверки, поэтому заявка не может «разминуться»
+    с одновременным освобождением мест: освобождение либо произойдёт раньше (и в сессию можно
+    будет просто записаться), либо дождётся фиксации заявки и продвинет её. Места истёкших,
+    но ещё не освобождённых удержаний считаются занятыми: их освобождение продвинет очередь.
+
+    :param user_email: email пользователя
+    :param session_id: ID сеанса экскурсии
+    :param full_name: имя участника
+    :param phone_number: телефон участника
+    :param email: email участника
+    :param participants_count: количество участников
+    :return: кортеж (ответ в виде словаря, HTTP статус)
+    """
+    user = get_user_by_email(user_email)
+    if not user:
+        return {"message": "Пользователь не найден"}, HTTPStatus.UNAUTHORIZED
+
+    if not session_id:
+        return {"message": "session_id is required"}, HTTPStatus.BAD_REQUEST
+
+    session = db.session.scalars(
+        select(EventSession).where(EventSession.session_id == session_id).with_for_update()
+    ).first()
+    if not session:
+        db.session.commit()
+        return {"message": "Сеанс не найден"}, HTTPStatus.NOT_FOUND
+
+    if session.start_datetime <= datetime.now():
+        db.session.commit()
+        return {"message": "Сеанс уже начался"}, HTTPStatus.BAD_REQUEST
+
+    if participants_count > session.max_participants:
+        db.session.commit()
+        return {"message": "В сеансе меньше мест, чем участников в заявке"}, HTTPStatus.BAD_REQUEST
+
+    if session.booked_seats + participants_count <= session.max_participants:
+        db.session.commit()
+        return {"message": "Свободные места есть — забронируйте сеанс"}, HTTPStatus.CONFLICT
+
+    duplicate = WaitlistEntry.query.filter_by(
+        session_id=session_id, user_id=user.user_id, status=WaitlistEntry.WAITING
+    ).first()
+    if duplicate:
+        db.session.commit()
+        return {"message": "Вы уже в листе ожидания этого сеанса"}, HTTPStatus.CONFLICT
+
+    entry = WaitlistEntry(
+        session_id=session_id,
+        user_id=user.user_id,
+        full_name=full_name,
+        phone_number=phone_number,
+        email=email,
+        participants_count=participants_count,
+        status=WaitlistEntry.WAITING
+    )
+    db.session.add(entry)
+    db.session.commit()
+
+    return {
+        "message": "Вы добавлены в лист ожидания",
+        "entry_id": entry.entry_id,
+        "position": get_waitlist_position(entry)
+    }, HTTPStatus.CREATED
+
+
+def get_waitlist_position(entry: WaitlistEntry) -> Optional[int]:
+    """
+    Возвращает место ожидающей заявки в очереди сессии (с 1).
+
+    :param entry: Заявка
+    :return: Номер в очереди или None, если заявка уже не ожидает
+    """
+    if entry.status != WaitlistEntry.WAITING:
+        return None
+    return db.session.scalar(
+        select(func.count(WaitlistEntry.entry_id)).where(
+            WaitlistEntry.session_id == entry.session_id,
+            WaitlistEntry.status == WaitlistEntry.WAITING,
+            WaitlistEntry.entry_id <= entry.entry_id
+        )
+    )
+
+
+def get_waitlist_for_user(user_email: str) -> Tuple[Dict[str, Any], HTTPStatus]:
+    """
+    Возвращает заявки пользователя в листах ожидания (новые первыми) с местом в очереди.
+
+    :param user_email: email пользователя
+    :return: кортеж (словарь с ключом "waitlist", HTTP статус)
+    """
+    user = get_user_by_email(user_email)
+    if not user:
+        return {"message": "Пользователь не найден"}, HTTPStatus.UNAUTHORIZED
+
+    entries = WaitlistEntry.query.filter_by(user_id=user.user_id).order_by(WaitlistEntry.entry_id.desc()).all()
+    return {
+        "waitlist": [entry.to_dict(position=get_waitlist_position(entry)) for entry in entries]
+    }, HTTPStatus.OK
+
+
+def leave_waitlist(user_email: str, entry_id: int) -> Tuple[Dict[str, Any], HTTPStatus]:
+    """
+    Удаляет ожидающую заявку пользователя из очереди.
+
+    :param user_email: email пользователя
+    :param entry_id: ID заявки
+    :return: кортеж (ответ в виде словаря, HTTP статус)
+    """
+    user = get_user_by_email(user_email)
+    if not user:
+        return {"message": "Пользователь не найден"}, HTTPStatus.UNAUTHORIZED
+
+    result = db.session.execute(
+        update(WaitlistEntry)
+        .where(
+            WaitlistEntry.entry_id == entry_id,
+            WaitlistEntry.user_id == user.user_id,
+            WaitlistEntry.status == WaitlistEntry.WAITING
+        )
+        .values(status=WaitlistEntry.LEFT)
+        .execution_options(synchronize_session="fetch")
+    )
+    db.session.commit()
+    if result.rowcount != 1:
+        return {"message": "Заявка не найдена или уже не в очереди"}, HTTPStatus.NOT_FOUND
+    return {"message": "Заявка удалена из листа ожидания"}, HTTPStatus.OK
+
+
+def promote_waitlist(session_ids: Iterable[int], now: Optional[datetime] = None) -> List[WaitlistEntry]:
+    """
+    Продвигает листы ожидания сессий, в которых освободились места, в текущей транзакции.
+
+    Очередь обслуживается строго по порядку: головная заявка получает места через reserve_seats,
+    и продвижение останавливается на первой заявке, которой мест не хватает. Платная сессия даёт
+    продвинутой заявке бронь-удержание на WAITLIST_HOLD_MINUTES (при истечении места снова идут
+    в очередь), бесплатная — сразу подтверждённую бронь. Строка сессии блокируется до заявок,
+    в том же порядке, что и при освобождении мест, поэтому одновременные продвижения одной
+    очереди выполняются по очереди и не выдают одну заявку дважды.
+
+    :param session_ids: ID сессий, в которых освободились места
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: Список продвинутых заявок
+    """
+    now = now or datetime.now()
+    promoted: List[WaitlistEntry] = []
+
+    for session_id in sorted(set(session_ids)):
+        session = db.session.scalars(
+            select(EventSession).where(EventSession.session_id == session_id).with_for_update()
+        ).first()
+        if session is None or session.start_datetime <= now:
+            continue
+
+        entries = db.session.scalars(
+            select(WaitlistEntry)
+            .where(WaitlistEntry.session_id == session_id, WaitlistEntry.status == WaitlistEntry.WAITING)
+            .order_by(WaitlistEntry.entry_id)
+            .with_for_update()
+        ).all()
+        for entry in entries:
+            if not reserve_seats(session_id, entry.participants_count):
+                break
+            is_free = session.cost * entry.participants_count == 0
+            reservation = Reservation(
+                session_id=session_id,
+                user_id=entry.user_id,
+                full_name=entry.full_name,
+                phone_number=entry.phone_number,
+                email=entry.email,
+                participants_count=entry.participants_count,
+                is_paid=is_free,
+                is_cancelled=False,
+                expires_at=None if is_free else now + timedelta(minutes=Config.WAITLIST_HOLD_MINUTES)
+            )
+            db.session.add(reservation)
+            db.session.flush()
+
+            entry.status = WaitlistEntry.PROMOTED
+            entry.promoted_at = now
+            entry.reservation_id = reservation.reservation_id
+            promoted.append(entry)
+            db.session.info.setdefault(PENDING_EMAILS_KEY, []).append({
+                "recipient": entry.email,
+                "full_name": entry.full_name,
+                "event_title": session.event.title,
+                "session_start": session.start_datetime,
+                "participants_count": entry.participants_count,
+                "reservation_id": reservation.reservation_id,
+                "hold_until": reservation.expires_at,
+            })
+
+    if promoted:
+        sync_event_catalog({entry.session.event_id for entry in promoted})
+    return promoted
+
+
+def expire_promotions(reservation_ids: Iterable[int]) -> None:
+    """
+    Помечает истёкшими продвинутые заявки, удержания которых освобождены без оплаты.
+
+    :param reservation_ids: ID освобождённых броней
+    :return: None
+    """
+    ids = list(reservation_ids)
+    if ids:
+        db.session.execute(
+            update(WaitlistEntry)
+            .where(WaitlistEntry.reservation_id.in_(ids), WaitlistEntry.status == WaitlistEntry.PROMOTED)
+            .values(status=WaitlistEntry.EXPIRED, reservation_id=None)
+            .execution_options(synchronize_session=False)
+        )
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _send_promotion_emails(session: Session) -> None:
+    for kwargs in session.info.pop(PENDING_EMAILS_KEY, []):
+        send_waitlist_promotion_email(**kwargs)
+
+
+@sa_event.listens_for(Session, "after_soft_rollback")
+def _drop_promotion_emails(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_EMAILS_KEY, None)
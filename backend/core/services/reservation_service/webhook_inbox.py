@@ -0,0 +1,315 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, select, update
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.event_models import Reservation, Payment
+from backend.core.models.system_models import WebhookInbox
+from backend.core.services.email_service.email_service import send_reservation_confirmation_email
+from backend.core.services.reservation_service.seat_holds import release_holds
+from backend.core.services.reservation_service.yookassa_service import refund_yookassa_payment
+from backend.core.utilits.background_pool import BackgroundPool
+from backend.core.utilits.job_scheduler import LeaderLock
+from backend.core.utilits.model_utils import dialect_insert
+
+# Вебхук YooKassa только сохраняется во входящую очередь webhook_inbox (один INSERT ... ON CONFLICT
+# DO NOTHING) и сразу подтверждается; статусы применяет обработчик process_webhook_inbox. Он
+# запускается фоновым потоком после каждого нового события и периодической задачей (события,
+# не обработанные из-за падения процесса или ошибки). Одновременно очередь обрабатывает один
+# процесс кластера (LeaderLock), события идут в порядке inbox_id, поэтому события одного платежа
+# применяются в порядке поступления.
+
+# Статус платежа, который устанавливает событие
+PAYMENT_STATUS_BY_EVENT = {
+    "payment.succeeded": "succeeded",
+    "payment.canceled": "canceled",
+    "refund.succeeded": "refunded",
+}
+
+webhook_pool = BackgroundPool("webhook-worker", 1)
+inbox_lock = LeaderLock("webhook-inbox")
+_process_lock = threading.Lock()
+
+
+class InboxEvent(NamedTuple):
+    inbox_id: int
+    event: str
+    payment_id: Optional[str]
+    payload: Dict[str, Any]
+
+
+def record_webhook_event(payload: Dict[str, Any]) -> Optional[bool]:
+    """
+    Сохраняет вебхук во входящую очередь и фиксирует транзакцию.
+
+    :param payload: JSON вебхука ({"event": ..., "object": {"id": ..., ...}})
+    :return: True — событие сохранено, False — повторная доставка уже сохранённого события,
+             None — в вебхуке нет события или ID объекта
+    """
+    event = payload.get("event")
+    object_data = payload.get("object") or {}
+    object_id = object_data.get("id")
+    if not event or not object_id:
+        return None
+
+    # у возврата свой ID; события упорядочиваются по платежу, к которому он относится
+    payment_id = object_data.get("payment_id") if event.startswith("refund.") else object_id
+    table = WebhookInbox.__table__
+    inserted = db.session.execute(
+        dialect_insert(table).values(
+            event=event, object_id=str(object_id), payment_id=payment_id,
+            payload=json.dumps(payload, ensure_ascii=False), received_at=datetime.now(), attempts=0
+        ).on_conflict_do_nothing(index_elements=[table.c.event, table.c.object_id])
+    ).rowcount
+    db.session.commit()
+    return bool(inserted)
+
+
+def submit_webhook_processing() -> None:
+    """
+    Запускает обработку входящей очереди в фоновом потоке и сразу возвращает управление.
+
+    :return: None
+    """
+    webhook_pool.submit(process_webhook_inbox)
+
+
+def apply_webhook_events(events: Iterable[InboxEvent]) -> List[int]:
+    """
+    Применяет пакет событий в текущей транзакции несколькими групповыми запросами.
+
+    События проходят в порядке поступления: для каждого платежа остаётся последний статус,
+    затем выполняется один UPDATE платежей на статус, оплаченные брони помечаются одним UPDATE,
+    а удержания отменённых платежей освобождаются одним вызовом release_holds. Оплата брони,
+    которой уже нет или которая отменена (удержание истекло до оплаты), возвращается
+    (refund_late_payment); при ошибке возврата событие будет повторено.
+
+    :param events: События в порядке inbox_id
+    :return: ID броней, ставших оплаченными
+    """
+    statuses: Dict[str, str] = {}
+    succeeded: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    for item in events:
+        status = PAYMENT_STATUS_BY_EVENT.get(item.event)
+        if status is None or not item.payment_id:
+            continue
+        statuses[item.payment_id] = status
+        if item.event == "payment.succeeded":
+            object_data = item.payload.get("object") or {}
+            reservation_id = (object_data.get("metadata") or {}).get("reservation_id")
+            if reservation_id:
+                succeeded[item.payment_id] = (int(reservation_id), object_data)
+    succeeded_reservations: Set[int] = {reservation_id for reservation_id, _ in succeeded.values()}
+
+    by_status: Dict[str, List[str]] = {}
+    for payment_id, status in statuses.items():
+        by_status.setdefault(status, []).append(payment_id)
+    for status, payment_ids in sorted(by_status.items()):
+        db.session.execute(
+            update(Payment)
+            .where(Payment.payment_id.in_(payment_ids))
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+
+    paid: List[int] = []
+    if succeeded_reservations:
+        paid = db.session.scalars(
+            update(Reservation)
+            .where(
+                Reservation.reservation_id.in_(succeeded_reservations),
+                ~Reservation.is_paid,
+                ~Reservation.is_cancelled
+            )
+            .values(is_paid=True, expires_at=None)
+            .returning(Reservation.reservation_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        settled = set(db.session.scalars(
+            select(Reservation.reservation_id).where(
+                Reservation.reservation_id.in_(succeeded_reservations),
+                Reservation.is_paid,
+                ~Reservation.is_cancelled
+            )
+        ))
+        for payment_id, (reservation_id, object_data) in succeeded.items():
+            if reservation_id not in settled and statuses[payment_id] == "succeeded":
+                refund_late_payment(payment_id, object_data)
+
+    canceled = by_status.get("canceled")
+    if canceled:
+        release_holds(db.session.scalars(
+            select(Payment.reservation_id).where(Payment.payment_id.in_(canceled), Payment.reservation_id.isnot(None))
+        ).all())
+    return paid
+
+
+def refund_late_payment(payment_id: str, object_data: Dict[str, Any]) -> None:
+    """
+    Возвращает платёж, прошедший после освобождения или отмены его брони.
+
+    Сумма берётся из вебхука, а если её там нет — из локальной записи платежа. Ключ
+    идемпотентности постоянен для платежа, поэтому повторная обработка события не создаёт
+    второй возврат.
+
+    :param payment_id: ID платежа YooKassa
+    :param object_data: Объект платежа из вебхука
+    :return: None
+    """
+    amount = object_data.get("amount") or {}
+    value, currency = amount.get("value"), amount.get("currency") or "RUB"
+    if value is None:
+        payment = db.session.get(Payment, payment_id)
+        if payment is None:
+            print(f"Не удалось вернуть платёж {payment_id}: неизвестна сумма")
+            return
+        value, currency = payment.amount, payment.currency or "RUB"
+    refund_yookassa_payment(payment_id, float(value), currency, idempotency_key=f"late-refund-{payment_id}")
+    print(f"Платёж {payment_id} прошёл после освобождения брони, выполнен возврат")
+
+
+def _mark_processed(inbox_ids: List[int], now: datetime) -> None:
+    db.session.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.inbox_id.in_(inbox_ids))
+        .values(processed_at=now, attempts=WebhookInbox.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _record_failure(item: InboxEvent, error: Exception, now: datetime) -> None:
+    db.session.rollback()
+    attempts = WebhookInbox.attempts + 1
+    db.session.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.inbox_id == item.inbox_id)
+        .values(
+            attempts=attempts,
+            last_error=f"{type(error).__name__}: {error}",
+            # после WEBHOOK_MAX_ATTEMPTS событие снимается с очереди, чтобы не задерживать остальные
+            processed_at=case((attempts >= Config.WEBHOOK_MAX_ATTEMPTS, now), else_=None)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    print(f"Ошибка обработки вебхука {item.event} {item.payment_id}: {error}")
+
+
+def process_webhook_batch(batch_size: Optional[int] = None, now: Optional[datetime] = None) -> Tuple[int, int, int]:
+    """
+    Обрабатывает один пакет необработанных событий одной транзакцией.
+
+    Если пакет целиком применить не удалось, события применяются по одному; после ошибки
+    события того же платежа в этом проходе пропускаются, чтобы не нарушить их порядок.
+
+    :param batch_size: Размер пакета (по умолчанию WEBHOOK_BATCH_SIZE)
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: (количество выбранных событий, количество обработанных, наибольший inbox_id пакета или 0)
+    """
+    now = now or datetime.now()
+    rows = db.session.execute(
+        select(WebhookInbox.inbox_id, WebhookInbox.event, WebhookInbox.payment_id, WebhookInbox.payload)
+        .where(WebhookInbox.processed_at.is_(None))
+        .order_by(WebhookInbox.inbox_id)
+        .limit(batch_size or Config.WEBHOOK_BATCH_SIZE)
+    ).all()
+    if not rows:
+        db.session.commit()
+        return 0, 0, 0
+    events = [InboxEvent(row.inbox_id, row.event, row.payment_id, json.loads(row.payload)) for row in rows]
+
+    try:
+        paid = apply_webhook_events(events)
+        _mark_processed([item.inbox_id for item in events], now)
+        db.session.commit()
+        processed = len(events)
+    except Exception:
+        db.session.rollback()
+        paid, processed, blocked = [], 0, set()
+        for item in events:
+            if item.payment_id in blocked:
+                continue
+            try:
+                paid += apply_webhook_events([item])
+                _mark_processed([item.inbox_id], now)
+                db.session.commit()
+                processed += 1
+            except Exception as e:
+                _record_failure(item, e, now)
+                blocked.add(item.payment_id)
+
+    _send_payment_confirmations(paid)
+    return len(events), processed, events[-1].inbox_id
+
+
+def _send_payment_confirmations(reservation_ids: List[int]) -> None:
+    if not reservation_ids:
+        return
+    for reservation in Reservation.query.filter(Reservation.reservation_id.in_(reservation_ids)):
+        try:
+            send_reservation_confirmation_email(reservation, reservation.user)
+        except Exception as e:
+            print(f"Ошибка при отправке письма: {e}")
+
+
+def _has_pending_after(inbox_id: int) -> bool:
+    pending = db.session.scalar(
+        select(WebhookInbox.inbox_id)
+        .where(WebhookInbox.processed_at.is_(None), WebhookInbox.inbox_id > inbox_id)
+        .limit(1)
+    )
+    db.session.commit()
+    return pending is not None
+
+
+def process_webhook_inbox(batch_size: Optional[int] = None) -> int:
+    """
+    Обрабатывает входящую очередь вебхуков пакетами, пока в ней есть новые события.
+
+    Если очередь уже обрабатывает другой поток или процесс, сразу возвращает 0: события
+    подхватит текущий обработчик. После снятия блокировки очередь проверяется ещё раз,
+    поэтому событие, сохранённое во время завершения обработки, не ждёт периодической задачи.
+
+    :param batch_size: Размер пакета (по умолчанию WEBHOOK_BATCH_SIZE)
+    :return: Количество обработанных событий
+    """
+    if not _process_lock.acquire(blocking=False):
+        return 0
+    try:
+        total, last_seen = 0, 0
+        while inbox_lock.try_acquire():
+            try:
+                while True:
+                    selected, processed, last_id = process_webhook_batch(batch_size)
+                    total += processed
+                    last_seen = max(last_seen, last_id)
+                    # после ошибки оставшиеся события ждут следующего запуска
+                    if not selected or processed < selected:
+                        break
+            finally:
+                inbox_lock.release()
+            if not _has_pending_after(last_seen):
+                break
+        return total
+    finally:
+        _process_lock.release()
+
+
+def purge_processed_webhooks(now: Optional[datetime] = None) -> int:
+    """
+    Фоновая задача: удаляет обработанные события старше WEBHOOK_INBOX_RETENTION_DAYS.
+    До этого срока повторные доставки провайдера распознаются как дубликаты.
+
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: Количество удалённых событий
+    """
+    threshold = (now or datetime.now()) - timedelta(days=Config.WEBHOOK_INBOX_RETENTION_DAYS)
+    result = db.session.execute(
+        delete(WebhookInbox).where(WebhookInbox.processed_at.isnot(None), WebhookInbox.processed_at <= threshold)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -27,7 +27,8 @@ Configuration.configure(
 )
 
 
-def create_yookassa_payment(amount, email, description, quantity=1, metadata=None, currency='RUB'):
+def create_yookassa_payment(amount, email, description, quantity=1, metadata=None, currency='RUB',
+                            idempotency_key=None):
     try:
         quantity = round(quantity, 2)
         unit_price = round(amount / quantity, 2)
@@ -66,7 +67,8 @@ def create_yookassa_payment(amount, email, description, quantity=1, metadata=Non
                 "payment_method_data": {
                     "type": "bank_card"
                 }
-            }
+            },
+            idempotency_key
         )
 
         print(f"[OK] Создан платёж {payment.id}")
@@ -80,7 +82,16 @@ def create_yookassa_payment(amount, email, description, quantity=1, metadata=Non
         raise
 
 
-def refund_yookassa_payment(payment_id: str, amount: float, currency: str = "RUB") -> Refund:
+def get_yookassa_payment(payment_id: str) -> Payment:
+    return Payment.find_one(payment_id)
+
+
+def cancel_yookassa_payment(payment_id: str) -> Payment:
+    return Payment.cancel(payment_id, f"cancel-{payment_id}")
+
+
+def refund_yookassa_payment(payment_id: str, amount: float, currency: str = "RUB",
+                            idempotency_key=None) -> Refund:
     refund = Refund.create({
         "payment_id": payment_id,
         "amount": {
@@ -88,7 +99,7 @@ def refund_yookassa_payment(payment_id: str, amount: float, currency: str = "RUB
             "currency": currency
         },
         "comment": "Возврат за отменённое бронирование"
-    }, uuid.uuid4())
+    }, idempotency_key or uuid.uuid4())
     return refund
 
 # def refund_yookassa_payment(payment_id, amount, receipt, currency="RUB"):
@@ -0,0 +1,127 @@
+"""
+Стеммер русского языка по алгоритму Snowball (Porter, «Russian stemming algorithm»).
+
+Реализация без внешних зависимостей; используется поисковым индексом для приведения
+словоформ к общей основе («экскурсии», «экскурсия», «экскурсией» -> «экскурс»).
+"""
+from typing import Iterable, List, Optional, Tuple
+
+VOWELS = "аеиоуыэюя"
+
+# Окончания, помеченные True, должны следовать за «а» или «я» (группа 1 в описании алгоритма).
+PERFECTIVE_GERUND = [("в", True), ("вши", True), ("вшись", True),
+                     ("ив", False), ("ивши", False), ("ившись", False),
+                     ("ыв", False), ("ывши", False), ("ывшись", False)]
+ADJECTIVE = [(e, False) for e in (
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею"
+)]
+PARTICIPLE = [("ем", True), ("нн", True), ("вш", True), ("ющ", True), ("щ", True),
+              ("ивш", False), ("ывш", False), ("ующ", False)]
+REFLEXIVE = [("ся", False), ("сь", False)]
+VERB = [(e, True) for e in (
+    "ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"
+)] + [(e, False) for e in (
+    "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+    "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"
+)]
+NOUN = [(e, False) for e in (
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+    "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я"
+)]
+SUPERLATIVE = [("ейше", False), ("ейш", False)]
+DERIVATIONAL = [("ость", False), ("ост", False)]
+
+
+def _by_length(endings: Iterable[Tuple[str, bool]]) -> List[Tuple[str, bool]]:
+    return sorted(endings, key=lambda item: len(item[0]), reverse=True)
+
+
+PERFECTIVE_GERUND, ADJECTIVE, PARTICIPLE, REFLEXIVE, VERB, NOUN, SUPERLATIVE, DERIVATIONAL = map(
+    _by_length, (PERFECTIVE_GERUND, ADJECTIVE, PARTICIPLE, REFLEXIVE, VERB, NOUN, SUPERLATIVE, DERIVATIONAL)
+)
+
+
+def _regions(word: str) -> Tuple[int, int]:
+    """
+    Возвращает начала областей RV и R2.
+
+    RV — часть слова после первой гласной; R1 — после первой согласной, следующей за гласной;
+    R2 — то же правило, применённое внутри R1.
+    """
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    return rv, next_region(r1)
+
+
+def _match(rv: str, endings: List[Tuple[str, bool]]) -> Optional[str]:
+    """Находит самое длинное подходящее окончание в RV с учётом условия «после а/я»."""
+    for ending, after_a in endings:
+        if rv.endswith(ending):
+            pos = len(rv) - len(ending)
+            if not after_a or (pos > 0 and rv[pos - 1] in "ая"):
+                return ending
+    return None
+
+
+def stem(word: str) -> str:
+    """
+    Возвращает основу русского слова.
+
+    :param word: Слово в нижнем регистре
+    :return: Основа слова (для слов без гласных — само слово)
+    """
+    word = word.replace("ё", "е")
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    # Шаг 1: деепричастие, иначе возвратная частица + прилагательное/глагол/существительное
+    ending = _match(rv, PERFECTIVE_GERUND)
+    if ending:
+        rv = rv[:-len(ending)]
+    else:
+        ending = _match(rv, REFLEXIVE)
+        if ending:
+            rv = rv[:-len(ending)]
+
+        ending = _match(rv, ADJECTIVE)
+        if ending:
+            rv = rv[:-len(ending)]
+            participle = _match(rv, PARTICIPLE)
+            if participle:
+                rv = rv[:-len(participle)]
+        else:
+            ending = _match(rv, VERB) or _match(rv, NOUN)
+            if ending:
+                rv = rv[:-len(ending)]
+
+    # Шаг 2
+    if rv.endswith("и"):
+        rv = rv[:-1]
+
+    # Шаг 3: словообразовательное окончание в R2
+    ending = _match(rv, DERIVATIONAL)
+    if ending and len(prefix) + len(rv) - len(ending) >= r2_start:
+        rv = rv[:-len(ending)]
+
+    # Шаг 4: «нн» -> «н», превосходная степень, мягкий знак
+    ending = _match(rv, SUPERLATIVE)
+    if ending:
+        rv = rv[:-len(ending)]
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    elif rv.endswith("ь"):
+        rv = rv[:-1]
+
+    return prefix + rv
@@ -0,0 +1,189 @@
+import heapq
+import math
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from backend.core.services.search_service.text_analysis import tokenize
+
+DocKey = Tuple[str, Hashable]
+
+
+class _Document:
+    __slots__ = ("terms", "length", "payload")
+
+    def __init__(self, terms: Dict[str, float], length: float, payload: Dict[str, Any]):
+        self.terms = terms
+        self.length = length
+        self.payload = payload
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс в памяти процесса с ранжированием BM25.
+
+    Документ состоит из нескольких текстовых полей с весами (например, заголовок важнее описания):
+    частота терма и длина документа считаются с учётом весов полей (упрощённый BM25F).
+    Для каждого документа хранится небольшой payload, который возвращается в результатах поиска,
+    поэтому поиск не обращается к БД.
+
+    Атрибут version — версия данных, которой соответствует индекс (None — индекс не построен).
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.version: Optional[int] = None
+        self._docs: Dict[DocKey, _Document] = {}
+        self._postings: Dict[str, Dict[DocKey, float]] = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def _analyze(fields: Iterable[Tuple[str, float]]) -> Tuple[Dict[str, float], float]:
+        terms: Counter = Counter()
+        length = 0.0
+        for text, weight in fields:
+            tokens = tokenize(text)
+            length += weight * len(tokens)
+            for token in tokens:
+                terms[token] += weight
+        return dict(terms), length
+
+    def _remove(self, key: DocKey) -> None:
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        self._total_length -= doc.length
+        for term in doc.terms:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+
+    def _advance(self, version: Optional[int]) -> None:
+        """
+        Сдвигает версию индекса после инкрементального изменения.
+
+        Если изменение не следующее по счёту (значит, были изменения из других процессов),
+        индекс помечается устаревшим и будет перестроен при следующем поиске.
+        """
+        if version is None:
+            return
+        self.version = version if self.version is not None and self.version == version - 1 else None
+
+    def upsert(
+            self,
+            key: DocKey,
+            fields: Iterable[Tuple[str, float]],
+            payload: Dict[str, Any],
+            version: Optional[int] = None
+    ) -> None:
+        """
+        Добавляет или заменяет документ.
+
+        :param key: Ключ документа (тип, id)
+        :param fields: Пары (текст поля, вес)
+        :param payload: Данные, возвращаемые в результатах поиска
+        :param version: Версия данных после этого изменения
+        :return: None
+        """
+        self.upsert_many([(key, fields, payload)], version)
+
+    def upsert_many(
+            self,
+            documents: Iterable[Tuple[DocKey, Iterable[Tuple[str, float]], Dict[str, Any]]],
+            version: Optional[int] = None
+    ) -> None:
+        """
+        Добавляет или заменяет несколько документов как одно изменение данных.
+
+        :param documents: Тройки (ключ, поля, payload)
+        :param version: Версия данных после этого изменения
+        :return: None
+        """
+        analyzed = [(key, self._analyze(fields), payload) for key, fields, payload in documents]
+        with self._lock:
+            for key, (terms, length), payload in analyzed:
+                self._remove(key)
+                self._docs[key] = _Document(terms, length, payload)
+                self._total_length += length
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[key] = tf
+            self._advance(version)
+
+    def remove(self, key: DocKey, version: Optional[int] = None) -> None:
+        """
+        Удаляет документ из индекса.
+
+        :param key: Ключ документа
+        :param version: Версия данных после этого изменения
+        :return: None
+        """
+        with self._lock:
+            self._remove(key)
+            self._advance(version)
+
+    def replace_all(self, documents: Iterable[Tuple[DocKey, Iterable[Tuple[str, float]], Dict[str, Any]]],
+                    version: int) -> None:
+        """
+        Перестраивает индекс целиком. Новый индекс собирается отдельно и подменяет старый атомарно.
+
+        :param documents: Тройки (ключ, поля, payload)
+        :param version: Версия данных, по которой построен индекс
+        :return: None
+        """
+        docs: Dict[DocKey, _Document] = {}
+        postings: Dict[str, Dict[DocKey, float]] = {}
+        total_length = 0.0
+        for key, fields, payload in documents:
+            terms, length = self._analyze(fields)
+            docs[key] = _Document(terms, length, payload)
+            total_length += length
+            for term, tf in terms.items():
+                postings.setdefault(term, {})[key] = tf
+
+        with self._lock:
+            self._docs, self._postings, self._total_length = docs, postings, total_length
+            self.version = version
+
+    def search(
+            self,
+            query: str,
+            limit: int = 20,
+            accept: Optional[Callable[[DocKey, Dict[str, Any]], bool]] = None
+    ) -> List[Tuple[DocKey, float, Dict[str, Any]]]:
+        """
+        Ищет документы по запросу и ранжирует их по BM25.
+
+        :param query: Текст запроса
+        :param limit: Максимальное количество результатов
+        :param accept: Необязательный фильтр по (ключ, payload)
+        :return: Список (ключ, score, payload) по убыванию релевантности
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            total_docs = len(self._docs)
+            if not terms or not total_docs:
+                return []
+            avg_length = self._total_length / total_docs or 1.0
+
+            scores: Dict[DocKey, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._docs[key].length / avg_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            candidates = (
+                (key, score) for key, score in scores.items()
+                if accept is None or accept(key, self._docs[key].payload)
+            )
+            top = heapq.nlargest(limit, candidates, key=lambda item: (item[1], str(item[0])))
+            return [(key, score, self._docs[key].payload) for key, score in top]
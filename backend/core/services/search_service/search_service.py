@@ -0,0 +1,159 @@
+from typing import Any, Dict, List, Optional, Iterable
+
+from sqlalchemy.orm import load_only, selectinload
+
+from backend.core.models.event_models import Event
+from backend.core.models.news_models import News
+from backend.core.services.search_service.search_index import SearchIndex
+from backend.core.utilits.version_utils import get_data_version, bump_data_version, SEARCH_SCOPE
+
+EXCURSION = "excursion"
+NEWS = "news"
+SEARCH_KINDS = (EXCURSION, NEWS)
+
+TITLE_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+TEXT_WEIGHT = 1.0
+
+search_index = SearchIndex()
+
+
+def _event_document(event: Event):
+    fields = [
+        (event.title, TITLE_WEIGHT),
+        (" ".join(tag.name for tag in event.tags), TAG_WEIGHT),
+        (event.description, TEXT_WEIGHT),
+    ]
+    payload = {"type": EXCURSION, "id": event.event_id, "title": event.title, "is_active": bool(event.is_active)}
+    return (EXCURSION, event.event_id), fields, payload
+
+
+def _news_document(news: News):
+    fields = [(news.title, TITLE_WEIGHT), (news.content, TEXT_WEIGHT)]
+    payload = {
+        "type": NEWS,
+        "id": news.news_id,
+        "title": news.title,
+        "created_at": news.created_at.isoformat() if news.created_at else None,
+    }
+    return (NEWS, news.news_id), fields, payload
+
+
+def build_search_index() -> int:
+    """
+    Полностью перестраивает поисковый индекс по экскурсиям и новостям.
+
+    :return: Количество документов в индексе
+    """
+    version = get_data_version(SEARCH_SCOPE)
+    events = Event.query.options(
+        load_only(Event.event_id, Event.title, Event.description, Event.is_active),
+        selectinload(Event.tags)
+    ).all()
+    news = News.query.options(load_only(News.news_id, News.title, News.content, News.created_at)).all()
+
+    documents = [_event_document(event) for event in events] + [_news_document(item) for item in news]
+    search_index.replace_all(documents, version)
+    return len(search_index)
+
+
+def ensure_search_index() -> None:
+    """
+    Перестраивает индекс, если он не построен или отстал от данных
+    (например, экскурсию изменил другой процесс приложения).
+
+    Проверка стоит одного запроса по первичному ключу таблицы data_versions.
+
+    :return: None
+    """
+    if search_index.version != get_data_version(SEARCH_SCOPE):
+        build_search_index()
+
+
+def mark_search_changed() -> int:
+    """
+    Отмечает изменение поисковых данных в текущей транзакции. Вызывается перед commit.
+
+    :return: Версия данных, которую нужно передать в index_event / index_news после commit
+    """
+    return bump_data_version(SEARCH_SCOPE)
+
+
+def index_event(event: Event, version: int) -> None:
+    """
+    Добавляет или обновляет экскурсию в индексе после успешного commit.
+
+    :param event: Объект Event
+    :param version: Версия, полученная от mark_search_changed
+    :return: None
+    """
+    key, fields, payload = _event_document(event)
+    search_index.upsert(key, fields, payload, version)
+
+
+def index_events(events: Iterable[Event], version: int) -> None:
+    """
+    Добавляет в индекс несколько экскурсий, изменённых в одной транзакции, после её commit.
+
+    :param events: Объекты Event (с загруженными тегами)
+    :param version: Версия, полученная от mark_search_changed
+    :return: None
+    """
+    search_index.upsert_many([_event_document(event) for event in events], version)
+
+
+def unindex_event(event_id: int, version: int) -> None:
+    """
+    Удаляет экскурсию из индекса после успешного commit.
+
+    :param event_id: ID экскурсии
+    :param version: Версия, полученная от mark_search_changed
+    :return: None
+    """
+    search_index.remove((EXCURSION, event_id), version)
+
+
+def index_news(news: News, version: int) -> None:
+    """
+    Добавляет или обновляет новость в индексе после успешного commit.
+
+    :param news: Объект News
+    :param version: Версия, полученная от mark_search_changed
+    :return: None
+    """
+    key, fields, payload = _news_document(news)
+    search_index.upsert(key, fields, payload, version)
+
+
+def unindex_news(news_id: int, version: int) -> None:
+    """
+    Удаляет новость из индекса после успешного commit.
+
+    :param news_id: ID новости
+    :param version: Версия, полученная от mark_search_changed
+    :return: None
+    """
+    search_index.remove((NEWS, news_id), version)
+
+
+def search(query: str, kinds: Optional[Iterable[str]] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Полнотекстовый поиск по экскурсиям и новостям (BM25, русская морфология).
+
+    Неактивные экскурсии в выдачу не попадают.
+
+    :param query: Текст запроса
+    :param kinds: Типы документов (excursion, news); None — все
+    :param limit: Максимальное количество результатов
+    :return: Список результатов {"type", "id", "title", "score", ...} по убыванию релевантности
+    """
+    ensure_search_index()
+    kinds = set(kinds or SEARCH_KINDS)
+
+    def accept(key, payload) -> bool:
+        return key[0] in kinds and payload.get("is_active", True)
+
+    return [
+        {**{k: v for k, v in payload.items() if k != "is_active"}, "score": round(score, 4)}
+        for _, score, payload in search_index.search(query, limit, accept)
+    ]
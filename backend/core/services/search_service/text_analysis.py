@@ -0,0 +1,30 @@
+import re
+from typing import List
+
+from backend.core.services.search_service.russian_stemmer import stem
+
+WORD_RE = re.compile(r"[^\W_]+")
+CYRILLIC_RE = re.compile(r"[а-яё]")
+
+STOP_WORDS = frozenset("""
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да для до его ее ей
+    если есть еще же за и из или им их к как ко когда кто ли либо мне может мы на над нам нас не него нее
+    нет ни них но ну о об однако он она они оно от очень по под после при про с со так также такой там те
+    тем то того тоже той только том ты у уже хотя чем что чтобы эта эти это этого этой этом этот я
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбивает текст на поисковые термы: нижний регистр, «ё» -> «е», без стоп-слов,
+    русские слова приводятся к основе стеммером Snowball.
+
+    :param text: Исходный текст
+    :return: Список термов в порядке следования в тексте
+    """
+    terms = []
+    for word in WORD_RE.findall((text or "").lower().replace("ё", "е")):
+        if word in STOP_WORDS:
+            continue
+        terms.append(stem(word) if CYRILLIC_RE.search(word) else word)
+    return terms
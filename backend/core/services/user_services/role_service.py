@@ -1,13 +1,13 @@
 from typing import Optional
 
-from backend.core.models.auth_models import Role
+from backend.core.services.reference_service.reference_cache import ReferenceItem, find_reference
 
 
-def get_role_by_name(role_name: str) -> Optional[Role]:
+def get_role_by_name(role_name: str) -> Optional[ReferenceItem]:
     """
-    Получение роли по имени.
+    Получение роли по имени из кэша справочников (без запроса к БД).
 
     :param role_name: Название роли
-    :return: Объект Role или None, если роль не найдена
+    :return: ReferenceItem роли (id, name) или None, если роль не найдена
     """
-    return Role.query.filter_by(role_name=role_name).first()
+    return find_reference("roles", role_name)
@@ -4,7 +4,7 @@ from typing import Optional, List, Tuple, Dict
 from flask_jwt_extended import create_access_token, get_jwt_identity
 
 from backend.core import db
-from backend.core.models.auth_models import User, Role
+from backend.core.models.auth_models import User
 from backend.core.services.user_services.role_service import get_role_by_name
 
 
@@ -53,7 +53,7 @@ def create_user(email: str, password: str, full_name: str, phone: str, role_name
         email=email,
         full_name=full_name,
         phone=phone,
-        role_id=role.role_id
+        role_id=role.id
     )
     new_user.set_password(password)
 
@@ -66,11 +66,18 @@ def delete_user(email: str) -> bool:
     """
     Удаление пользователя по email.
 
+    Перед удалением места броней пользователя освобождаются и отдаются листам ожидания,
+    иначе каскадное удаление броней оставило бы их в счётчиках занятых мест сессий.
+
     :param email: Email пользователя
     :return: True, если пользователь удалён, False если пользователь не найден
     """
+    # сервис бронирований сам зависит от user_service, поэтому импортируется при вызове
+    from backend.core.services.reservation_service.reservation_cancel import release_user_reservations
+
     user = get_user_by_email(email)
     if user:
+        release_user_reservations(user)
         db.session.delete(user)
         db.session.commit()
         return True
@@ -178,10 +185,10 @@ def update_user(email: str, data: dict) -> Optional['User']:
 
     if 'role_name' in data:
         role_name = data['role_name']
-        role = Role.query.filter_by(role_name=role_name).first()
+        role = get_role_by_name(role_name)
         if not role:
             raise ValueError(f"Роль '{role_name}' не найдена")
-        user.role_id = role.role_id
+        user.role_id = role.id
 
     db.session.commit()
     return user
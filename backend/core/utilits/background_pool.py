@@ -0,0 +1,47 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from flask import Flask, current_app
+
+from backend.core import db
+
+
+class BackgroundPool:
+    """
+    Пул потоков процесса для фоновых задач, которым нужен контекст приложения.
+
+    Потоки создаются лениво при первой задаче, то есть уже в процессе воркера gunicorn (после fork),
+    а не в мастер-процессе. Ошибка задачи откатывает сессию БД и печатается, не затрагивая пул.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> None:
+        """
+        Ставит задачу в очередь пула и сразу возвращает управление.
+
+        :param func: Функция задачи; вызывается в контексте текущего приложения
+        :param args: Аргументы функции
+        :return: None
+        """
+        app = current_app._get_current_object()
+        self._get_executor().submit(self._run, app, func, args)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+            return self._executor
+
+    def _run(self, app: Flask, func: Callable[..., Any], args: tuple) -> None:
+        with app.app_context():
+            try:
+                func(*args)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Ошибка фоновой задачи {self.name}: {type(e).__name__}: {e}")
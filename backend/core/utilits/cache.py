@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+_registry: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """
+    Потокобезопасный in-process кэш с ограничением размера (LRU) и временем жизни записей.
+
+    Ведёт счётчики попаданий и промахов; все созданные кэши регистрируются по имени,
+    чтобы их статистику можно было отдать через API (см. get_cache_stats).
+    """
+
+    def __init__(self, name: str, maxsize: int = 256, ttl: float = 60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Возвращает значение по ключу или default, если записи нет или она устарела.
+
+        :param key: Хешируемый ключ
+        :param default: Значение при промахе
+        :return: Закэшированное значение или default
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Сохраняет значение; при переполнении вытесняет давно не использованные записи.
+
+        :param key: Хешируемый ключ
+        :param value: Значение
+        :return: None
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Удаляет все записи (счётчики сохраняются)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику кэша.
+
+        :return: Словарь с размером, лимитами и счётчиками попаданий/промахов
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+def get_cache(name: str) -> Optional[TTLCache]:
+    """
+    Возвращает зарегистрированный кэш по имени.
+
+    :param name: Имя кэша
+    :return: Объект TTLCache или None
+    """
+    return _registry.get(name)
+
+
+def get_cache_stats() -> List[Dict[str, Any]]:
+    """
+    Возвращает статистику всех зарегистрированных кэшей.
+
+    :return: Список словарей TTLCache.stats()
+    """
+    return [cache.stats() for cache in _registry.values()]
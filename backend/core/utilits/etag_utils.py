@@ -0,0 +1,54 @@
+import hashlib
+from functools import wraps
+from http import HTTPStatus
+from typing import Any, Callable
+
+from flask import request, Response
+
+
+def make_etag(stamp: Any) -> str:
+    """
+    Строит сильный ETag по версии данных и адресу запроса (путь + параметры).
+
+    :param stamp: Дешёвая версия данных (счётчик изменений, метка времени и т.п.)
+    :return: Значение ETag без кавычек
+    """
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    raw = f"{request.path}?{query}|{stamp}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def etag(stamp_func: Callable[..., Any]) -> Callable:
+    """
+    Декоратор GET-метода ресурса: поддержка ETag / If-None-Match.
+
+    ETag вычисляется из результата stamp_func (вызывается с теми же аргументами пути, что и метод),
+    а не из тела ответа. Если клиент прислал совпадающий If-None-Match, возвращается 304
+    без вызова метода и сериализации. Иначе к успешному ответу добавляется заголовок ETag.
+
+    :param stamp_func: Функция, возвращающая версию данных ресурса
+    :return: Декоратор
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            tag = make_etag(stamp_func(**kwargs))
+            headers = {"ETag": f'"{tag}"', "Cache-Control": "no-cache"}
+
+            if request.if_none_match.contains(tag):
+                return Response(status=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+            result = fn(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            if not isinstance(result, tuple):
+                return result, HTTPStatus.OK, headers
+
+            data, status, *rest = result
+            if status != HTTPStatus.OK:
+                return result
+            return data, status, {**(rest[0] if rest else {}), **headers}
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,260 @@
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from http import HTTPStatus
+from typing import Callable, NamedTuple, Optional
+
+from flask import request, make_response, Response
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from sqlalchemy import delete, select, update
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.system_models import IdempotencyKey
+from backend.core.utilits.cache import TTLCache
+from backend.core.utilits.model_utils import dialect_insert
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MUTATING_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+# Ответы с учётными данными не сохраняются: их повтор выдал бы токен любому, кто знает ключ
+CREDENTIAL_FIELDS = frozenset({"access_token", "refresh_token"})
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    body: str
+    mimetype: Optional[str]
+
+
+# Завершённые ответы неизменны до истечения ключа, поэтому повтор, пришедший в тот же процесс,
+# отдаётся из памяти без запросов к базе данных
+replay_cache = TTLCache(
+    "idempotency", maxsize=Config.IDEMPOTENCY_CACHE_SIZE, ttl=Config.IDEMPOTENCY_KEY_TTL_HOURS * 3600
+)
+
+
+def request_fingerprint() -> str:
+    """
+    Хеш запроса (метод, путь с параметрами и тело): повтор с тем же ключом должен совпадать с оригиналом.
+
+    :return: SHA-256 в hex
+    """
+    digest = hashlib.sha256(f"{request.method} {request.full_path}\n".encode("utf-8"))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _request_owner() -> Optional[str]:
+    # анонимных клиентов не различить, поэтому их запросы выполняются без ключа идемпотентности
+    try:
+        verify_jwt_in_request(optional=True)
+    except Exception:
+        return None
+    identity = get_jwt_identity()
+    return str(identity) if identity else None
+
+
+def _has_credentials(response: Response) -> bool:
+    data = response.get_json(silent=True) if response.is_json else None
+    return isinstance(data, dict) and not CREDENTIAL_FIELDS.isdisjoint(data)
+
+
+def lock_deadline(now: datetime) -> datetime:
+    """
+    Срок, до которого запрос, занявший ключ в момент now, удерживает его.
+
+    :param now: Момент занятия ключа
+    :return: now + IDEMPOTENCY_LOCK_SECONDS
+    """
+    return now + timedelta(seconds=Config.IDEMPOTENCY_LOCK_SECONDS)
+
+
+def claim_idempotency_key(owner: str, key: str, fingerprint: str, now: Optional[datetime] = None) \
+        -> Optional[IdempotencyKey]:
+    """
+    Занимает ключ под выполняемый запрос (INSERT ... ON CONFLICT DO NOTHING) и фиксирует транзакцию.
+
+    Из двух одновременных запросов с одним ключом ключ достаётся только одному. Истёкшая запись
+    удаляется, и ключ занимается заново. Ключ без ответа, срок удержания которого (locked_until)
+    прошёл — процесс упал или завис, не освободив его, — повтор того же запроса перехватывает
+    условным UPDATE; из нескольких повторов его получает один.
+
+    :param owner: Владелец ключа
+    :param key: Значение заголовка Idempotency-Key
+    :param fingerprint: Хеш запроса (request_fingerprint)
+    :param now: Текущий момент времени (по умолчанию datetime.now()); ключ удерживается до lock_deadline(now)
+    :return: None, если ключ занят этим запросом; иначе существующая запись
+    """
+    now = now or datetime.now()
+    table = IdempotencyKey.__table__
+    db.session.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.owner == owner, IdempotencyKey.key == key, IdempotencyKey.expires_at <= now
+        )
+    )
+    inserted = db.session.execute(
+        dialect_insert(table).values(
+            owner=owner, key=key, method=request.method, path=request.path[:500], request_hash=fingerprint,
+            created_at=now, expires_at=now + timedelta(hours=Config.IDEMPOTENCY_KEY_TTL_HOURS),
+            locked_until=lock_deadline(now)
+        ).on_conflict_do_nothing(index_elements=[table.c.owner, table.c.key])
+    ).rowcount
+    if not inserted:
+        inserted = db.session.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.owner == owner, IdempotencyKey.key == key,
+                IdempotencyKey.request_hash == fingerprint, IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.locked_until <= now
+            )
+            .values(locked_until=lock_deadline(now))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    db.session.commit()
+    if inserted:
+        return None
+    return db.session.scalars(
+        select(IdempotencyKey).where(IdempotencyKey.owner == owner, IdempotencyKey.key == key)
+    ).first()
+
+
+def save_idempotent_response(owner: str, key: str, fingerprint: str, response: Response,
+                             locked_until: datetime) -> None:
+    """
+    Сохраняет ответ выполненного запроса для повторов (в базе данных и в кэше процесса).
+
+    Незафиксированные изменения обработчика откатываются до записи, чтобы не зафиксировать их заодно.
+    Ответ записывается, только если ключ всё ещё удерживает этот запрос (locked_until не изменился):
+    если ключ перехватил повтор, сохраняется его ответ.
+
+    :param owner: Владелец ключа
+    :param key: Значение заголовка Idempotency-Key
+    :param fingerprint: Хеш запроса
+    :param response: Ответ обработчика
+    :param locked_until: Срок удержания, с которым запрос занял ключ
+    :return: None
+    """
+    stored = StoredResponse(fingerprint, response.status_code, response.get_data(as_text=True), response.mimetype)
+    db.session.rollback()
+    saved = db.session.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.owner == owner, IdempotencyKey.key == key,
+            IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until == locked_until
+        )
+        .values(status_code=stored.status_code, response_body=stored.body, mimetype=stored.mimetype,
+                locked_until=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    if saved:
+        replay_cache.set((owner, key), stored)
+
+
+def release_idempotency_key(owner: str, key: str, locked_until: datetime) -> None:
+    """
+    Освобождает ключ запроса, который завершился ошибкой сервера или чей ответ не сохраняется,
+    чтобы клиент мог повторить запрос. Ключ, перехваченный повтором, не трогается.
+
+    :param owner: Владелец ключа
+    :param key: Значение заголовка Idempotency-Key
+    :param locked_until: Срок удержания, с которым запрос занял ключ
+    :return: None
+    """
+    db.session.rollback()
+    db.session.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.owner == owner, IdempotencyKey.key == key,
+            IdempotencyKey.status_code.is_(None), IdempotencyKey.locked_until == locked_until
+        )
+    )
+    db.session.commit()
+
+
+def purge_expired_idempotency_keys(now: Optional[datetime] = None) -> int:
+    """
+    Фоновая задача: удаляет истёкшие ключи идемпотентности.
+
+    :param now: Текущий момент времени (по умолчанию datetime.now())
+    :return: Количество удалённых ключей
+    """
+    result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or datetime.now())))
+    db.session.commit()
+    return result.rowcount
+
+
+def _replay(stored: StoredResponse, fingerprint: str) -> Response:
+    if stored.request_hash != fingerprint:
+        return make_response(
+            {"message": f"{IDEMPOTENCY_HEADER} уже использован для другого запроса"},
+            HTTPStatus.UNPROCESSABLE_ENTITY
+        )
+    return Response(
+        stored.body, status=stored.status_code, mimetype=stored.mimetype, headers={REPLAYED_HEADER: "true"}
+    )
+
+
+def idempotent(view: Callable) -> Callable:
+    """
+    Декоратор представлений API: поддержка заголовка Idempotency-Key для мутирующих запросов.
+
+    Подключается ко всему API (Api(decorators=[idempotent])), поэтому действует на все
+    POST/PUT/PATCH/DELETE-эндпоинты; запросы без заголовка проходят без изменений.
+    Первый запрос с ключом выполняется и его ответ сохраняется на IDEMPOTENCY_KEY_TTL_HOURS;
+    повторы с тем же ключом получают сохранённый ответ (с заголовком Idempotent-Replayed),
+    не вызывая обработчик, то есть без новых броней и платежей. Пока первый запрос выполняется,
+    повтор получает 409, а после IDEMPOTENCY_LOCK_SECONDS — выполняется заново (ключ
+    перехватывается); повтор с другим телом — 422. Ответы 5xx и ответы с токенами
+    (CREDENTIAL_FIELDS) не сохраняются, анонимные запросы проходят без ключа.
+
+    :param view: Представление ресурса
+    :return: Обёрнутое представление
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if request.method not in MUTATING_METHODS or not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return make_response(
+                {"message": f"{IDEMPOTENCY_HEADER} длиннее {MAX_KEY_LENGTH} символов"}, HTTPStatus.BAD_REQUEST
+            )
+
+        owner = _request_owner()
+        if owner is None:
+            return view(*args, **kwargs)
+
+        fingerprint = request_fingerprint()
+        stored = replay_cache.get((owner, key))
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        now = datetime.now()
+        locked_until = lock_deadline(now)
+        record = claim_idempotency_key(owner, key, fingerprint, now)
+        if record is not None:
+            if record.status_code is None:
+                return make_response(
+                    {"message": "Запрос с этим ключом ещё выполняется"}, HTTPStatus.CONFLICT
+                )
+            stored = StoredResponse(record.request_hash, record.status_code, record.response_body, record.mimetype)
+            replay_cache.set((owner, key), stored)
+            return _replay(stored, fingerprint)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            release_idempotency_key(owner, key, locked_until)
+            raise
+
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR or response.is_streamed \
+                or _has_credentials(response):
+            release_idempotency_key(owner, key, locked_until)
+        else:
+            save_idempotent_response(owner, key, fingerprint, response, locked_until)
+        return response
+
+    return wrapper
@@ -0,0 +1,251 @@
+import hashlib
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, JobSubmissionEvent
+from apscheduler.schedulers.background import BackgroundScheduler
+from flask import Flask
+from sqlalchemy import case, text
+from sqlalchemy.engine import Connection
+
+from backend.core import db
+from backend.core.config import Config
+from backend.core.models.system_models import JobRunStats
+from backend.core.utilits.model_utils import dialect_insert
+
+try:
+    import fcntl
+except ImportError:  # Windows: файловая блокировка недоступна, процесс считается единственным
+    fcntl = None
+
+
+class LeaderLock:
+    """
+    Блокировка лидера, которую процесс удерживает до своего завершения.
+
+    В PostgreSQL это сессионная advisory-блокировка на отдельном соединении: при падении процесса
+    соединение закрывается и блокировку сразу может взять другой процесс. Для SQLite (один хост)
+    используется flock на файл в JOB_LOCK_DIR, который ОС также снимает при завершении процесса.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._connection: Optional[Connection] = None
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> int:
+        """Ключ advisory-блокировки, одинаковый во всех процессах."""
+        return zlib.crc32(self.name.encode())
+
+    @property
+    def path(self) -> str:
+        """Путь к файлу блокировки; зависит от имени блокировки и URI базы данных."""
+        suffix = hashlib.sha1(str(db.engine.url).encode()).hexdigest()[:12]
+        return os.path.join(Config.JOB_LOCK_DIR, f"ukno-{self.name}-{suffix}.lock")
+
+    def try_acquire(self) -> bool:
+        """
+        Пытается стать лидером, не ожидая освобождения блокировки.
+
+        Повторный вызов у лидера проверяет, что соединение с блокировкой ещё живо.
+
+        :return: True, если процесс — лидер
+        """
+        with self._lock:
+            if self._connection is not None or self._file is not None:
+                if self._alive():
+                    return True
+                self._drop()
+            if db.engine.dialect.name == "postgresql":
+                return self._acquire_advisory()
+            return self._acquire_file()
+
+    def release(self) -> None:
+        """Снимает блокировку, если процесс её удерживает."""
+        with self._lock:
+            self._drop()
+
+    def _alive(self) -> bool:
+        if self._connection is None:
+            return True
+        try:
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+            return True
+        except Exception:
+            return False
+
+    def _acquire_advisory(self) -> bool:
+        connection = db.engine.connect()
+        try:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def _acquire_file(self) -> bool:
+        if fcntl is None:
+            return True
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def _drop(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                self._connection.commit()
+            except Exception:
+                pass
+            self._connection.close()
+            self._connection = None
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def record_job_run(name: str, started_at: datetime, seconds: float, runner: str, error: Optional[str]) -> None:
+    """
+    Добавляет запуск задачи в сводную статистику (один UPSERT) и фиксирует транзакцию.
+
+    :param name: Имя задачи
+    :param started_at: Время начала запуска
+    :param seconds: Длительность запуска
+    :param runner: Процесс, выполнивший запуск (host:pid)
+    :param error: Текст ошибки или None при успехе
+    :return: None
+    """
+    table = JobRunStats.__table__
+    stmt = dialect_insert(table).values(
+        job_name=name, runs=1, failures=int(error is not None), overlaps=0,
+        total_seconds=seconds, max_seconds=seconds, last_seconds=seconds,
+        last_started_at=started_at, last_error=error, last_runner=runner
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.job_name],
+        set_={
+            "runs": table.c.runs + 1,
+            "failures": table.c.failures + stmt.excluded.failures,
+            "total_seconds": table.c.total_seconds + stmt.excluded.total_seconds,
+            "max_seconds": case(
+                (stmt.excluded.max_seconds > table.c.max_seconds, stmt.excluded.max_seconds),
+                else_=table.c.max_seconds
+            ),
+            "last_seconds": stmt.excluded.last_seconds,
+            "last_started_at": stmt.excluded.last_started_at,
+            "last_error": stmt.excluded.last_error,
+            "last_runner": stmt.excluded.last_runner,
+        }
+    )
+    db.session.execute(stmt)
+    db.session.commit()
+
+
+def record_job_overlap(name: str) -> None:
+    """
+    Учитывает пропущенный запуск задачи, предыдущий запуск которой ещё не завершился.
+
+    :param name: Имя задачи
+    :return: None
+    """
+    table = JobRunStats.__table__
+    stmt = dialect_insert(table).values(job_name=name, overlaps=1)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.job_name], set_={"overlaps": table.c.overlaps + 1})
+    db.session.execute(stmt)
+    db.session.commit()
+
+
+def get_job_stats() -> List[Dict[str, Any]]:
+    """
+    Возвращает статистику периодических задач всего кластера.
+
+    :return: Список словарей в формате JobRunStats.to_dict()
+    """
+    return [stats.to_dict() for stats in JobRunStats.query.order_by(JobRunStats.job_name)]
+
+
+class ClusterScheduler:
+    """
+    Планировщик периодических задач, который выполняет каждую задачу один раз на кластер.
+
+    APScheduler запускается в каждом процессе (воркере gunicorn), но задача выполняется только
+    в процессе, удерживающем LeaderLock; остальные процессы на каждом срабатывании лишь пробуют
+    стать лидером, поэтому при падении лидера задачи подхватывает другой процесс.
+    Внутри лидера запуски одной задачи не пересекаются (max_instances=1), пропуски считаются
+    как overlaps. Длительность и ошибки каждого запуска записываются в JobRunStats.
+    """
+
+    def __init__(self, app: Flask, lock_name: str = "scheduler-leader"):
+        self.app = app
+        self.leader = LeaderLock(lock_name)
+        self.runner = f"{socket.gethostname()}:{os.getpid()}"
+        self._scheduler = BackgroundScheduler(job_defaults={"max_instances": 1, "coalesce": True})
+        self._scheduler.add_listener(self._on_max_instances, EVENT_JOB_MAX_INSTANCES)
+
+    def add_interval_job(self, name: str, func: Callable[[], Any], **interval: Any) -> None:
+        """
+        Регистрирует периодическую задачу.
+
+        :param name: Уникальное имя задачи (ID задачи APScheduler и ключ статистики)
+        :param func: Функция без аргументов; вызывается в контексте приложения
+        :param interval: Параметры интервала APScheduler (minutes=..., hours=...)
+        :return: None
+        """
+        self._scheduler.add_job(self.run_job, "interval", id=name, args=(name, func), **interval)
+
+    def run_job(self, name: str, func: Callable[[], Any]) -> bool:
+        """
+        Выполняет задачу, если текущий процесс — лидер, и записывает статистику запуска.
+
+        :param name: Имя задачи
+        :param func: Функция задачи
+        :return: True, если задача выполнялась в этом процессе
+        """
+        with self.app.app_context():
+            if not self.leader.try_acquire():
+                return False
+
+            started_at = datetime.now()
+            started = time.perf_counter()
+            error = None
+            try:
+                func()
+            except Exception as e:
+                db.session.rollback()
+                error = f"{type(e).__name__}: {e}"
+                print(f"Ошибка периодической задачи {name}: {error}")
+            record_job_run(name, started_at, time.perf_counter() - started, self.runner, error)
+            return True
+
+    def _on_max_instances(self, event: JobSubmissionEvent) -> None:
+        with self.app.app_context():
+            record_job_overlap(event.job_id)
+
+    def start(self) -> None:
+        """Запускает планировщик в фоновом потоке."""
+        self._scheduler.start()
+
+    def shutdown(self) -> None:
+        """Останавливает планировщик и отдаёт лидерство."""
+        self._scheduler.shutdown()
+        with self.app.app_context():
+            self.leader.release()
@@ -1,18 +1,19 @@
-from typing import Type, Any
+from typing import Any
 
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
 
-def get_model_by_name(model: Type[Any], field_name: str, value: Any, error_message: str) -> Any:
+from backend.core import db
+
+
+def dialect_insert(table: Table) -> Any:
     """
-    Получает объект модели по значению указанного поля.
+    Возвращает insert() для диалекта текущей БД, чтобы можно было использовать
+    on_conflict_do_nothing / on_conflict_do_update (PostgreSQL и SQLite).
 
-    :param model: SQLAlchemy модель
-    :param field_name: имя поля модели для фильтра
-    :param value: значение для поиска
-    :param error_message: сообщение ошибки, если объект не найден
-    :return: объект модели
-    :raises ValueError: если объект не найден
+    :param table: Таблица SQLAlchemy (Model.__table__)
+    :return: Объект Insert с поддержкой ON CONFLICT
     """
-    instance = model.query.filter(getattr(model, field_name) == value).first()
-    if not instance:
-        raise ValueError(error_message)
-    return instance
+    if db.session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Dict
+
+from backend.core import db
+from backend.core.models.system_models import DataVersion
+from backend.core.utilits.model_utils import dialect_insert
+
+EVENTS_SCOPE = "events"
+REFERENCES_SCOPE = "references"
+SEARCH_SCOPE = "search"
+
+
+def bump_data_version(scope: str) -> int:
+    """
+    Увеличивает версию группы данных в текущей транзакции (без commit).
+
+    Строка версии остаётся заблокированной до конца транзакции, поэтому возвращённый номер
+    принадлежит именно этому изменению.
+
+    :param scope: Имя группы данных, например EVENTS_SCOPE
+    :return: Новый номер версии
+    """
+    table = DataVersion.__table__
+    stmt = dialect_insert(table).values(scope=scope, version=1, updated_at=datetime.now())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.scope],
+        set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at}
+    ).returning(table.c.version)
+    return db.session.execute(stmt).scalar_one()
+
+
+def get_data_versions(*scopes: str) -> Dict[str, int]:
+    """
+    Возвращает текущие версии групп данных одним запросом.
+
+    :param scopes: Имена групп данных
+    :return: Словарь {scope: version}; для ещё не менявшихся групп — 0
+    """
+    rows = db.session.query(DataVersion.scope, DataVersion.version).filter(DataVersion.scope.in_(scopes))
+    versions = {scope: 0 for scope in scopes}
+    versions.update({scope: version for scope, version in rows})
+    return versions
+
+
+def get_data_version(scope: str) -> int:
+    """
+    Возвращает текущую версию группы данных.
+
+    :param scope: Имя группы данных
+    :return: Номер версии (0, если данные ещё не менялись)
+    """
+    return get_data_versions(scope)[scope]
@@ -15,6 +15,7 @@ cd ..
 
 echo "Подготавливаю данные"
 python -m backend.app seed_reference_data
+python -m backend.app rebuild_event_catalog
 
 exec gunicorn -w 2 -b 0.0.0.0:5000 backend.wsgi:app --timeout 90
 
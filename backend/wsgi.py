@@ -1,25 +1,17 @@
-import atexit
-
-from apscheduler.schedulers.background import BackgroundScheduler
-
-from backend.app import register_static_routes
+from backend.app import register_static_routes, start_scheduler
 from backend.core import create_app
-from backend.core.scripts.clear_unpaid import cleanup_unpaid_reservations
+from backend.core.services.reference_service.reference_cache import refresh_references
+from backend.core.services.search_service.search_service import build_search_index
 
 app = create_app()
 register_static_routes(app)
 
+with app.app_context():
+    refresh_references()
+    build_search_index()
 
-def run_cleanup():
-    with app.app_context():
-        cleanup_unpaid_reservations()
-
-
-scheduler = BackgroundScheduler()
-scheduler.add_job(run_cleanup, 'interval', minutes=15, max_instances=120)
-scheduler.start()
-
-atexit.register(lambda: scheduler.shutdown())
+# Планировщик стартует в каждом воркере gunicorn, но задачи выполняет только лидер (см. ClusterScheduler)
+scheduler = start_scheduler(app)
 
 if __name__ == "__main__":
     app.run()
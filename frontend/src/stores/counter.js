@@ -155,8 +155,12 @@ export const useDataStore = defineStore('data', {
             'Content-Type': 'application/json',
           },
         })
-        if (response.data.payment_url) {
-          window.location.href = response.data.payment_url;
+        // платная бронь отвечает 202 без ссылки: ссылка на оплату готовится в фоне
+        const payment = response.status === 202
+          ? await this.WaitReservationPayment(response.data.reservation_id)
+          : response.data
+        if (payment.payment_url) {
+          window.location.href = payment.payment_url;
         } else {
           console.log('Бронирование прошло успешно!')
         }
@@ -166,6 +170,25 @@ export const useDataStore = defineStore('data', {
         throw error
       }
     },
+    async WaitReservationPayment(reservation_id, attempts = 60, interval = 1000) {
+      // опрашивает состояние оплаты, пока ссылка не будет готова или создание платежа не завершится ошибкой
+      for (let attempt = 0; attempt < attempts; attempt++) {
+        const response = await axios.get(`${baseUrl}/api/user/v2/reservations/${reservation_id}/payment`, {
+          headers: {
+            Authorization: `Bearer ${this.auth_key}`,
+          },
+        })
+        const status = response.data.payment_status
+        if (status === 'ready' || status === 'paid') {
+          return response.data
+        }
+        if (status === 'failed') {
+          throw new Error('Не удалось создать платёж, попробуйте позже')
+        }
+        await new Promise(resolve => setTimeout(resolve, interval))
+      }
+      throw new Error('Ссылка на оплату не получена, попробуйте позже')
+    },
     async GetProfile() {
       try {
         const response = await axios.get(`${baseUrl}/api/user/profile`, {
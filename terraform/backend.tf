@@ -62,6 +62,7 @@ resource "yandex_compute_instance" "backend" {
         - echo "USE_POSTGRES=True" >> /app/virtualization/.env
         - echo "ACCOUNT_ID=${var.account_id}" >> /app/virtualization/.env
         - echo "YOOKASSA_SECRET_KEY=${var.yookassa_secret_key}" >> /app/virtualization/.env
+        - echo "JOB_TRIGGER_TOKEN=${var.job_trigger_token}" >> /app/virtualization/.env
         - echo "BUCKET_NAME=${var.bucket_name}" >> /app/virtualization/.env
         - echo "YC_ACCESS_KEY=${var.yc_access_key}" >> /app/virtualization/.env
         - echo "YC_SECRET_KEY=${var.yc_secret_key}" >> /app/virtualization/.env
@@ -1,6 +1,6 @@
 resource "yandex_function" "reservation_cleaner" {
   name               = "reservation-cleaner"
-  description        = "Удаляет неоплаченные бронирования старше 15 минут"
+  description        = "Запускает очистку истёкших удержаний мест в приложении"
 
   # обязательные поля
   user_hash          = "v1"                # меняй при каждом обновлении кода
@@ -10,11 +10,10 @@ resource "yandex_function" "reservation_cleaner" {
   execution_timeout  = 30                  # в секундах
   service_account_id = var.sa_cleanup
 
+  # функция вызывает задачу очистки приложения через балансировщик
   environment = {
-    POSTGRES_HOST     = yandex_compute_instance.postgres.network_interface[0].nat_ip_address
-    POSTGRES_DB       = var.postgres_db
-    POSTGRES_USER     = var.postgres_user
-    POSTGRES_PASSWORD = var.postgres_password
+    BACKEND_URL       = "http://${one(yandex_lb_network_load_balancer.nlb.listener[*].external_address_spec[*].address)[0]}"
+    JOB_TRIGGER_TOKEN = var.job_trigger_token
   }
 
   content {
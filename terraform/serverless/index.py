@@ -1,34 +1,23 @@
-from datetime import datetime, timedelta
-import psycopg2
+import json
 import os
+import urllib.request
 
-DB_HOST = os.environ.get("POSTGRES_HOST")
-DB_NAME = os.environ.get("POSTGRES_DB")
-DB_USER = os.environ.get("POSTGRES_USER")
-DB_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
+BACKEND_URL = os.environ.get("BACKEND_URL", "").rstrip("/")
+JOB_TRIGGER_TOKEN = os.environ.get("JOB_TRIGGER_TOKEN", "")
+REQUEST_TIMEOUT = int(os.environ.get("REQUEST_TIMEOUT_SECONDS", "25"))
 
+# Очистку истёкших удержаний выполняет само приложение (sweep_expired_holds): кроме удаления
+# броней она отменяет их платежи, продвигает листы ожидания и обновляет каталог. Функция только
+# запускает эту задачу, чтобы логика не расходилась с backend.
+SWEEP_HOLDS_PATH = "/api/webhook/jobs/sweep-holds"
 
-def handler(event, context):
-    threshold = datetime.now() - timedelta(minutes=15)
 
-    conn = psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD
+def handler(event, context):
+    request = urllib.request.Request(
+        f"{BACKEND_URL}{SWEEP_HOLDS_PATH}",
+        data=b"",
+        method="POST",
+        headers={"X-Job-Token": JOB_TRIGGER_TOKEN}
     )
-    cur = conn.cursor()
-    cur.execute("""
-                DELETE
-                FROM reservations
-                WHERE is_paid = false
-                  AND booked_at < %s
-                  AND is_cancelled = false RETURNING reservation_id;
-                """, (threshold,))
-
-    deleted = cur.fetchall()
-    conn.commit()
-    cur.close()
-    conn.close()
-
-    return {"deleted_count": len(deleted)}
+    with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+        return json.loads(response.read().decode("utf-8"))
@@ -1,10 +1,16 @@
+import io
+import json
 from datetime import datetime
 from http import HTTPStatus
 
 import pytest
 
 from backend.core import db
-from tests.conftest import get_excursion_payload, create_event_session
+from backend.core.models.event_models import Event
+from backend.core.services.event_services.event_crud import create_event, add_tags
+from backend.core.services.reference_service.reference_cache import find_reference, refresh_references
+from backend.core.services.user_services.role_service import get_role_by_name
+from tests.conftest import get_excursion_payload, create_event_session, count_queries, TestAdminData
 from tests.excursion_tests import _assert_excursions_list_response, _assert_create_excursion_bad_json, \
     _assert_patch_update_excursion_success, _assert_patch_excursion_not_found, _assert_get_excursion_by_id_success, \
     _assert_get_not_found, _assert_delete_success, _assert_delete_not_found, _test_get_sessions_for_excursion, \
@@ -106,3 +112,173 @@ class TestExcursionPhotos:
 
     def test_delete_photo_admin(self, admin_client, new_excursion_id):
         _test_delete_photo(admin_client, "/api/admin", new_excursion_id)
+
+
+def test_reference_cache_resolves_without_queries_and_refreshes_on_write(app, admin_client):
+    with app.app_context():
+        refresh_references()
+        with count_queries() as queries:
+            assert get_role_by_name("admin") is not None
+            assert find_reference("categories", "Воркшоп") is not None
+        assert queries == []
+
+        r = admin_client.post("/api/references/categories", json={"name": "Кэшируемая категория"})
+        assert r.status_code == HTTPStatus.CREATED
+        category_id = r.get_json()["category_id"]
+        event_id = None
+        try:
+            with count_queries() as queries:
+                assert find_reference("categories", "Кэшируемая категория").id == category_id
+            assert queries == []
+            assert {"category_id": category_id, "category_name": "Кэшируемая категория"} in \
+                admin_client.get("/api/references/categories").get_json()
+
+            data = {
+                "title": "Экскурсия в новой категории",
+                "description": "Описание",
+                "duration": 60,
+                "category": "Кэшируемая категория",
+                "format_type": "Индивидуальная",
+                "age_category": "Для школьников (7-17 лет)",
+                "place": "Екатеринбург",
+            }
+            with count_queries() as queries:
+                event, response, error_status = create_event(data, TestAdminData.EMAIL, [])
+            assert not error_status, response
+            event_id = event.event_id
+            assert not any(table in statement for statement in queries
+                           for table in ("FROM categories", "FROM format_types", "FROM age_categories"))
+            assert event.category.category_name == "Кэшируемая категория"
+        finally:
+            if event_id is not None:
+                db.session.delete(db.session.get(Event, event_id))
+                db.session.commit()
+            r = admin_client.delete(f"/api/references/categories/{category_id}")
+            assert r.status_code == HTTPStatus.OK
+
+        assert find_reference("categories", "Кэшируемая категория") is None
+
+
+def test_add_tags_uses_constant_number_of_queries(app):
+    with app.app_context():
+        data = {
+            "title": "Экскурсия с тегами",
+            "description": "Описание",
+            "duration": 60,
+            "category": "Воркшоп",
+            "format_type": "Индивидуальная",
+            "age_category": "Для школьников (7-17 лет)",
+            "place": "Екатеринбург",
+        }
+        event, response, error_status = create_event(data, TestAdminData.EMAIL, [])
+        assert not error_status, response
+        try:
+            with count_queries() as few:
+                add_tags(event, ["тег-1", "тег-2"])
+            names = [f"тег-{i}" for i in range(1, 31)]
+            with count_queries() as many:
+                add_tags(event, names + [" тег-5 ", "", "тег-1"])
+            db.session.commit()
+
+            assert len(many) == len(few)
+            assert sorted(tag.name for tag in event.tags) == sorted(names)
+        finally:
+            db.session.delete(db.session.get(Event, event.event_id))
+            db.session.commit()
+
+
+def _import_row(title, **overrides):
+    return {
+        "title": title,
+        "description": "Описание",
+        "duration": 60,
+        "category": "Воркшоп",
+        "format_type": "Индивидуальная",
+        "age_category": "Для школьников (7-17 лет)",
+        "place": "Екатеринбург",
+        "sessions": [{"start_datetime": "2029-09-01T12:00:00", "max_participants": 5, "cost": 700}],
+        "tags": ["импорт", title],
+        **overrides
+    }
+
+
+def test_import_excursions_jsonl(app, admin_client):
+    lines = [
+        json.dumps(_import_row("Импорт 1"), ensure_ascii=False),
+        "{не json",
+        json.dumps(_import_row("Импорт 2", category="Нет такой", duration=0), ensure_ascii=False),
+        "",
+        json.dumps(_import_row("Импорт 3", sessions=[]), ensure_ascii=False),
+        json.dumps(_import_row("Импорт 4", created_by=["x"]), ensure_ascii=False),
+    ]
+    content = "\n".join(lines).encode("utf-8")
+
+    r = admin_client.post(
+        "/api/admin/excursions/import?dry_run=true",
+        data={"file": (io.BytesIO(content), "events.jsonl")},
+        content_type="multipart/form-data"
+    )
+    assert r.status_code == HTTPStatus.OK, r.get_json()
+    assert r.get_json()["imported"] == 0 and r.get_json()["valid"] == 2
+
+    r = admin_client.post(
+        "/api/admin/excursions/import",
+        data={"file": (io.BytesIO(content), "events.jsonl")},
+        content_type="multipart/form-data"
+    )
+    assert r.status_code == HTTPStatus.OK, r.get_json()
+    report = r.get_json()
+    event_ids = report["excursion_ids"]
+    with app.app_context():
+        try:
+            assert report["total"] == 5
+            assert report["imported"] == 2
+            assert [error["row"] for error in report["errors"]] == [2, 3, 6]
+            assert len(report["errors"][1]["errors"]) == 2
+            assert report["errors"][2]["errors"] == ["created_by: ожидается строка"]
+
+            first = db.session.get(Event, event_ids[0])
+            assert first.title == "Импорт 1"
+            assert [(s.max_participants, float(s.cost)) for s in first.sessions] == [(5, 700.0)]
+            assert sorted(tag.name for tag in first.tags) == ["Импорт 1", "импорт"]
+            assert first.catalog is not None and first.catalog.min_cost == 700
+            assert db.session.get(Event, event_ids[1]).catalog is None
+        finally:
+            for event_id in event_ids:
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_import_excursions_csv(app, admin_client):
+    content = (
+        "title,description,duration,category,format_type,age_category,place,tags,sessions\n"
+        "CSV импорт,Описание,45,Воркшоп,Индивидуальная,Для школьников (7-17 лет),Екатеринбург,"
+        "импорт;csv,2029-09-01T12:00:00|10|500;2029-09-02T12:00:00|8\n"
+        "Без места,Описание,45,Воркшоп,Индивидуальная,Для школьников (7-17 лет),,,\n"
+    ).encode("utf-8")
+
+    r = admin_client.post(
+        "/api/admin/excursions/import",
+        data={"file": (io.BytesIO(content), "events.csv")},
+        content_type="multipart/form-data"
+    )
+    assert r.status_code == HTTPStatus.OK, r.get_json()
+    report = r.get_json()
+    with app.app_context():
+        try:
+            assert report["imported"] == 1
+            assert report["errors"] == [{"row": 3, "errors": ["place: обязательное поле"]}]
+            event = db.session.get(Event, report["excursion_ids"][0])
+            assert sorted((s.max_participants, float(s.cost)) for s in event.sessions) == [(8, 0.0), (10, 500.0)]
+            assert sorted(tag.name for tag in event.tags) == ["csv", "импорт"]
+        finally:
+            for event_id in report["excursion_ids"]:
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+    r = admin_client.post(
+        "/api/admin/excursions/import",
+        data={"file": (io.BytesIO(b"x"), "events.xlsx")},
+        content_type="multipart/form-data"
+    )
+    assert r.status_code == HTTPStatus.BAD_REQUEST
@@ -3,6 +3,8 @@ from http import HTTPStatus
 from backend.core import db
 from backend.core.messages import AuthMessages
 from backend.core.models.auth_models import User
+from backend.core.models.system_models import JobRunStats
+from backend.core.utilits.job_scheduler import ClusterScheduler, record_job_overlap
 from tests.conftest import TestUserData, TestAdminData
 
 
@@ -86,3 +88,47 @@ class TestAdminUsers:
         assert r.status_code == HTTPStatus.OK
         data = r.get_json()
         assert data["message"] == AuthMessages.USER_DELETED
+
+
+def test_admin_cache_stats(client, admin_access_token, access_token):
+    client.get("/api/user/excursions")
+    r = client.get("/api/admin/stats/cache", headers={"Authorization": f"Bearer {admin_access_token}"})
+    assert r.status_code == HTTPStatus.OK
+    catalog = next(c for c in r.get_json()["caches"] if c["name"] == "catalog")
+    assert {"size", "maxsize", "ttl", "hits", "misses", "hit_ratio"} <= catalog.keys()
+
+    r = client.get("/api/admin/stats/cache", headers={"Authorization": f"Bearer {access_token}"})
+    assert r.status_code == HTTPStatus.FORBIDDEN
+
+
+def test_cluster_scheduler_runs_job_once_and_records_stats(app, client, admin_access_token):
+    leader, follower = ClusterScheduler(app, "test-leader"), ClusterScheduler(app, "test-leader")
+    calls = []
+
+    def failing_job():
+        raise RuntimeError("boom")
+
+    try:
+        assert leader.run_job("test_job", lambda: calls.append("leader"))
+        assert not follower.run_job("test_job", lambda: calls.append("follower"))
+        assert leader.run_job("test_failing_job", failing_job)
+        with app.app_context():
+            record_job_overlap("test_job")
+            leader.leader.release()
+        assert follower.run_job("test_job", lambda: calls.append("follower"))
+        assert calls == ["leader", "follower"]
+
+        r = client.get("/api/admin/stats/jobs", headers={"Authorization": f"Bearer {admin_access_token}"})
+        assert r.status_code == HTTPStatus.OK
+        jobs = {job["job_name"]: job for job in r.get_json()["jobs"]}
+        assert (jobs["test_job"]["runs"], jobs["test_job"]["overlaps"], jobs["test_job"]["failures"]) == (2, 1, 0)
+        assert jobs["test_job"]["max_seconds"] >= jobs["test_job"]["last_seconds"] >= 0
+        assert (jobs["test_failing_job"]["failures"], jobs["test_failing_job"]["last_error"]) == (
+            1, "RuntimeError: boom"
+        )
+    finally:
+        with app.app_context():
+            leader.leader.release()
+            follower.leader.release()
+            JobRunStats.query.filter(JobRunStats.job_name.in_(["test_job", "test_failing_job"])).delete()
+            db.session.commit()
@@ -1,8 +1,10 @@
 import io
 import json
+from contextlib import contextmanager
 
 import pytest
 from flask_jwt_extended import create_access_token
+from sqlalchemy import event as sa_event
 from werkzeug.datastructures import FileStorage
 
 from backend.core import create_app, db
@@ -247,3 +249,18 @@ def create_event_session(excursion_id, start_datetime, max_participants, cost):
     db.session.add(session)
     db.session.commit()
     return session
+
+
+@contextmanager
+def count_queries():
+    """Считает SQL-запросы, выполненные внутри блока (список statement-ов в queries)."""
+    queries = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    sa_event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        sa_event.remove(db.engine, "before_cursor_execute", _before_cursor_execute)
@@ -1,10 +1,15 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from http import HTTPStatus
 
 import pytest
 
 from backend.core import db
-from tests.conftest import get_excursion_payload, create_event_session
+from backend.core.models.auth_models import User
+from backend.core.models.event_models import Event, EventSession, Reservation
+from backend.core.services.event_services.event_crud import create_event
+from backend.core.services.event_services.session_schedule_service import materialize_due_schedules
+from backend.core.services.reservation_service.seat_counter import adjust_booked_seats
+from tests.conftest import get_excursion_payload, create_event_session, count_queries, TestResidentData
 from tests.excursion_tests import _assert_excursions_list_response, _assert_create_excursion_bad_json, \
     _assert_patch_update_excursion_success, _assert_patch_excursion_not_found, _assert_get_excursion_by_id_success, \
     _assert_get_not_found, _assert_delete_success, _assert_delete_not_found, _test_get_sessions_for_excursion, \
@@ -101,3 +106,141 @@ class TestExcursionPhotos:
 
     def test_delete_photo_resident(self, resident_client, excursion_id):
         _test_delete_photo(resident_client, "/api/resident", excursion_id)
+
+
+def _create_resident_event_with_reservations(title, sessions_count):
+    data = {
+        "title": title,
+        "description": "Описание",
+        "duration": 90,
+        "category": "Воркшоп",
+        "format_type": "Индивидуальная",
+        "age_category": "Для школьников (7-17 лет)",
+        "place": "Екатеринбург",
+        "sessions": [
+            {"start_datetime": f"2029-08-{day:02d}T12:00:00", "max_participants": 10, "cost": 100}
+            for day in range(1, sessions_count + 1)
+        ],
+        "tags": ["тест", title],
+    }
+    event, response, error_status = create_event(data, TestResidentData.EMAIL, [])
+    assert not error_status, response
+    user = User.query.filter_by(email=TestResidentData.EMAIL).first()
+    for session in event.sessions:
+        db.session.add(Reservation(
+            session_id=session.session_id, user_id=user.user_id, full_name="Тест",
+            phone_number="000", email=TestResidentData.EMAIL, participants_count=2
+        ))
+        adjust_booked_seats(session.session_id, 2)
+    db.session.commit()
+    return event.event_id
+
+
+def test_resident_excursions_query_count_does_not_grow(app, resident_client):
+    with app.app_context():
+        event_ids = [_create_resident_event_with_reservations("Одна сессия", 1)]
+        try:
+            with count_queries() as few:
+                r = resident_client.get("/api/resident/excursions")
+            assert r.status_code == HTTPStatus.OK
+
+            event_ids.append(_create_resident_event_with_reservations("Много сессий", 5))
+            with count_queries() as many:
+                r = resident_client.get("/api/resident/excursions")
+            assert r.status_code == HTTPStatus.OK
+
+            excursion = next(e for e in r.get_json()["excursions"] if e["excursion_id"] == event_ids[-1])
+            assert len(excursion["sessions"]) == 5
+            assert len(excursion["reservations"]) == 5
+            assert all(s["booked"] == 2 for s in excursion["sessions"])
+            assert sorted(tag["name"] for tag in excursion["tags"]) == ["Много сессий", "тест"]
+            assert len(many) == len(few)
+        finally:
+            for event_id in event_ids:
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_resident_ownership_check_does_not_load_tags(app, resident_client):
+    with app.app_context():
+        event_id = _create_resident_event_with_reservations("Проверка владельца", 1)
+        try:
+            db.session.expunge_all()
+            with count_queries() as queries:
+                r = resident_client.get(f"/api/resident/excursions/{event_id}/photos")
+            assert r.status_code == HTTPStatus.OK
+            assert not any("event_tags" in statement for statement in queries)
+
+            r = resident_client.get(f"/api/resident/excursions/{event_id}")
+            assert r.status_code == HTTPStatus.OK
+            tags = sorted(tag["name"] for tag in r.get_json()["excursion"]["tags"])
+            assert tags == ["Проверка владельца", "тест"]
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_resident_schedule_materializes_and_rewrites_only_unbooked_sessions(app, resident_client):
+    with app.app_context():
+        event_id = _create_resident_event_with_reservations("По расписанию", 0)
+        url = f"/api/resident/excursions/{event_id}/schedules"
+        try:
+            r = resident_client.post(url, json={"rrule": "FREQ=DAILY", "start_time": "10:00", "max_participants": 5})
+            assert r.status_code == HTTPStatus.CREATED, r.get_data(as_text=True)
+            schedule_id = r.get_json()["schedule_id"]
+
+            sessions = EventSession.query.filter_by(event_id=event_id).order_by(EventSession.start_datetime).all()
+            assert len(sessions) >= app.config["SCHEDULE_HORIZON_DAYS"]
+            assert all(s.schedule_id == schedule_id and s.start_datetime.hour == 10 for s in sessions)
+            assert materialize_due_schedules() == 0
+
+            booked = sessions[1]
+            user = User.query.filter_by(email=TestResidentData.EMAIL).first()
+            db.session.add(Reservation(
+                session_id=booked.session_id, user_id=user.user_id, full_name="Тест",
+                phone_number="000", email=TestResidentData.EMAIL, participants_count=1
+            ))
+            adjust_booked_seats(booked.session_id, 1)
+            db.session.commit()
+            booked_id, booked_start = booked.session_id, booked.start_datetime
+
+            r = resident_client.patch(f"{url}/{schedule_id}", json={"start_time": "11:30"})
+            assert r.status_code == HTTPStatus.OK, r.get_data(as_text=True)
+            db.session.expire_all()
+            sessions = EventSession.query.filter_by(event_id=event_id).all()
+            assert db.session.get(EventSession, booked_id).start_datetime == booked_start
+            rewritten = [s for s in sessions if s.session_id != booked_id]
+            assert rewritten and all(s.start_datetime.hour == 11 and s.start_datetime.minute == 30 for s in rewritten)
+
+            r = resident_client.patch(f"{url}/{schedule_id}", json={"rrule": "FREQ=MINUTELY"})
+            assert r.status_code == HTTPStatus.BAD_REQUEST
+
+            r = resident_client.delete(f"{url}/{schedule_id}")
+            assert r.status_code == HTTPStatus.OK
+            assert r.get_json()["deleted_sessions"] == len(rewritten)
+            db.session.expire_all()
+            remaining = EventSession.query.filter_by(event_id=event_id).all()
+            assert [(s.session_id, s.schedule_id) for s in remaining] == [(booked_id, None)]
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_midnight_schedule_keeps_growing_across_materialization_runs(app, resident_client):
+    with app.app_context():
+        event_id = _create_resident_event_with_reservations("Полночное расписание", 0)
+        try:
+            r = resident_client.post(f"/api/resident/excursions/{event_id}/schedules",
+                                     json={"rrule": "FREQ=DAILY", "start_time": "00:00", "max_participants": 5})
+            assert r.status_code == HTTPStatus.CREATED, r.get_data(as_text=True)
+            assert materialize_due_schedules(datetime.now() + timedelta(days=1)) == 1
+
+            today = datetime.now().date()
+            days = app.config["SCHEDULE_HORIZON_DAYS"]
+            starts = [s.start_datetime for s in EventSession.query.filter_by(event_id=event_id)
+                      .order_by(EventSession.start_datetime)]
+            assert starts == [datetime.combine(today + timedelta(days=offset), datetime.min.time())
+                              for offset in range(1, days + 3)]
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
@@ -1,10 +1,59 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
 from http import HTTPStatus
+from types import SimpleNamespace
 
 import pytest
 
+from backend.core import db, create_app
+from backend.core.config import Config
 from backend.core.messages import AuthMessages
-from backend.core.models.event_models import EventSession
-from tests.conftest import TestUserData
+from backend.core.models.auth_models import User
+from backend.core.models.event_models import Event, EventSession, EventCatalog, Reservation, Payment, \
+    WaitlistEntry
+from backend.core.services.event_services.event_api import catalog_cache
+from backend.core.services.event_services.event_catalog import refresh_stale_catalog
+from backend.core.services.event_services.event_facets import facets_cache
+from backend.core.services.event_services.event_crud import create_event, update_event
+from backend.core.services.event_services.event_pagination import encode_cursor
+from backend.core.services.event_services.event_session_service import create_event_session, update_event_session
+from backend.core.services.reservation_service.reservation_cancel import cancel_user_reservation
+from backend.core.services.reservation_service.reservation_crud import create_reservation_with_payment, \
+    delete_reservation_with_refund, start_reservation_payment
+from backend.core.services.reservation_service.seat_counter import find_seat_drift, reconcile_booked_seats, \
+    release_reservations, reserve_seats
+from backend.core.services.user_services.user_service import create_user, delete_user
+from backend.core.services.reservation_service.seat_holds import release_holds, sweep_expired_holds
+from backend.core.services.reservation_service import payment_queue, waitlist, webhook_inbox
+from backend.core.models.system_models import IdempotencyKey, WebhookInbox
+from backend.core.utilits import idempotency_utils
+from backend.core.utilits.idempotency_utils import purge_expired_idempotency_keys
+from backend.core.utilits.version_utils import get_data_version, EVENTS_SCOPE
+from tests.conftest import TestUserData, TestAdminData, TestResidentData, count_queries
+
+
+def _create_event_with_sessions(title, sessions_count, cost=0, **overrides):
+    data = {
+        "title": title,
+        "description": "Описание",
+        "duration": 90,
+        "category": "Воркшоп",
+        "format_type": "Индивидуальная",
+        "age_category": "Для школьников (7-17 лет)",
+        "place": "Екатеринбург",
+        "sessions": [
+            {"start_datetime": f"2029-08-{day:02d}T12:00:00", "max_participants": 10, "cost": cost}
+            for day in range(1, sessions_count + 1)
+        ],
+        "tags": ["тест"],
+        **overrides
+    }
+    event, response, error_status = create_event(data, TestAdminData.EMAIL, [])
+    assert not error_status, response
+    return event.event_id
 
 
 def test_get_excursions_list(client):
@@ -32,6 +81,935 @@ def test_get_excursions_list(client):
     assert "excursions" in data
 
 
+def test_excursions_list_query_count_does_not_grow_with_sessions(app, client):
+    with app.app_context():
+        event_ids = [_create_event_with_sessions("Экскурсия с одной сессией", 1)]
+        try:
+            with count_queries() as few:
+                r = client.get("/api/user/excursions")
+            assert r.status_code == HTTPStatus.OK
+
+            event_ids.append(_create_event_with_sessions("Экскурсия со многими сессиями", 20))
+            with count_queries() as many:
+                r = client.get("/api/user/excursions")
+            assert r.status_code == HTTPStatus.OK
+
+            excursion = next(e for e in r.get_json()["excursions"] if e["excursion_id"] == event_ids[-1])
+            assert len(excursion["sessions"]) == 20
+            assert all(s["booked"] == 0 and s["available"] == 10 for s in excursion["sessions"])
+            assert len(many) == len(few)
+        finally:
+            for event_id in event_ids:
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+@pytest.mark.parametrize("sort", ["price", "-price", "time", "-title", "distance_to_center", "-distance_to_center"])
+def test_excursions_keyset_pagination_matches_full_list(app, client, sort):
+    with app.app_context():
+        specs = [(100, 5.0), (100, None), (300, 1.0), (200, 5.0), (100, 2.0)]
+        event_ids = [
+            _create_event_with_sessions(f"Пагинация {i}", 1, cost=cost, distance_to_center=distance)
+            for i, (cost, distance) in enumerate(specs)
+        ]
+        try:
+            r = client.get(f"/api/user/excursions?sort={sort}")
+            assert r.status_code == HTTPStatus.OK
+            assert r.get_json()["next_cursor"] is None
+            expected = [e["excursion_id"] for e in r.get_json()["excursions"] if e["excursion_id"] in event_ids]
+
+            paged, cursor = [], None
+            while True:
+                url = f"/api/user/excursions?sort={sort}&limit=2" + (f"&cursor={cursor}" if cursor else "")
+                r = client.get(url)
+                assert r.status_code == HTTPStatus.OK
+                data = r.get_json()
+                assert len(data["excursions"]) <= 2
+                paged.extend(e["excursion_id"] for e in data["excursions"])
+                cursor = data["next_cursor"]
+                if not cursor:
+                    break
+
+            assert len(paged) == len(set(paged))
+            assert [i for i in paged if i in event_ids] == expected
+        finally:
+            for event_id in event_ids:
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_excursions_title_search_is_case_insensitive_and_paginated(app, client):
+    with app.app_context():
+        event_ids = [_create_event_with_sessions(f"Гончарная МАСТЕРСКАЯ {i}", 1) for i in range(3)]
+        event_ids.append(_create_event_with_sessions("Обзорная прогулка 100%_скидка", 1))
+        try:
+            r = client.get("/api/user/excursions?title=мастерская&sort=title&limit=2")
+            assert r.status_code == HTTPStatus.OK
+            data = r.get_json()
+            assert len(data["excursions"]) == 2
+            assert data["next_cursor"]
+
+            r = client.get(f"/api/user/excursions?title=мастерская&sort=title&limit=2&cursor={data['next_cursor']}")
+            titles = [e["title"] for e in data["excursions"] + r.get_json()["excursions"]]
+            assert titles == [f"Гончарная МАСТЕРСКАЯ {i}" for i in range(3)]
+
+            r = client.get("/api/user/excursions?title=100%25_")
+            assert [e["excursion_id"] for e in r.get_json()["excursions"]] == [event_ids[-1]]
+        finally:
+            for event_id in event_ids:
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_event_catalog_follows_event_and_session_writes(app, client):
+    with app.app_context():
+        event_id = _create_event_with_sessions("Проекция каталога", 2, cost=500)
+        try:
+            row = db.session.get(EventCatalog, event_id)
+            assert (row.category_name, row.tag_names) == ("Воркшоп", ["тест"])
+            with count_queries() as queries:
+                r = client.get("/api/user/excursions?tags=тест,другой&fields=title&include=")
+            assert event_id in [e["excursion_id"] for e in r.get_json()["excursions"]]
+            assert not any("event_tags" in query for query in queries)
+            r = client.get("/api/user/excursions?tags=другой")
+            assert event_id not in [e["excursion_id"] for e in r.get_json()["excursions"]]
+
+            session, _, status = create_event_session(
+                event_id, {"start_datetime": "2029-07-01T10:00:00", "max_participants": 5, "cost": 150}
+            )
+            assert status == HTTPStatus.CREATED
+            db.session.expire_all()
+            row = db.session.get(EventCatalog, event_id)
+            assert (float(row.min_cost), row.min_date.month) == (150.0, 7)
+
+            update_event_session(event_id, session.session_id, {"start_datetime": "2020-01-01T10:00:00"})
+            update_event(event_id, {"category": "Экскурсия"})
+            db.session.expire_all()
+            row = db.session.get(EventCatalog, event_id)
+            assert (float(row.min_cost), row.category_name) == (500.0, "Экскурсия")
+
+            r = client.get("/api/user/excursions?category=Экскурсия&max_price=500")
+            assert event_id in [e["excursion_id"] for e in r.get_json()["excursions"]]
+
+            update_event(event_id, {"is_active": False})
+            assert db.session.get(EventCatalog, event_id) is None
+            r = client.get("/api/user/excursions")
+            assert event_id not in [e["excursion_id"] for e in r.get_json()["excursions"]]
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_excursions_list_is_cached_until_catalog_changes(app, client):
+    with app.app_context():
+        event_id = _create_event_with_sessions("Кэш каталога", 1, cost=100)
+        try:
+            url = "/api/user/excursions?tags=тест,%20тест&sort=price"
+            first = client.get(url).get_json()
+            hits = catalog_cache.hits
+            with count_queries() as queries:
+                second = client.get("/api/user/excursions?sort=price&tags=тест").get_json()
+            assert second == first
+            assert catalog_cache.hits == hits + 1
+            assert not any("FROM events" in statement for statement in queries)
+
+            update_event(event_id, {"title": "Кэш каталога (изменено)"})
+            titles = {e["excursion_id"]: e["title"] for e in client.get(url).get_json()["excursions"]}
+            assert titles[event_id] == "Кэш каталога (изменено)"
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+@pytest.mark.parametrize("url", ["/api/user/excursions?sort=price", "/api/references/excursion-stats", None])
+def test_etag_returns_not_modified_until_data_changes(app, client, url):
+    with app.app_context():
+        event_id = _create_event_with_sessions("ETag", 1, cost=100)
+        url = url or f"/api/user/excursions_detail/{event_id}"
+        try:
+            r = client.get(url)
+            assert r.status_code == HTTPStatus.OK
+            tag = r.headers["ETag"]
+
+            with count_queries() as queries:
+                r = client.get(url, headers={"If-None-Match": tag})
+            assert r.status_code == HTTPStatus.NOT_MODIFIED
+            assert r.data == b""
+            assert not any("FROM events" in statement for statement in queries)
+
+            assert client.get(url + ("&" if "?" in url else "?") + "title=x").headers.get("ETag") != tag
+
+            update_event(event_id, {"distance_to_center": 3.5})
+            r = client.get(url, headers={"If-None-Match": tag})
+            assert r.status_code == HTTPStatus.OK
+            assert r.headers["ETag"] != tag
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_reservations_bump_only_their_event_version(app, client):
+    with app.app_context():
+        booked_id = _create_event_with_sessions("Версия брони", 1)
+        other_id = _create_event_with_sessions("Версия соседа", 1)
+        session_id = db.session.get(Event, booked_id).sessions[0].session_id
+        try:
+            detail_url = f"/api/user/excursions_detail/{other_id}"
+            catalog_tag = client.get("/api/user/excursions").headers["ETag"]
+            detail_tag = client.get(detail_url).headers["ETag"]
+            global_version = get_data_version(EVENTS_SCOPE)
+            row_version = db.session.get(EventCatalog, booked_id).version
+
+            response, status = create_reservation_with_payment(
+                TestAdminData.EMAIL, session_id, "Тест", "000", TestAdminData.EMAIL, 2
+            )
+            assert status == HTTPStatus.CREATED, response
+            db.session.expire_all()
+            assert get_data_version(EVENTS_SCOPE) == global_version
+            assert db.session.get(EventCatalog, booked_id).version == row_version + 1
+
+            r = client.get("/api/user/excursions", headers={"If-None-Match": catalog_tag})
+            assert r.status_code == HTTPStatus.OK
+            booked = {e["excursion_id"]: e for e in r.get_json()["excursions"]}[booked_id]
+            assert booked["sessions"][0]["booked"] == 2
+            assert client.get(detail_url, headers={"If-None-Match": detail_tag}).status_code \
+                == HTTPStatus.NOT_MODIFIED
+        finally:
+            for event_id in (booked_id, other_id):
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_catalog_reads_do_not_refresh_stale_rows(app, client):
+    with app.app_context():
+        event_id = _create_event_with_sessions("Устаревшая строка", 2)
+        try:
+            db.session.execute(
+                EventCatalog.__table__.update().where(EventCatalog.event_id == event_id)
+                .values(min_date=datetime.now() - timedelta(hours=1))
+            )
+            db.session.commit()
+            version = db.session.get(EventCatalog, event_id).version
+
+            with count_queries() as queries:
+                assert client.get("/api/user/excursions").status_code == HTTPStatus.OK
+            assert not [q for q in queries if q.lstrip().split()[0].upper() in ("INSERT", "UPDATE", "DELETE")]
+
+            assert refresh_stale_catalog() >= 1
+            db.session.expire_all()
+            row = db.session.get(EventCatalog, event_id)
+            assert row.min_date > datetime.now() and row.version == version + 1
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_excursions_sparse_fieldsets_skip_unneeded_loads(app, client):
+    with app.app_context():
+        event_id = _create_event_with_sessions("Разреженные поля", 2)
+        try:
+            with count_queries() as queries:
+                r = client.get("/api/user/excursions?fields=title,duration&include=&sort=title")
+            assert r.status_code == HTTPStatus.OK
+            excursion = next(e for e in r.get_json()["excursions"] if e["excursion_id"] == event_id)
+            assert excursion == {"excursion_id": event_id, "title": "Разреженные поля", "duration": 90}
+            touched = " ".join(queries)
+            for table in ("users", "event_photos", "event_sessions", "tags", "reservations"):
+                assert f"FROM {table}" not in touched and f"JOIN {table}" not in touched
+
+            r = client.get(f"/api/user/excursions_detail/{event_id}?fields=title&include=sessions,tags")
+            assert r.status_code == HTTPStatus.OK
+            data = r.get_json()
+            assert set(data) == {"excursion_id", "title", "sessions", "tags"}
+            assert len(data["sessions"]) == 2 and data["tags"][0]["name"] == "тест"
+
+            full = client.get(f"/api/user/excursions_detail/{event_id}").get_json()
+            assert set(full) == {"excursion_id", *Event.SERIALIZABLE_FIELDS, *Event.SERIALIZABLE_INCLUDES}
+
+            assert client.get("/api/user/excursions?fields=password").status_code == HTTPStatus.BAD_REQUEST
+            assert client.get(f"/api/user/excursions_detail/{event_id}?include=reservations").status_code \
+                == HTTPStatus.BAD_REQUEST
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_excursions_facets_count_each_facet_without_its_own_filter(app, client):
+    with app.app_context():
+        event_ids = [
+            _create_event_with_sessions("Фасеты 1", 1, tags=["фасет-а"]),
+            _create_event_with_sessions("Фасеты 2", 1, tags=["фасет-а", "фасет-б"], category="Экскурсия"),
+            _create_event_with_sessions("Фасеты 3", 1, tags=["фасет-б"], category="Экскурсия"),
+        ]
+        try:
+            with count_queries() as queries:
+                r = client.get("/api/user/excursions/facets?title=Фасеты&category=Экскурсия")
+            assert r.status_code == HTTPStatus.OK
+            assert len([q for q in queries if "GROUP BY" in q]) == 1
+            facets = r.get_json()
+
+            counts = {facet: {v["name"]: v["count"] for v in values} for facet, values in facets.items()}
+            assert counts["category"] == {"Экскурсия": 2, "Воркшоп": 1}
+            assert counts["tags"] == {"фасет-а": 1, "фасет-б": 2}
+            assert counts["format_type"] == {"Индивидуальная": 2}
+            assert facets["tags"][0] == {"name": "фасет-б", "count": 2}
+
+            hits = catalog_cache.hits
+            facets_hits = facets_cache.hits
+            assert client.get("/api/user/excursions/facets?category=Экскурсия&title=Фасеты").get_json() == facets
+            assert (catalog_cache.hits, facets_cache.hits) == (hits, facets_hits + 1)
+        finally:
+            for event_id in event_ids:
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_excursion_stats_single_query_and_cached(app, client):
+    with app.app_context():
+        event_id = _create_event_with_sessions("Статистика", 1, cost=99999, distance_to_center=0.001)
+        try:
+            with count_queries() as queries:
+                stats = client.get("/api/references/excursion-stats").get_json()
+            assert len([q for q in queries if "UNION ALL" in q]) == 1
+            assert stats["cost"]["max"] == 99999.0
+            assert stats["distance_to_center"]["min"] == 0.0
+            assert {c["category_name"] for c in stats["categories"]} >= {"Воркшоп", "Экскурсия"}
+            assert [r["role_name"] for r in stats["roles"]] == ["admin", "resident", "user"]
+
+            with count_queries() as queries:
+                assert client.get("/api/references/excursion-stats").get_json() == stats
+            assert not any("UNION ALL" in q for q in queries)
+
+            session_id = db.session.get(Event, event_id).sessions[0].session_id
+            release_holds([_hold_seats(session_id, 1, 10)])
+            db.session.commit()
+            with count_queries() as queries:
+                assert client.get("/api/references/excursion-stats").get_json() == stats
+            assert not any("UNION ALL" in q for q in queries)
+
+            update_event(event_id, {"distance_to_center": 0.5})
+            stats = client.get("/api/references/excursion-stats").get_json()
+            assert stats["distance_to_center"]["min"] == 0.5
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_only_upcoming_sessions_are_loaded(app, client):
+    with app.app_context():
+        past = [{"start_datetime": f"2020-01-{day:02d}T10:00:00", "max_participants": 5, "cost": 0} for day in (1, 2)]
+        event_id = _create_event_with_sessions("История сессий", 3)
+        create_event_session(event_id, past[0])
+        create_event_session(event_id, past[1])
+        try:
+            for url in ("/api/user/excursions?title=История сессий", f"/api/user/excursions_detail/{event_id}"):
+                with count_queries() as queries:
+                    data = client.get(url).get_json()
+                excursion = data["excursions"][0] if "excursions" in data else data
+                assert [s["start_datetime"][:10] for s in excursion["sessions"]] == \
+                    ["2029-08-01", "2029-08-02", "2029-08-03"]
+                session_queries = [q for q in queries if "FROM event_sessions" in q]
+                assert session_queries and all("start_datetime >" in q for q in session_queries)
+
+            data = client.get("/api/user/excursions?title=История сессий&sessions_limit=2").get_json()
+            assert [s["start_datetime"][:10] for s in data["excursions"][0]["sessions"]] == ["2029-08-01", "2029-08-02"]
+            data = client.get(f"/api/user/excursions_detail/{event_id}?sessions_limit=1").get_json()
+            assert len(data["sessions"]) == 1
+
+            db.session.commit()
+            assert EventSession.query.filter_by(event_id=event_id).count() == 5
+            assert client.get("/api/user/excursions?sessions_limit=0").status_code == HTTPStatus.BAD_REQUEST
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_booked_seats_counter_follows_reservations_and_reconciles(app):
+    with app.app_context():
+        event_id = _create_event_with_sessions("Счётчик мест", 1)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+
+        def book(count):
+            return create_reservation_with_payment(
+                TestAdminData.EMAIL, session_id, "Тест", "000", TestAdminData.EMAIL, count
+            )
+
+        def booked_seats():
+            db.session.expire_all()
+            return db.session.get(EventSession, session_id).booked_seats
+
+        try:
+            response, status = book(3)
+            assert status == HTTPStatus.CREATED, response
+            assert booked_seats() == 3
+            assert book(8)[1] == HTTPStatus.BAD_REQUEST
+
+            _, status = cancel_user_reservation(TestAdminData.EMAIL, response["reservation_id"])
+            assert status == HTTPStatus.OK
+            assert booked_seats() == 0
+            assert release_reservations([response["reservation_id"]]) == []
+            assert booked_seats() == 0
+
+            response, _ = book(2)
+            assert booked_seats() == 2
+            assert delete_reservation_with_refund(response["reservation_id"])[0]
+            assert booked_seats() == 0
+
+            db.session.execute(
+                EventSession.__table__.update().where(EventSession.session_id == session_id).values(booked_seats=7)
+            )
+            db.session.commit()
+            assert find_seat_drift([session_id]) == [(session_id, event_id, 7, 0)]
+            assert [item.session_id for item in reconcile_booked_seats()] == [session_id]
+            assert booked_seats() == 0
+            assert find_seat_drift([session_id]) == []
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_deleting_user_releases_seats_and_promotes_waitlist(app, monkeypatch):
+    monkeypatch.setattr(waitlist, "send_waitlist_promotion_email", lambda **kwargs: None)
+    email = f"leaving-{uuid.uuid4().hex[:8]}@example.com"
+    with app.app_context():
+        event_id = _create_event_with_sessions("Удаление пользователя", 1)
+        session = db.session.get(Event, event_id).sessions[0]
+        session_id = session.session_id
+        update_event_session(event_id, session_id, {"max_participants": 3})
+        try:
+            assert create_user(email, "secret", "Уходящий", "000", "user")
+            for count in (2, 1):
+                _, status = create_reservation_with_payment(email, session_id, "Тест", "000", email, count)
+                assert status == HTTPStatus.CREATED
+            _, status = waitlist.join_waitlist(
+                TestAdminData.EMAIL, session_id, "Тест", "000", TestAdminData.EMAIL, 2
+            )
+            assert status == HTTPStatus.CREATED
+
+            assert delete_user(email)
+            db.session.expire_all()
+            entry = WaitlistEntry.query.filter_by(session_id=session_id).one()
+            assert entry.status == WaitlistEntry.PROMOTED
+            assert db.session.get(EventSession, session_id).booked_seats == 2
+            assert find_seat_drift([session_id]) == []
+        finally:
+            delete_user(email)
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def _reserve_in_process(session_id, attempts, barrier, results):
+    app = create_app(testing=True)
+    with app.app_context():
+        statuses = []
+        barrier.wait()
+        for _ in range(attempts):
+            try:
+                _, status = create_reservation_with_payment(
+                    TestAdminData.EMAIL, session_id, "Тест", "000", TestAdminData.EMAIL, 1
+                )
+                statuses.append(int(status))
+            except Exception:
+                db.session.rollback()
+                statuses.append(0)
+        results.put(statuses)
+
+
+def test_concurrent_reservations_never_oversell(app):
+    processes_count, attempts, capacity = 8, 40, 50
+    with app.app_context():
+        event_id = _create_event_with_sessions("Нагрузочное бронирование", 1)
+        session = db.session.get(Event, event_id).sessions[0]
+        session.max_participants = capacity
+        db.session.commit()
+        session_id = session.session_id
+
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        barrier, results = ctx.Barrier(processes_count), ctx.Queue()
+        processes = [
+            ctx.Process(target=_reserve_in_process, args=(session_id, attempts, barrier, results))
+            for _ in range(processes_count)
+        ]
+        for process in processes:
+            process.start()
+        statuses = [status for _ in processes for status in results.get(timeout=300)]
+        for process in processes:
+            process.join(timeout=60)
+
+        assert len(statuses) == processes_count * attempts
+        assert set(statuses) <= {HTTPStatus.CREATED, HTTPStatus.BAD_REQUEST, 0}
+        created = statuses.count(HTTPStatus.CREATED)
+        with app.app_context():
+            booked = db.session.get(EventSession, session_id).booked_seats
+            reserved = Reservation.query.filter_by(session_id=session_id, is_cancelled=False).count()
+            assert created == booked == reserved
+            assert 0 < booked <= capacity
+            assert find_seat_drift([session_id]) == []
+    finally:
+        with app.app_context():
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def _hold_seats(session_id, count, expires_in_minutes):
+    assert reserve_seats(session_id, count)
+    reservation = Reservation(
+        session_id=session_id, user_id=User.query.filter_by(email=TestAdminData.EMAIL).first().user_id,
+        full_name="Тест", phone_number="000", email=TestAdminData.EMAIL, participants_count=count,
+        is_paid=False, expires_at=datetime.now() + timedelta(minutes=expires_in_minutes)
+    )
+    db.session.add(reservation)
+    db.session.commit()
+    return reservation.reservation_id
+
+
+def test_expired_holds_are_released_on_read_and_by_sweep(app, client):
+    with app.app_context():
+        event_id = _create_event_with_sessions("Удержание мест", 2)
+        first_id, second_id = [session.session_id for session in db.session.get(Event, event_id).sessions]
+        try:
+            expired_id = _hold_seats(first_id, 4, -1)
+            active_id = _hold_seats(first_id, 3, 10)
+            sessions = client.get(f"/api/user/excursions_detail/{event_id}").get_json()["sessions"]
+            assert [s["booked"] for s in sessions if s["session_id"] == first_id] == [3]
+            assert db.session.get(Reservation, expired_id) is None
+            assert db.session.get(Reservation, active_id) is not None
+
+            _hold_seats(first_id, 7, -1)
+            response, status = create_reservation_with_payment(
+                TestAdminData.EMAIL, first_id, "Тест", "000", TestAdminData.EMAIL, 7
+            )
+            assert status == HTTPStatus.CREATED, response
+
+            for count in (1, 2, 3):
+                _hold_seats(second_id, count, -5)
+            created_at = datetime.now() - timedelta(hours=1)
+            db.session.add_all([
+                Payment(payment_id=f"test-orphan-{status}", session_id=second_id, participants_count=1,
+                        email=TestAdminData.EMAIL, amount=100, status=status, created_at=created_at)
+                for status in ("canceled", "succeeded")
+            ])
+            db.session.commit()
+            stats = sweep_expired_holds(batch_size=2)
+            assert (stats.reservations, stats.payments) == (3, 1)
+            assert stats.rows_per_second > 0
+            assert db.session.get(Payment, "test-orphan-canceled") is None
+            db.session.delete(db.session.get(Payment, "test-orphan-succeeded"))
+            db.session.commit()
+            db.session.expire_all()
+            assert db.session.get(EventSession, second_id).booked_seats == 0
+            assert find_seat_drift([first_id, second_id]) == []
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def _wait_for_webhook_inbox(timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        db.session.rollback()
+        pending = WebhookInbox.query.filter(WebhookInbox.processed_at.is_(None)).count()
+        if not pending or time.monotonic() > deadline:
+            assert pending == 0
+            db.session.expire_all()
+            return
+        time.sleep(0.02)
+
+
+def test_canceled_payment_releases_hold_immediately(app, client):
+    with app.app_context():
+        event_id = _create_event_with_sessions("Отмена платежа", 1, cost=100)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+        try:
+            reservation_id = _hold_seats(session_id, 2, 10)
+            payment_id = f"test-canceled-{uuid.uuid4()}"
+            db.session.add(Payment(
+                payment_id=payment_id, reservation_id=reservation_id, session_id=session_id,
+                participants_count=2, email=TestAdminData.EMAIL, amount=200, status="pending"
+            ))
+            db.session.commit()
+
+            r = client.post("/api/webhook/yookassa", json={
+                "event": "payment.canceled", "object": {"id": payment_id, "metadata": {}}
+            })
+            assert r.status_code == HTTPStatus.OK
+            _wait_for_webhook_inbox()
+            payment = db.session.get(Payment, payment_id)
+            assert (payment.status, payment.reservation_id) == ("canceled", None)
+            assert db.session.get(Reservation, reservation_id) is None
+            assert db.session.get(EventSession, session_id).booked_seats == 0
+            db.session.delete(payment)
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_expired_hold_payment_is_cancelled_and_late_success_refunded(app, client, monkeypatch):
+    cancelled, refunds = [], []
+    monkeypatch.setattr(payment_queue, "cancel_yookassa_payment", cancelled.append)
+    monkeypatch.setattr(webhook_inbox, "refund_yookassa_payment", lambda *args, **kwargs: refunds.append(
+        (args, kwargs)
+    ))
+    with app.app_context():
+        event_id = _create_event_with_sessions("Поздняя оплата", 1, cost=100)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+        payment_id = f"test-late-{uuid.uuid4()}"
+        try:
+            reservation_id = _hold_seats(session_id, 2, -1)
+            db.session.add(Payment(
+                payment_id=payment_id, reservation_id=reservation_id, session_id=session_id,
+                participants_count=2, email=TestAdminData.EMAIL, amount=200, status="pending"
+            ))
+            db.session.commit()
+
+            assert sweep_expired_holds().reservations >= 1
+            payment = db.session.get(Payment, payment_id)
+            assert (payment.status, payment.reservation_id) == (payment_queue.PAYMENT_EXPIRED, None)
+            deadline = time.monotonic() + 5
+            while not cancelled and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert cancelled == [payment_id]
+
+            r = client.post("/api/webhook/yookassa", json={"event": "payment.succeeded", "object": {
+                "id": payment_id, "amount": {"value": "200.00", "currency": "RUB"},
+                "metadata": {"reservation_id": str(reservation_id)}
+            }})
+            assert r.status_code == HTTPStatus.OK
+            _wait_for_webhook_inbox()
+            assert refunds == [((payment_id, 200.0, "RUB"), {"idempotency_key": f"late-refund-{payment_id}"})]
+            assert db.session.get(Payment, payment_id).status == "succeeded"
+            assert db.session.get(EventSession, session_id).booked_seats == 0
+        finally:
+            db.session.delete(db.session.get(Payment, payment_id))
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_waitlist_is_promoted_in_order_when_seats_free_up(app, client, resident_access_token, monkeypatch):
+    emails = []
+    monkeypatch.setattr(waitlist, "send_waitlist_promotion_email", lambda **kwargs: emails.append(kwargs))
+    headers = {"Authorization": f"Bearer {resident_access_token}"}
+    with app.app_context():
+        event_id = _create_event_with_sessions("Лист ожидания", 1)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+        try:
+            request = {"session_id": session_id, "full_name": "Тест", "phone_number": "000",
+                       "email": TestResidentData.EMAIL, "participants_count": 3}
+            assert client.post("/api/user/v2/waitlist", json=request, headers=headers).status_code \
+                == HTTPStatus.CONFLICT
+
+            reservation_ids = []
+            for count in (7, 3):
+                response, status = create_reservation_with_payment(
+                    TestAdminData.EMAIL, session_id, "Тест", "000", TestAdminData.EMAIL, count
+                )
+                assert status == HTTPStatus.CREATED, response
+                reservation_ids.append(response["reservation_id"])
+
+            r = client.post("/api/user/v2/waitlist", json=request, headers=headers)
+            assert r.status_code == HTTPStatus.CREATED
+            assert r.get_json()["position"] == 1
+            assert client.post("/api/user/v2/waitlist", json=request, headers=headers).status_code \
+                == HTTPStatus.CONFLICT
+            response, status = waitlist.join_waitlist(
+                TestAdminData.EMAIL, session_id, "Тест", "000", TestAdminData.EMAIL, 2
+            )
+            assert status == HTTPStatus.CREATED and response["position"] == 2
+
+            cancel_user_reservation(TestAdminData.EMAIL, reservation_ids[1])
+            user_entry, admin_entry = WaitlistEntry.query.filter_by(session_id=session_id).order_by(
+                WaitlistEntry.entry_id
+            ).all()
+            assert (user_entry.status, admin_entry.status) == (WaitlistEntry.PROMOTED, WaitlistEntry.WAITING)
+            promoted = db.session.get(Reservation, user_entry.reservation_id)
+            assert promoted.is_paid and promoted.participants_count == 3
+            assert db.session.get(EventSession, session_id).booked_seats == 10
+            assert [e["reservation_id"] for e in emails] == [promoted.reservation_id]
+
+            entries = client.get("/api/user/v2/waitlist", headers=headers).get_json()["waitlist"]
+            assert [(e["status"], e["reservation_id"]) for e in entries if e["session_id"] == session_id] == [
+                ("promoted", promoted.reservation_id)
+            ]
+
+            update_event_session(event_id, session_id, {"max_participants": 12})
+            db.session.refresh(admin_entry)
+            assert admin_entry.status == WaitlistEntry.PROMOTED
+            assert db.session.get(EventSession, session_id).booked_seats == 12
+            assert find_seat_drift([session_id]) == []
+            assert len(emails) == 2
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_waitlist_gets_expiring_holds_on_paid_sessions(app, monkeypatch):
+    monkeypatch.setattr(waitlist, "send_waitlist_promotion_email", lambda **kwargs: None)
+    with app.app_context():
+        event_id = _create_event_with_sessions("Платный лист ожидания", 1, cost=100)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+        try:
+            hold_id = _hold_seats(session_id, 10, 10)
+            for email, count in ((TestResidentData.EMAIL, 4), (TestAdminData.EMAIL, 7)):
+                response, status = waitlist.join_waitlist(email, session_id, "Тест", "000", email, count)
+                assert status == HTTPStatus.CREATED, response
+
+            db.session.get(Reservation, hold_id).expires_at = datetime.now() - timedelta(minutes=1)
+            db.session.commit()
+            sweep_expired_holds()
+
+            user_entry, admin_entry = WaitlistEntry.query.filter_by(session_id=session_id).order_by(
+                WaitlistEntry.entry_id
+            ).all()
+            assert (user_entry.status, admin_entry.status) == (WaitlistEntry.PROMOTED, WaitlistEntry.WAITING)
+            promoted = db.session.get(Reservation, user_entry.reservation_id)
+            assert not promoted.is_paid and promoted.expires_at > datetime.now()
+
+            response, status = waitlist.leave_waitlist(TestResidentData.EMAIL, user_entry.entry_id)
+            assert status == HTTPStatus.NOT_FOUND
+
+            promoted.expires_at = datetime.now() - timedelta(minutes=1)
+            db.session.commit()
+            response, status = start_reservation_payment(TestResidentData.EMAIL, promoted.reservation_id)
+            assert status == HTTPStatus.GONE
+            db.session.expire_all()
+            assert db.session.get(WaitlistEntry, user_entry.entry_id).status == WaitlistEntry.EXPIRED
+            assert db.session.get(WaitlistEntry, admin_entry.entry_id).status == WaitlistEntry.PROMOTED
+            assert db.session.get(EventSession, session_id).booked_seats == 7
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_external_sweep_trigger_runs_app_job(app, client, monkeypatch):
+    monkeypatch.setattr(waitlist, "send_waitlist_promotion_email", lambda **kwargs: None)
+    monkeypatch.setattr(Config, "JOB_TRIGGER_TOKEN", "test-job-token")
+    url = "/api/webhook/jobs/sweep-holds"
+    with app.app_context():
+        event_id = _create_event_with_sessions("Внешний запуск очистки", 1)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+        try:
+            _hold_seats(session_id, 10, -1)
+            response, status = waitlist.join_waitlist(
+                TestResidentData.EMAIL, session_id, "Тест", "000", TestResidentData.EMAIL, 4
+            )
+            assert status == HTTPStatus.CREATED, response
+            version = db.session.get(EventCatalog, event_id).version
+
+            assert client.post(url).status_code == HTTPStatus.FORBIDDEN
+            assert client.post(url, headers={"X-Job-Token": "wrong"}).status_code == HTTPStatus.FORBIDDEN
+
+            response = client.post(url, headers={"X-Job-Token": "test-job-token"})
+            assert response.status_code == HTTPStatus.OK
+            assert response.get_json()["deleted_count"] == 1
+            db.session.expire_all()
+            entry = WaitlistEntry.query.filter_by(session_id=session_id).one()
+            assert entry.status == WaitlistEntry.PROMOTED
+            assert db.session.get(EventSession, session_id).booked_seats == 4
+            assert db.session.get(EventCatalog, event_id).version > version
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_reservation_retries_with_idempotency_key_are_replayed(app, client, admin_access_token):
+    headers = {"Authorization": f"Bearer {admin_access_token}", "Idempotency-Key": "retry-reservation-1"}
+    with app.app_context():
+        event_id = _create_event_with_sessions("Повтор запроса", 1)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+        try:
+            body = {"session_id": session_id, "full_name": "Тест", "phone_number": "000",
+                    "email": TestAdminData.EMAIL, "participants_count": 2}
+            first = client.post("/api/user/v2/reservations", json=body, headers=headers)
+            assert first.status_code == HTTPStatus.CREATED
+            assert "Idempotent-Replayed" not in first.headers
+
+            with count_queries() as queries:
+                retry = client.post("/api/user/v2/reservations", json=body, headers=headers)
+            assert retry.status_code == HTTPStatus.CREATED
+            assert retry.headers["Idempotent-Replayed"] == "true"
+            assert retry.get_json() == first.get_json()
+            assert queries == []
+
+            idempotency_utils.replay_cache.clear()
+            retry = client.post("/api/user/v2/reservations", json=body, headers=headers)
+            assert retry.get_json() == first.get_json()
+
+            changed = client.post("/api/user/v2/reservations", json={**body, "participants_count": 3}, headers=headers)
+            assert changed.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+            assert Reservation.query.filter_by(session_id=session_id).count() == 1
+            assert db.session.get(EventSession, session_id).booked_seats == 2
+
+            assert purge_expired_idempotency_keys(datetime.now() + timedelta(days=365)) >= 1
+            assert db.session.get(IdempotencyKey, (TestAdminData.EMAIL, "retry-reservation-1")) is None
+        finally:
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_idempotency_lock_expires_and_skips_anonymous_and_credentials(app, client, admin_access_token):
+    owner, key = TestAdminData.EMAIL, f"lease-{uuid.uuid4()}"
+    with app.test_request_context("/api/user/v2/reservations", method="POST", data="{}"):
+        fingerprint = idempotency_utils.request_fingerprint()
+        now = datetime.now()
+        try:
+            assert idempotency_utils.claim_idempotency_key(owner, key, fingerprint, now) is None
+            assert idempotency_utils.claim_idempotency_key(owner, key, fingerprint, now).status_code is None
+            assert idempotency_utils.claim_idempotency_key(owner, key, "other", now + timedelta(hours=1)) is not None
+
+            later = now + timedelta(seconds=Config.IDEMPOTENCY_LOCK_SECONDS)
+            assert idempotency_utils.claim_idempotency_key(owner, key, fingerprint, later) is None
+            response = app.make_response(({"message": "ok"}, HTTPStatus.CREATED))
+            idempotency_utils.save_idempotent_response(
+                owner, key, fingerprint, response, idempotency_utils.lock_deadline(now)
+            )
+            db.session.expire_all()
+            assert db.session.get(IdempotencyKey, (owner, key)).status_code is None
+            idempotency_utils.save_idempotent_response(
+                owner, key, fingerprint, response, idempotency_utils.lock_deadline(later)
+            )
+            db.session.expire_all()
+            record = db.session.get(IdempotencyKey, (owner, key))
+            assert (record.status_code, record.locked_until) == (HTTPStatus.CREATED, None)
+        finally:
+            IdempotencyKey.query.filter_by(owner=owner, key=key).delete()
+            db.session.commit()
+            idempotency_utils.replay_cache.clear()
+
+    credentials = {"email": TestAdminData.EMAIL, "password": TestAdminData.PASSWORD}
+    for headers in ({}, {"Authorization": f"Bearer {admin_access_token}"}):
+        key = f"login-{uuid.uuid4()}"
+        for _ in range(2):
+            response = client.post("/api/login", json=credentials, headers={**headers, "Idempotency-Key": key})
+            assert response.status_code == HTTPStatus.OK
+            assert "Idempotent-Replayed" not in response.headers
+        with app.app_context():
+            assert IdempotencyKey.query.filter_by(key=key).count() == 0
+
+
+def _wait_for_payment_status(client, url, headers, expected, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        data = client.get(url, headers=headers).get_json()
+        if data["payment_status"] == expected or time.monotonic() > deadline:
+            return data
+        time.sleep(0.05)
+
+
+def test_paid_reservation_returns_before_payment_is_created(app, client, admin_access_token, monkeypatch):
+    provider_gate = threading.Event()
+    provider_calls = []
+
+    def slow_provider(**kwargs):
+        provider_calls.append(kwargs)
+        if len(provider_calls) == 1:
+            raise ConnectionError("provider is down")
+        assert provider_gate.wait(5)
+        return SimpleNamespace(
+            id="test-async-payment", status="pending", payment_method=SimpleNamespace(type="bank_card"),
+            confirmation=SimpleNamespace(confirmation_url="https://pay.example/test-async-payment")
+        )
+
+    monkeypatch.setattr(payment_queue, "create_yookassa_payment", slow_provider)
+    headers = {"Authorization": f"Bearer {admin_access_token}"}
+    with app.app_context():
+        event_id = _create_event_with_sessions("Оплата в фоне", 1, cost=100)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+        try:
+            r = client.post("/api/user/v2/reservations", headers=headers, json={
+                "session_id": session_id, "full_name": "Тест", "phone_number": "000",
+                "email": TestAdminData.EMAIL, "participants_count": 2
+            })
+            assert r.status_code == HTTPStatus.ACCEPTED
+            reservation_id = r.get_json()["reservation_id"]
+            status_url = f"/api/user/v2/reservations/{reservation_id}/payment"
+
+            assert _wait_for_payment_status(client, status_url, headers, "failed")["payment_status"] == "failed"
+            r = client.post(status_url, headers=headers)
+            assert r.status_code == HTTPStatus.ACCEPTED
+            assert r.get_json()["payment_status"] == "pending"
+            assert client.get(status_url, headers=headers).get_json()["payment_status"] == "pending"
+
+            provider_gate.set()
+            data = _wait_for_payment_status(client, status_url, headers, "ready")
+            assert data["payment_url"] == "https://pay.example/test-async-payment"
+            assert len(provider_calls) == 2 and provider_calls[1]["amount"] == 200
+            assert db.session.get(Payment, "test-async-payment").reservation_id == reservation_id
+            assert client.post(status_url, headers=headers).status_code == HTTPStatus.OK
+        finally:
+            provider_gate.set()
+            payment = db.session.get(Payment, "test-async-payment")
+            if payment is not None:
+                db.session.delete(payment)
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_webhooks_are_deduplicated_and_applied_in_order(app, client, monkeypatch):
+    confirmations = []
+    monkeypatch.setattr(
+        webhook_inbox, "send_reservation_confirmation_email", lambda reservation, user: confirmations.append(
+            reservation.reservation_id
+        )
+    )
+    with app.app_context():
+        event_id = _create_event_with_sessions("Вебхуки", 1, cost=100)
+        session_id = db.session.get(Event, event_id).sessions[0].session_id
+        try:
+            paid_id = _hold_seats(session_id, 2, 10)
+            refunded_id = _hold_seats(session_id, 3, 10)
+            paid_payment, refunded_payment, refund = (
+                f"test-{name}-{uuid.uuid4()}" for name in ("paid", "refunded", "refund")
+            )
+            for payment_id, reservation_id, count in ((paid_payment, paid_id, 2), (refunded_payment, refunded_id, 3)):
+                db.session.add(Payment(
+                    payment_id=payment_id, reservation_id=reservation_id, session_id=session_id,
+                    participants_count=count, email=TestAdminData.EMAIL, amount=100 * count, status="pending"
+                ))
+            db.session.commit()
+
+            succeeded = {"event": "payment.succeeded",
+                         "object": {"id": paid_payment, "metadata": {"reservation_id": str(paid_id)}}}
+            events = [
+                succeeded,
+                {"event": "payment.succeeded",
+                 "object": {"id": refunded_payment, "metadata": {"reservation_id": str(refunded_id)}}},
+                {"event": "refund.succeeded", "object": {"id": refund, "payment_id": refunded_payment}},
+                succeeded,
+            ]
+            for payload in events:
+                assert client.post("/api/webhook/yookassa", json=payload).status_code == HTTPStatus.OK
+            _wait_for_webhook_inbox()
+
+            assert WebhookInbox.query.filter(WebhookInbox.object_id.in_(
+                [paid_payment, refunded_payment, refund]
+            )).count() == 3
+            assert db.session.get(Payment, paid_payment).status == "succeeded"
+            assert db.session.get(Payment, refunded_payment).status == "refunded"
+            for reservation_id in (paid_id, refunded_id):
+                reservation = db.session.get(Reservation, reservation_id)
+                assert reservation.is_paid and reservation.expires_at is None
+            assert sorted(confirmations) == sorted([paid_id, refunded_id])
+
+            assert client.post("/api/webhook/yookassa", json={"event": "payment.succeeded"}).status_code \
+                == HTTPStatus.BAD_REQUEST
+        finally:
+            for payment_id in (paid_payment, refunded_payment):
+                db.session.delete(db.session.get(Payment, payment_id))
+            db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+
+
+def test_excursions_pagination_rejects_bad_params(client):
+    assert client.get("/api/user/excursions?limit=0").status_code == HTTPStatus.BAD_REQUEST
+    assert client.get("/api/user/excursions?limit=abc").status_code == HTTPStatus.BAD_REQUEST
+    assert client.get("/api/user/excursions?limit=2&cursor=broken").status_code == HTTPStatus.BAD_REQUEST
+    for values in ([{"dec": "abc"}, 1], [{"dt": 5}, 1], [[1], 1], [{"nested": {}}, 1], [1, ["x"]]):
+        r = client.get(f"/api/user/excursions?limit=2&cursor={encode_cursor(None, values)}")
+        assert r.status_code == HTTPStatus.BAD_REQUEST, values
+
+
 def test_get_reservations(client, access_token):
     headers = {"Authorization": f"Bearer {access_token}"}
     r = client.get("/api/user/reservations", headers=headers)
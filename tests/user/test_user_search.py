@@ -0,0 +1,82 @@
+import json
+from http import HTTPStatus
+
+from backend.core import db
+from backend.core.models.event_models import Event
+from backend.core.services.event_services.event_crud import create_event, update_event
+from backend.core.services.news_service.news_service import create_news_with_images, delete_news
+from backend.core.services.search_service.russian_stemmer import stem
+from backend.core.services.search_service.search_service import search_index
+from tests.conftest import TestAdminData, count_queries
+
+
+def _create_event(title, description, tags):
+    data = {
+        "title": title,
+        "description": description,
+        "duration": 60,
+        "category": "Воркшоп",
+        "format_type": "Индивидуальная",
+        "age_category": "Для школьников (7-17 лет)",
+        "place": "Екатеринбург",
+        "sessions": [],
+        "tags": tags,
+    }
+    event, response, error_status = create_event(data, TestAdminData.EMAIL, [])
+    assert not error_status, response
+    return event.event_id
+
+
+def _search(client, query, **params):
+    r = client.get("/api/user/search", query_string={"q": query, **params})
+    assert r.status_code == HTTPStatus.OK
+    return [(item["type"], item["id"]) for item in r.get_json()["results"]]
+
+
+def test_russian_stemmer_groups_word_forms():
+    assert stem("экскурсия") == stem("экскурсии") == stem("экскурсией") == "экскурс"
+    assert stem("гончарная") == stem("гончарной") == "гончарн"
+    assert stem("ёлочный") == stem("елочные")
+
+
+def test_search_ranks_excursions_and_news_and_follows_crud(app, client):
+    with app.app_context():
+        in_title = _create_event("Гончарные мастерские Урала", "Лепим посуду", ["керамика"])
+        in_text = _create_event("Прогулка по центру", "Заходим в гончарную мастерскую", [])
+        by_tag = _create_event("Вечер у печи", "Обжиг и глазурь", ["гончарство", "керамика"])
+        response, _ = create_news_with_images(
+            TestAdminData.EMAIL, json.dumps({"title": "Открылась гончарная мастерская", "content": "Ждём всех"}), []
+        )
+        news_id = response["news_id"]
+        try:
+            client.get("/api/user/search?q=x")
+            with count_queries() as queries:
+                results = _search(client, "гончарной мастерской")
+            assert len(queries) == 1 and "data_versions" in queries[0]
+            assert results.index(("excursion", in_title)) < results.index(("excursion", in_text))
+            assert ("news", news_id) in results
+
+            found = _search(client, "керамику", type="excursion")
+            assert set(found) == {("excursion", in_title), ("excursion", by_tag)}
+            assert _search(client, "мастерская", type="news") == [("news", news_id)]
+
+            version = search_index.version
+            update_event(in_text, {"is_active": False, "description": "Без совпадений"})
+            assert search_index.version == version + 1
+            assert ("excursion", in_text) not in _search(client, "мастерская")
+
+            delete_news(news_id)
+            news_id = None
+            assert _search(client, "мастерская", type="news") == []
+        finally:
+            for event_id in (in_title, in_text, by_tag):
+                db.session.delete(db.session.get(Event, event_id))
+            db.session.commit()
+            if news_id:
+                delete_news(news_id)
+
+
+def test_search_rejects_bad_params(client):
+    assert client.get("/api/user/search").status_code == HTTPStatus.BAD_REQUEST
+    assert client.get("/api/user/search?q=тест&type=users").status_code == HTTPStatus.BAD_REQUEST
+    assert client.get("/api/user/search?q=тест&limit=500").status_code == HTTPStatus.BAD_REQUEST